@@ -0,0 +1,409 @@
+"""
+Turbo Stream Offline Benchmarks
+Runs the Google Analytics, Google Search Console and Onesignal readers end to end
+against the local vendor stand-in, and the s3 writers against moto, reporting
+requests/sec, rows/sec, peak memory and writer throughput.
+
+    python -m benchmarks.run_benchmarks --output results.json
+
+Results can be compared between versions with --compare previous_results.json.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import boto3
+import httplib2
+from googleapiclient.discovery import build
+from moto import mock_s3
+
+from benchmarks.stand_in import StandInServer
+from turbo_stream.google_analyitcs.reader import GoogleAnalyticsReader
+from turbo_stream.google_search_console.reader import GoogleSearchConsoleReader
+from turbo_stream.onesignal.reader import OnesignalReader
+from turbo_stream.utils.metrics_handlers import RunMetrics
+from turbo_stream.utils.rate_handlers import set_rate_limits
+
+
+class StandInGoogleAnalyticsReader(GoogleAnalyticsReader):
+    """
+    Google Analytics reader building its service against the stand-in.
+    """
+
+    def __init__(self, *args, root_url: str, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.root_url = root_url
+
+    def _get_credentials(self):
+        return None
+
+    def _get_service(self):
+        return build(
+            serviceName="analyticsreporting",
+            version="v4",
+            http=httplib2.Http(),
+            cache_discovery=False,
+            static_discovery=False,
+            discoveryServiceUrl=f"{self.root_url}discovery/analyticsreporting/v4",
+        )
+
+
+class StandInGoogleSearchConsoleReader(GoogleSearchConsoleReader):
+    """
+    Google Search Console reader building its service against the stand-in.
+    """
+
+    def __init__(self, *args, root_url: str, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.root_url = root_url
+
+    def _get_credentials(self):
+        return None
+
+    def _get_service(self):
+        return build(
+            serviceName="searchconsole",
+            version="v1",
+            http=httplib2.Http(),
+            cache_discovery=False,
+            static_discovery=False,
+            discoveryServiceUrl=f"{self.root_url}discovery/searchconsole/v1",
+        )
+
+
+def _count_rows(data_set) -> int:
+    rows = 0
+    for item in data_set:
+        if isinstance(item, dict) and "notifications" in item:
+            rows += len(item["notifications"])
+        else:
+            rows += 1
+    return rows
+
+
+def _measure(name: str, function) -> dict:
+    """
+    Run a benchmark scenario, measuring wall time and traced peak memory.
+    """
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = function()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    result.update(
+        {
+            "name": name,
+            "seconds": round(elapsed, 4),
+            "peak_traced_bytes": peak,
+            "rows_per_second": round(result.get("rows", 0) / elapsed, 2),
+            "requests_per_second": round(result.get("requests", 0) / elapsed, 2),
+        }
+    )
+    print(f"{name}: {json.dumps(result)}")
+    return result
+
+
+def _request_count(metrics: RunMetrics) -> int:
+    return sum(
+        counter["value"]
+        for counter in metrics.summary()["counters"]
+        if counter["name"] == "requests"
+    )
+
+
+def benchmark_google_analytics(server: StandInServer, days: int, view_ids: int):
+    """
+    Benchmark the Google Analytics reader.
+    """
+    metrics = RunMetrics()
+    reader = StandInGoogleAnalyticsReader(
+        configuration={
+            "start_date": "2022-01-01",
+            "end_date": f"2022-01-{days:02d}",
+            "view_ids": [str(100000 + view_id) for view_id in range(view_ids)],
+            "metrics": ["ga:users", "ga:sessions", "ga:pageviews"],
+            "dimensions": ["ga:date", "ga:pagePath", "ga:deviceCategory"],
+        },
+        credentials="",
+        service_account_email="",
+        root_url=server.url,
+        metrics=metrics,
+        intro_off=True,
+    )
+    data_set = reader.run_query()
+    return {"rows": len(data_set), "requests": _request_count(metrics)}
+
+
+def benchmark_google_search_console(
+    server: StandInServer, days: int, batch_size: int = 1
+):
+    """
+    Benchmark the Google Search Console reader, optionally with batch http requests.
+    """
+    metrics = RunMetrics()
+    reader = StandInGoogleSearchConsoleReader(
+        configuration={
+            "start_date": "2022-01-01",
+            "end_date": f"2022-01-{days:02d}",
+            "site_url": "https://example.com/",
+            "search_type": "web",
+            "dimensions": ["page", "query", "country", "device"],
+            "metrics": ["clicks", "impressions", "ctr", "position"],
+            "row_limit": 1000,
+        },
+        credentials="",
+        root_url=server.url,
+        metrics=metrics,
+        batch_size=batch_size,
+        intro_off=True,
+    )
+    data_set = reader.run_query()
+    rows = sum(len(dimension_rows) for dimension_rows in data_set[0].values())
+    return {"rows": rows, "requests": _request_count(metrics)}
+
+
+def benchmark_onesignal(server: StandInServer, endpoint: str, credentials: str):
+    """
+    Benchmark the Onesignal reader.
+    """
+    metrics = RunMetrics()
+    reader = OnesignalReader(
+        configuration={"endpoint": endpoint, "limit": 50},
+        credentials=credentials,
+        base_url=f"{server.url}api/v1",
+        metrics=metrics,
+        intro_off=True,
+    )
+    data_set = reader.run_query()
+    return {"rows": _count_rows(data_set), "requests": _request_count(metrics)}
+
+
+def benchmark_writer(fmt: str, rows: int, partitions: int):
+    """
+    Benchmark the partitioned s3 writer against moto.
+    """
+    data_set = [
+        {
+            "date": f"2022-01-{row % partitions + 1:02d}",
+            "page": f"https://example.com/page-{row % 997}",
+            "device": ("DESKTOP", "MOBILE", "TABLET")[row % 3],
+            "clicks": row % 7,
+            "impressions": row % 7 + 10,
+            "position": 1.5 + row % 20,
+        }
+        for row in range(rows)
+    ]
+    with mock_s3():
+        boto3.client("s3", region_name="us-east-1").create_bucket(Bucket="benchmark")
+        metrics = RunMetrics()
+        reader = GoogleAnalyticsReader(
+            configuration={},
+            credentials="",
+            service_account_email="",
+            metrics=metrics,
+            intro_off=True,
+        )
+        reader._set_data_set(data_set)  # pylint: disable=protected-access
+        reader.write_partition_data_to_s3(
+            bucket="benchmark", path="benchmark", partition="date", fmt=fmt
+        )
+
+    written = {
+        counter["name"]: counter["value"]
+        for counter in metrics.summary()["counters"]
+        if counter["labels"].get("stage") == "write"
+    }
+    return {"rows": written.get("rows", 0), "bytes": written.get("bytes", 0)}
+
+
+# dependencies that should only be imported once the feature needing them is used
+HEAVY_MODULES = (
+    "boto3",
+    "pandas",
+    "pyarrow",
+    "googleapiclient",
+    "httplib2",
+    "oauth2client",
+    "requests",
+    "yaml",
+)
+
+IMPORT_SCRIPT = """
+import importlib, json, sys, time
+started = time.perf_counter()
+importlib.import_module(sys.argv[1])
+print(json.dumps({"seconds": time.perf_counter() - started, "modules": list(sys.modules)}))
+"""
+
+
+def benchmark_import(budget: float, module: str = "turbo_stream"):
+    """
+    Benchmark importing a module of turbo_stream in a fresh interpreter, against a
+    budget in seconds.
+    """
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_SCRIPT, module], capture_output=True, check=True
+    ).stdout
+    result = json.loads(output.decode("utf-8").strip().splitlines()[-1])
+
+    heavy_modules = [name for name in HEAVY_MODULES if name in result["modules"]]
+    within_budget = result["seconds"] <= budget and not heavy_modules
+    if not within_budget:
+        logging.warning(
+            f"import {module} took {round(result['seconds'], 3)} seconds against "
+            f"a budget of {budget}, importing {', '.join(heavy_modules) or 'nothing'} "
+            f"heavy."
+        )
+    return {
+        "rows": 0,
+        "import_seconds": round(result["seconds"], 4),
+        "heavy_modules": heavy_modules,
+        "within_budget": within_budget,
+    }
+
+
+def run(args) -> dict:
+    """
+    Run every benchmark scenario.
+    """
+    # measure turbo-stream rather than the vendor quotas, unless asked otherwise
+    if not args.respect_rate_limits:
+        for vendor in (
+            "google_analytics",
+            "google_search_console",
+            "onesignal",
+            "onesignal_csv_export",
+        ):
+            set_rate_limits(vendor, qps=1e6, burst=1e6)
+
+    os.environ.setdefault("AWS_ACCESS_KEY_ID", "benchmark")
+    os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "benchmark")
+    os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+
+    results = [
+        _measure("import_turbo_stream", lambda: benchmark_import(args.import_budget))
+    ]
+    with tempfile.TemporaryDirectory() as directory, StandInServer(
+        ga_rows=args.ga_rows,
+        gsc_rows=args.gsc_rows,
+        onesignal_notifications=args.onesignal_notifications,
+        onesignal_players=args.onesignal_players,
+        latency=args.latency,
+        rate_limit_error_rate=args.rate_limit_error_rate,
+        server_error_rate=args.server_error_rate,
+    ) as server:
+        credentials = os.path.join(directory, "onesignal_creds.yml")
+        with open(credentials, "w", encoding="utf-8") as file:
+            file.write("app_id: benchmark\napi_key: benchmark\n")
+
+        results.append(
+            _measure(
+                "google_analytics",
+                lambda: benchmark_google_analytics(server, args.days, args.view_ids),
+            )
+        )
+        results.append(
+            _measure(
+                "google_search_console",
+                lambda: benchmark_google_search_console(server, args.days),
+            )
+        )
+        results.append(
+            _measure(
+                "google_search_console_batch",
+                lambda: benchmark_google_search_console(
+                    server, args.days, args.gsc_batch_size
+                ),
+            )
+        )
+        results.append(
+            _measure(
+                "onesignal_view_notification",
+                lambda: benchmark_onesignal(server, "view_notification", credentials),
+            )
+        )
+        results.append(
+            _measure(
+                "onesignal_csv_export",
+                lambda: benchmark_onesignal(server, "csv_export", credentials),
+            )
+        )
+
+    for fmt in ("json", "csv", "parquet"):
+        result = _measure(
+            f"writer_{fmt}",
+            lambda fmt=fmt: benchmark_writer(fmt, args.writer_rows, args.days),
+        )
+        result["megabytes_per_second"] = round(
+            result["bytes"] / 1024**2 / result["seconds"], 2
+        )
+        results.append(result)
+
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+
+
+def compare(current: dict, previous: dict) -> None:
+    """
+    Log the relative change of each scenario against a previous run.
+    """
+    previous_results = {result["name"]: result for result in previous["results"]}
+    for result in current["results"]:
+        before = previous_results.get(result["name"])
+        if before is None or not before["seconds"]:
+            continue
+        change = (result["seconds"] - before["seconds"]) / before["seconds"] * 100
+        print(f"{result['name']}: {round(change, 1)}% wall time change.")
+
+
+def main(argv=None) -> dict:
+    """
+    Parse arguments and run the benchmarks.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--view-ids", type=int, default=2)
+    parser.add_argument("--ga-rows", type=int, default=1000)
+    parser.add_argument("--gsc-rows", type=int, default=2500)
+    parser.add_argument("--gsc-batch-size", type=int, default=100)
+    parser.add_argument("--onesignal-notifications", type=int, default=500)
+    parser.add_argument("--onesignal-players", type=int, default=20000)
+    parser.add_argument("--writer-rows", type=int, default=100000)
+    parser.add_argument("--import-budget", type=float, default=0.25)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--rate-limit-error-rate", type=float, default=0.0)
+    parser.add_argument("--server-error-rate", type=float, default=0.0)
+    parser.add_argument("--respect-rate-limits", action="store_true")
+    parser.add_argument("--verbose", action="store_true")
+    parser.add_argument("--output", help="Write the results to a json file.")
+    parser.add_argument("--compare", help="Compare against a previous results file.")
+    args = parser.parse_args(argv)
+
+    # the readers log every request, which would dominate the measurements
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.WARNING)
+
+    results = run(args)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as file:
+            compare(results, json.load(file))
+    return results
+
+
+if __name__ == "__main__":
+    main()
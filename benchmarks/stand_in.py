@@ -0,0 +1,433 @@
+"""
+Local Vendor Stand-in Server
+Mimics the Google Analytics v4 batchGet, Google Search Console searchanalytics.query
+and Onesignal notifications and csv_export endpoints, with configurable row counts,
+page sizes, latency and 429/5xx error injection. Google batch http requests are
+served at /batch, with errors injected per sub-request, and oauth tokens at /token.
+"""
+import gzip
+import io
+import json
+import random
+import threading
+import time
+from email.parser import FeedParser
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+DEFAULT_SETTINGS = {
+    # rows returned per google analytics report
+    "ga_rows": 1000,
+    # total rows per search console (dimensions, date) query, paged by rowLimit
+    "gsc_rows": 5000,
+    # onesignal notifications in total, and players in the csv export
+    "onesignal_notifications": 500,
+    "onesignal_players": 10000,
+    # seconds added to every api response
+    "latency": 0.0,
+    # share of api requests answered with a 429 or a 503
+    "rate_limit_error_rate": 0.0,
+    "server_error_rate": 0.0,
+    "seed": 0,
+}
+
+
+def _discovery_document(name: str, version: str, root_url: str, resources: dict):
+    return {
+        "kind": "discovery#restDescription",
+        "discoveryVersion": "v1",
+        "id": f"{name}:{version}",
+        "name": name,
+        "version": version,
+        "rootUrl": root_url,
+        "servicePath": "",
+        "baseUrl": root_url,
+        "batchPath": "batch",
+        "protocol": "rest",
+        "parameters": {},
+        "schemas": {
+            "Request": {"id": "Request", "type": "object"},
+            "Response": {"id": "Response", "type": "object"},
+        },
+        "resources": resources,
+    }
+
+
+def analytics_discovery_document(root_url: str) -> dict:
+    """
+    :return: Minimal analyticsreporting v4 discovery document served at root_url.
+    """
+    return _discovery_document(
+        "analyticsreporting",
+        "v4",
+        root_url,
+        {
+            "reports": {
+                "methods": {
+                    "batchGet": {
+                        "id": "analyticsreporting.reports.batchGet",
+                        "path": "v4/reports:batchGet",
+                        "flatPath": "v4/reports:batchGet",
+                        "httpMethod": "POST",
+                        "parameters": {},
+                        "request": {"$ref": "Request"},
+                        "response": {"$ref": "Response"},
+                    }
+                }
+            }
+        },
+    )
+
+
+def search_console_discovery_document(root_url: str) -> dict:
+    """
+    :return: Minimal searchconsole v1 discovery document served at root_url.
+    """
+    return _discovery_document(
+        "searchconsole",
+        "v1",
+        root_url,
+        {
+            "searchanalytics": {
+                "methods": {
+                    "query": {
+                        "id": "webmasters.searchanalytics.query",
+                        "path": "webmasters/v3/sites/{siteUrl}/searchAnalytics/query",
+                        "flatPath": "webmasters/v3/sites/{siteUrl}/searchAnalytics/query",
+                        "httpMethod": "POST",
+                        "parameters": {
+                            "siteUrl": {
+                                "type": "string",
+                                "location": "path",
+                                "required": True,
+                            }
+                        },
+                        "parameterOrder": ["siteUrl"],
+                        "request": {"$ref": "Request"},
+                        "response": {"$ref": "Response"},
+                    }
+                }
+            }
+        },
+    )
+
+
+def analytics_response(body: dict, rows: int) -> dict:
+    """
+    :return: A batchGet response with the given number of rows per report request.
+    """
+    reports = []
+    for report_request in body.get("reportRequests", []):
+        dimensions = [item["name"] for item in report_request.get("dimensions", [])]
+        metrics = [item["expression"] for item in report_request.get("metrics", [])]
+        date = report_request["dateRanges"][0]["startDate"].replace("-", "")
+        reports.append(
+            {
+                "columnHeader": {
+                    "dimensions": dimensions,
+                    "metricHeader": {
+                        "metricHeaderEntries": [
+                            {"name": metric, "type": "INTEGER"} for metric in metrics
+                        ]
+                    },
+                },
+                "data": {
+                    "rows": [
+                        {
+                            "dimensions": [
+                                date if dimension == "ga:date" else f"{dimension}-{row}"
+                                for dimension in dimensions
+                            ],
+                            "metrics": [
+                                {
+                                    "values": [
+                                        str(row + index)
+                                        for index in range(len(metrics))
+                                    ]
+                                }
+                            ],
+                        }
+                        for row in range(rows)
+                    ],
+                    "rowCount": rows,
+                },
+            }
+        )
+    return {"reports": reports}
+
+
+def search_console_response(body: dict, total_rows: int) -> dict:
+    """
+    :return: A searchanalytics.query response for the requested page.
+    """
+    start_row = body.get("startRow", 0)
+    row_limit = body.get("rowLimit", 1000)
+    dimensions = body.get("dimensions", [])
+    rows = [
+        {
+            "keys": [
+                body["startDate"] if dimension == "date" else f"{dimension}-{row}"
+                for dimension in dimensions
+            ],
+            "clicks": row % 7,
+            "impressions": row % 7 + 10,
+            "ctr": (row % 7) / (row % 7 + 10),
+            "position": 1 + row % 20,
+        }
+        for row in range(start_row, min(start_row + row_limit, total_rows))
+    ]
+    if not rows:
+        return {"responseAggregationType": "byPage"}
+    return {"rows": rows, "responseAggregationType": "byPage"}
+
+
+def players_csv(players: int) -> bytes:
+    """
+    :return: A gzipped Onesignal player csv export.
+    """
+    buffer = io.StringIO()
+    buffer.write(
+        "id,identifier,session_count,language,timezone,game_version,device_os,"
+        "device_type,device_model,ad_id,tags,last_active,playtime,amount_spent,"
+        "created_at,invalid_identifier,badge_count\n"
+    )
+    for player in range(players):
+        buffer.write(
+            f"{player:08x}-0000-0000-0000-000000000000,token-{player},{player % 50},en,"
+            f"0,1.0.{player % 3},14.{player % 4},{player % 2},iPhone,,"
+            f'"{{""level"": ""{player % 10}""}}",'
+            f"2022-01-01 00:00:00,{player * 3},0.0,2021-01-01 00:00:00,f,0\n"
+        )
+    return gzip.compress(buffer.getvalue().encode("utf-8"))
+
+
+class StandInServer:
+    """
+    Threaded local http server standing in for the vendors, run as a context manager.
+    Requests served are counted by endpoint in request_counts.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, **settings):
+        self.settings = {**DEFAULT_SETTINGS, **settings}
+        self.request_counts: dict = {}
+        self._random = random.Random(self.settings["seed"])
+        self._lock = threading.Lock()
+        self._players_csv = None
+
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):  # pylint: disable=arguments-differ
+                pass
+
+            def do_GET(self):  # pylint: disable=invalid-name
+                stand_in.handle(self, "GET")
+
+            def do_POST(self):  # pylint: disable=invalid-name
+                stand_in.handle(self, "POST")
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        """
+        :return: Root url of the server, ending with a slash.
+        """
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _count(self, endpoint: str) -> None:
+        with self._lock:
+            self.request_counts[endpoint] = self.request_counts.get(endpoint, 0) + 1
+
+    def _injected_error(self):
+        with self._lock:
+            draw = self._random.random()
+        if draw < self.settings["rate_limit_error_rate"]:
+            return 429, {"error": {"code": 429, "status": "RESOURCE_EXHAUSTED"}}
+        if draw < (
+            self.settings["rate_limit_error_rate"] + self.settings["server_error_rate"]
+        ):
+            return 503, {"error": {"code": 503, "status": "UNAVAILABLE"}}
+        return None
+
+    @staticmethod
+    def _send(
+        handler, status: int, body, content_type="application/json", headers=None
+    ):
+        if not isinstance(body, bytes):
+            body = json.dumps(body).encode("utf-8")
+        handler.send_response(status)
+        handler.send_header("Content-Type", content_type)
+        handler.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            handler.send_header(key, value)
+        handler.end_headers()
+        handler.wfile.write(body)
+
+    def api_response(
+        self, method: str, path: str, query: dict, body: dict, latency: bool = True
+    ):
+        """
+        Route an api request.
+        :return: (status, body, content type, headers)
+        """
+        if method == "GET" and path == "/discovery/analyticsreporting/v4":
+            return 200, analytics_discovery_document(self.url), "application/json", {}
+        if method == "GET" and path == "/discovery/searchconsole/v1":
+            return (
+                200,
+                search_console_discovery_document(self.url),
+                "application/json",
+                {},
+            )
+        if method == "POST" and path == "/token":
+            self._count("oauth.token")
+            return (
+                200,
+                {
+                    "access_token": f"stand-in-token-{self.request_counts['oauth.token']}",
+                    "expires_in": 3600,
+                    "token_type": "Bearer",
+                },
+                "application/json",
+                {},
+            )
+        if method == "GET" and path == "/exports/players.csv.gz":
+            if self._players_csv is None:
+                self._players_csv = players_csv(self.settings["onesignal_players"])
+            return 200, self._players_csv, "application/gzip", {}
+
+        if latency:
+            time.sleep(self.settings["latency"])
+        error = self._injected_error()
+        if error is not None:
+            return error[0], error[1], "application/json", {"Retry-After": "0"}
+
+        if method == "POST" and path == "/v4/reports:batchGet":
+            self._count("ga.batchGet")
+            return (
+                200,
+                analytics_response(body, self.settings["ga_rows"]),
+                "application/json",
+                {},
+            )
+        if method == "POST" and path.endswith("/searchAnalytics/query"):
+            self._count("gsc.searchanalytics.query")
+            return (
+                200,
+                search_console_response(body, self.settings["gsc_rows"]),
+                "application/json",
+                {},
+            )
+        if method == "GET" and path == "/api/v1/notifications":
+            self._count("onesignal.notifications")
+            total = self.settings["onesignal_notifications"]
+            limit = int(query.get("limit", ["50"])[0])
+            offset = int(query.get("offset", ["0"])[0])
+            notifications = [
+                {"id": f"notification-{index}", "successful": index, "failed": 0}
+                for index in range(offset, min(offset + limit, total))
+            ]
+            return (
+                200,
+                {
+                    "total_count": total,
+                    "offset": offset,
+                    "limit": limit,
+                    "notifications": notifications,
+                },
+                "application/json",
+                {},
+            )
+        if method == "POST" and path == "/api/v1/players/csv_export":
+            self._count("onesignal.csv_export")
+            return (
+                200,
+                {"csv_file_url": f"{self.url}exports/players.csv.gz"},
+                "application/json",
+                {},
+            )
+
+        return 404, {"error": {"code": 404, "message": path}}, "application/json", {}
+
+    def batch_response(self, content_type: str, raw_body: bytes):
+        """
+        Answer a multipart/mixed google batch http request, one part per sub-request.
+        :return: (body, content type)
+        """
+        self._count("batch")
+        time.sleep(self.settings["latency"])
+
+        parser = FeedParser()
+        parser.feed(f"content-type: {content_type}\r\n\r\n")
+        parser.feed(raw_body.decode("utf-8"))
+
+        boundary = "stand_in_batch"
+        parts = []
+        for part in parser.close().get_payload():
+            request_line, request = part.get_payload().split("\n", 1)
+            method, target, _ = request_line.split(" ")
+            request_parser = FeedParser()
+            request_parser.feed(request)
+            request_body = request_parser.close().get_payload()
+            parsed = urlparse(target)
+
+            status, response, _, headers = self.api_response(
+                method=method,
+                path=unquote(parsed.path),
+                query=parse_qs(parsed.query),
+                body=json.loads(request_body) if request_body.strip() else {},
+                latency=False,
+            )
+            header_lines = "".join(
+                f"{key}: {value}\r\n" for key, value in headers.items()
+            )
+            parts.append(
+                f"--{boundary}\r\n"
+                "Content-Type: application/http\r\n"
+                f"Content-ID: {part['Content-ID'].replace('<', '<response-', 1)}\r\n"
+                "\r\n"
+                f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+                f"Content-Type: application/json\r\n{header_lines}\r\n"
+                f"{json.dumps(response)}\r\n"
+            )
+        parts.append(f"--{boundary}--\r\n")
+        return "".join(parts).encode("utf-8"), f"multipart/mixed; boundary={boundary}"
+
+    def handle(self, handler, method: str) -> None:
+        """
+        Handle a request of the http server.
+        """
+        parsed = urlparse(handler.path)
+        length = int(handler.headers.get("Content-Length") or 0)
+        raw_body = handler.rfile.read(length) if length else b""
+        if method == "POST" and parsed.path == "/batch":
+            body, content_type = self.batch_response(
+                handler.headers.get("Content-Type"), raw_body
+            )
+            self._send(handler, 200, body, content_type)
+            return
+
+        body = json.loads(raw_body) if raw_body.strip().startswith(b"{") else {}
+
+        status, response, content_type, headers = self.api_response(
+            method=method,
+            path=unquote(parsed.path),
+            query=parse_qs(parsed.query),
+            body=body,
+        )
+        self._send(handler, status, response, content_type, headers)
@@ -36,7 +36,8 @@ setup(
         "botocore~=1.24.16",
         "moto~=3.0.7",
     ],
-    extras_require={},
+    extras_require={"async": ["aiohttp"]},
+    entry_points={"console_scripts": ["turbo-stream=turbo_stream.cli:main"]},
     description=DESCRIPTION,
     version=VERSION,
     url=URL,
@@ -0,0 +1,166 @@
+"""
+Test the asyncio readers against the local vendor stand-in
+"""
+import asyncio
+import tempfile
+import unittest
+
+import httplib2
+from googleapiclient.discovery import build
+
+from benchmarks.stand_in import StandInServer
+from turbo_stream.google_analyitcs.async_reader import AsyncGoogleAnalyticsReader
+from turbo_stream.google_search_console.async_reader import (
+    AsyncGoogleSearchConsoleReader,
+)
+from turbo_stream.onesignal.async_reader import AsyncOnesignalReader
+from turbo_stream.utils.rate_handlers import set_rate_limits
+
+
+class _StandInGoogleAnalyticsReader(AsyncGoogleAnalyticsReader):
+    def __init__(self, *args, root_url: str, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.root_url = root_url
+
+    def _get_credentials(self):
+        return None
+
+    def _get_service(self):
+        return build(
+            serviceName="analyticsreporting",
+            version="v4",
+            http=httplib2.Http(),
+            cache_discovery=False,
+            static_discovery=False,
+            discoveryServiceUrl=f"{self.root_url}discovery/analyticsreporting/v4",
+        )
+
+
+class _StandInGoogleSearchConsoleReader(AsyncGoogleSearchConsoleReader):
+    def __init__(self, *args, root_url: str, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.root_url = root_url
+
+    def _get_credentials(self):
+        return None
+
+    def _get_service(self):
+        return build(
+            serviceName="searchconsole",
+            version="v1",
+            http=httplib2.Http(),
+            cache_discovery=False,
+            static_discovery=False,
+            discoveryServiceUrl=f"{self.root_url}discovery/searchconsole/v1",
+        )
+
+
+class TestAsyncReaders(unittest.TestCase):
+    """
+    Test the asyncio readers against the local vendor stand-in
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        for vendor in (
+            "google_analytics",
+            "google_search_console",
+            "onesignal",
+            "onesignal_csv_export",
+        ):
+            set_rate_limits(vendor, qps=1e6, burst=1e6)
+
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.credentials = f"{cls.directory.name}/onesignal_creds.yml"
+        with open(cls.credentials, "w", encoding="utf-8") as file:
+            file.write("app_id: test\napi_key: test\n")
+
+    @classmethod
+    def tearDownClass(cls):
+        for vendor in (
+            "google_analytics",
+            "google_search_console",
+            "onesignal",
+            "onesignal_csv_export",
+        ):
+            set_rate_limits(vendor)
+        cls.directory.cleanup()
+
+    def test_google_analytics_reader(self):
+        """
+        Test if the reader streams a batch per view_id and date, in order.
+        """
+        with StandInServer(ga_rows=5) as server:
+            reader = _StandInGoogleAnalyticsReader(
+                configuration={
+                    "start_date": "2022-01-01",
+                    "end_date": "2022-01-03",
+                    "view_ids": ["123456"],
+                    "metrics": ["ga:users"],
+                    "dimensions": ["ga:date", "ga:pagePath"],
+                },
+                credentials="",
+                service_account_email="",
+                root_url=server.url,
+                intro_off=True,
+            )
+
+            async def stream():
+                return [batch async for batch in reader.stream()]
+
+            batches = asyncio.run(stream())
+
+        # the most recent date is gathered first
+        self.assertEqual(
+            [batch.date for batch in batches],
+            ["2022-01-03", "2022-01-02", "2022-01-01"],
+        )
+        self.assertEqual([len(batch.rows) for batch in batches], [5, 5, 5])
+        self.assertEqual(batches[0].rows[0]["ga:date"], "20220103")
+
+    def test_google_search_console_reader(self):
+        """
+        Test if every page of every dimension is gathered.
+        """
+        with StandInServer(gsc_rows=25) as server:
+            reader = _StandInGoogleSearchConsoleReader(
+                configuration={
+                    "start_date": "2022-01-01",
+                    "end_date": "2022-01-02",
+                    "site_url": "https://example.com/",
+                    "dimensions": ["page", "query"],
+                    "metrics": ["clicks"],
+                    "row_limit": 10,
+                },
+                credentials="",
+                root_url=server.url,
+                intro_off=True,
+            )
+            data_set = asyncio.run(reader.run_query())
+
+        self.assertEqual(
+            {dimension: len(rows) for dimension, rows in data_set[0].items()},
+            {"page": 50, "query": 50},
+        )
+
+    def test_onesignal_reader(self):
+        """
+        Test if notification pages and the csv export are gathered.
+        """
+        with StandInServer(onesignal_notifications=120, onesignal_players=7) as server:
+
+            async def run(endpoint):
+                reader = AsyncOnesignalReader(
+                    configuration={"endpoint": endpoint, "limit": 50},
+                    credentials=self.credentials,
+                    base_url=f"{server.url}api/v1",
+                    intro_off=True,
+                )
+                return await reader.run_query()
+
+            notifications = asyncio.run(run("view_notification"))
+            players = asyncio.run(run("csv_export"))
+
+        self.assertEqual([page["offset"] for page in notifications], [0, 50, 100])
+        self.assertEqual(sum(len(page["notifications"]) for page in notifications), 120)
+        self.assertEqual(len(players), 7)
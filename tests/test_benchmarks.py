@@ -0,0 +1,65 @@
+"""
+Test benchmarks.run_benchmarks
+"""
+import unittest
+
+from benchmarks.run_benchmarks import benchmark_import, main
+
+
+class TestBenchmarks(unittest.TestCase):
+    """
+    Test benchmarks.run_benchmarks
+    """
+
+    def test_run_benchmarks(self):
+        """
+        Test if every reader runs end to end against the stand-in.
+        """
+        results = main(
+            [
+                "--days",
+                "2",
+                "--view-ids",
+                "1",
+                "--ga-rows",
+                "10",
+                "--gsc-rows",
+                "10",
+                "--onesignal-notifications",
+                "60",
+                "--onesignal-players",
+                "10",
+                "--writer-rows",
+                "10",
+            ]
+        )
+        rows = {result["name"]: result["rows"] for result in results["results"]}
+        self.assertEqual(
+            rows,
+            {
+                "import_turbo_stream": 0,
+                "google_analytics": 20,
+                "google_search_console": 2 * 4 * 10,
+                "google_search_console_batch": 2 * 4 * 10,
+                "onesignal_view_notification": 60,
+                "onesignal_csv_export": 10,
+                "writer_json": 10,
+                "writer_csv": 10,
+                "writer_parquet": 10,
+            },
+        )
+
+    def test_import_budget(self):
+        """
+        Test if importing turbo_stream and its readers leaves the heavy dependencies
+        to be imported once they are used.
+        """
+        for module in (
+            "turbo_stream",
+            "turbo_stream.google_analyitcs.reader",
+            "turbo_stream.google_search_console.reader",
+            "turbo_stream.onesignal.reader",
+        ):
+            result = benchmark_import(budget=60, module=module)
+            self.assertEqual(result["heavy_modules"], [], module)
+            self.assertTrue(result["within_budget"])
@@ -0,0 +1,106 @@
+"""
+Test turbo_stream.utils.cache_handlers
+"""
+import tempfile
+import time
+import unittest
+
+from googleapiclient.discovery import build
+
+from turbo_stream.google_analyitcs.reader import GoogleAnalyticsReader
+from turbo_stream.utils.cache_handlers import ResponseCache
+
+
+class TestCacheHandlers(unittest.TestCase):
+    """
+    Test turbo_stream.utils.cache_handlers
+    """
+
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self._directory.cleanup()
+
+    def test_cache_key(self):
+        """
+        Test if the cache key ignores key order of the request body.
+        """
+        self.assertEqual(
+            ResponseCache.cache_key("api", "site", {"a": 1, "b": 2}),
+            ResponseCache.cache_key("api", "site", {"b": 2, "a": 1}),
+        )
+        self.assertNotEqual(
+            ResponseCache.cache_key("api", "site", {"a": 1}),
+            ResponseCache.cache_key("api", "other", {"a": 1}),
+        )
+
+    def test_final_data(self):
+        """
+        Test if historical final data is stored and served.
+        """
+        cache = ResponseCache(directory=self._directory.name)
+        cache.set("api", "site", {"a": 1}, {"rows": [1]}, date="2022-01-01")
+        self.assertEqual(cache.get("api", "site", {"a": 1}), {"rows": [1]})
+
+        reloaded = ResponseCache(directory=self._directory.name)
+        self.assertEqual(reloaded.get("api", "site", {"a": 1}), {"rows": [1]})
+
+    def test_mutable_data(self):
+        """
+        Test if mutable data is only stored given a ttl, and expires.
+        """
+        cache = ResponseCache(directory=self._directory.name)
+        cache.set("api", "site", {"a": 1}, {"rows": [1]}, date=None)
+        cache.set(
+            "api", "site", {"a": 2}, {"rows": [1]}, date="2022-01-01", data_state="all"
+        )
+        self.assertIsNone(cache.get("api", "site", {"a": 1}))
+        self.assertIsNone(cache.get("api", "site", {"a": 2}))
+
+        cache = ResponseCache(directory=self._directory.name, mutable_ttl=0.1)
+        cache.set("api", "site", {"a": 1}, {"rows": [1]}, date=None)
+        self.assertEqual(cache.get("api", "site", {"a": 1}), {"rows": [1]})
+        time.sleep(0.2)
+        self.assertIsNone(cache.get("api", "site", {"a": 1}))
+
+    def test_eviction(self):
+        """
+        Test if the least recently used entries are evicted past max_bytes.
+        """
+        cache = ResponseCache(directory=self._directory.name, max_bytes=100)
+        cache.set("api", "site", {"a": 1}, {"rows": [1]}, date="2022-01-01")
+        time.sleep(0.01)
+        cache.set("api", "site", {"a": 2}, {"rows": [2]}, date="2022-01-01")
+        time.sleep(0.01)
+        cache.get("api", "site", {"a": 1})
+        cache.set("api", "site", {"a": 3}, {"rows": [3]}, date="2022-01-01")
+
+        self.assertIsNone(cache.get("api", "site", {"a": 2}))
+        self.assertEqual(cache.get("api", "site", {"a": 3}), {"rows": [3]})
+
+    def test_cache_handler(self):
+        """
+        Test if the reader query handler is served from the cache.
+        """
+        cache = ResponseCache(directory=self._directory.name)
+        reader = GoogleAnalyticsReader(
+            credentials="tests/assets/mock_ga_creds.p12",
+            configuration={"metrics": ["ga:users"]},
+            service_account_email="",
+            response_cache=cache,
+            intro_off=True,
+        )
+        cache.set(
+            api="google_analytics",
+            entity="123456",
+            request=reader._build_request(view_id="123456", date="2022-01-01"),
+            response={"reports": []},
+            date="2022-01-01",
+        )
+
+        self.assertEqual(
+            reader._query_handler("123456", build, "2022-01-01"), {"reports": []}
+        )
+        with self.assertRaises(AttributeError):
+            reader._query_handler("123456", build, "2022-01-02")
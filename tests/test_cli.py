@@ -0,0 +1,149 @@
+"""
+Test turbo_stream.cli
+"""
+import json
+import tempfile
+import threading
+import time
+import unittest
+
+from turbo_stream import ReaderInterface
+from turbo_stream.cli import main
+from turbo_stream.utils.schedule_handlers import Job, JobScheduler
+
+
+class ManifestReader(ReaderInterface):
+    """
+    Reader returning its configured rows.
+    """
+
+    def run_query(self):
+        if self._configuration.get("fail"):
+            raise ValueError("Failed query.")
+        self._data_set = self._configuration.get("rows", [])
+        return self._data_set
+
+
+class TestJobScheduler(unittest.TestCase):
+    """
+    Test turbo_stream.utils.schedule_handlers
+    """
+
+    def test_priority(self):
+        """
+        Test if jobs with a higher priority start first.
+        """
+        started = []
+        jobs = [
+            Job(name=name, function=lambda name=name: started.append(name), priority=p)
+            for name, p in (("low", 0), ("high", 10), ("medium", 5), ("low_2", 0))
+        ]
+        JobScheduler(workers=1).run(jobs)
+        self.assertEqual(started, ["high", "medium", "low", "low_2"])
+
+    def test_concurrency_caps(self):
+        """
+        Test if vendor and credential caps hold while the other jobs carry on.
+        """
+        lock = threading.Lock()
+        running = {}
+        peaks = {}
+
+        def work(key):
+            with lock:
+                running[key] = running.get(key, 0) + 1
+                peaks[key] = max(peaks.get(key, 0), running[key])
+            time.sleep(0.02)
+            with lock:
+                running[key] -= 1
+
+        jobs = [
+            Job(name=f"ga_{index}", function=lambda: work("ga"), vendor="ga")
+            for index in range(4)
+        ] + [
+            Job(
+                name=f"gsc_{index}",
+                function=lambda: work("credential"),
+                vendor="gsc",
+                credential="credential",
+            )
+            for index in range(4)
+        ]
+        JobScheduler(workers=8, vendor_limits={"ga": 2}, credential_limit=1).run(jobs)
+        self.assertEqual(peaks, {"ga": 2, "credential": 1})
+
+    def test_failure_isolation(self):
+        """
+        Test if a failed job is recorded without stopping the other jobs.
+        """
+
+        def fail():
+            raise ValueError("Failed job.")
+
+        results = JobScheduler(workers=1).run(
+            [
+                Job(name="failing", function=fail, priority=1),
+                Job(name="passing", function=lambda: "done"),
+            ]
+        )
+        self.assertEqual(results["failing"]["status"], "failed")
+        self.assertEqual(results["passing"]["status"], "succeeded")
+        self.assertEqual(results["passing"]["result"], "done")
+
+
+class TestCli(unittest.TestCase):
+    """
+    Test turbo_stream.cli
+    """
+
+    def test_main(self):
+        """
+        Test if the jobs of a manifest are run and written, with failures reported.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            manifest = {
+                "workers": 2,
+                "jobs": [
+                    {
+                        "name": f"job_{index}",
+                        "reader": "tests.test_cli:ManifestReader",
+                        "configuration": {"rows": [{"row": index}]},
+                        "credentials": "",
+                        "write": {
+                            "method": "write_date_to_local",
+                            "file_location": f"{directory}/job_{index}.json",
+                        },
+                    }
+                    for index in range(3)
+                ]
+                + [
+                    {
+                        "name": "failing",
+                        "reader": "tests.test_cli:ManifestReader",
+                        "configuration": {"fail": True},
+                    },
+                    {"name": "unknown", "reader": "unknown"},
+                ],
+            }
+            with open(f"{directory}/jobs.json", "w", encoding="utf-8") as file:
+                json.dump(manifest, file)
+
+            exit_code = main(
+                [f"{directory}/jobs.json", "--output", f"{directory}/results.json"]
+            )
+
+            self.assertEqual(exit_code, 1)
+            with open(f"{directory}/results.json", "r", encoding="utf-8") as file:
+                results = json.load(file)
+            self.assertEqual(
+                {name: result["status"] for name, result in results.items()},
+                {
+                    "job_0": "succeeded",
+                    "job_1": "succeeded",
+                    "job_2": "succeeded",
+                    "failing": "failed",
+                    "unknown": "failed",
+                },
+            )
+            with open(f"{directory}/job_2.json", "r", encoding="utf-8") as file:
+                self.assertEqual(json.load(file), [{"row": 2}])
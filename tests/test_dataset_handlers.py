@@ -0,0 +1,127 @@
+"""
+Test turbo_stream.utils.dataset_handlers
+"""
+import io
+import json
+import unittest
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from benchmarks.stand_in import players_csv
+from turbo_stream.onesignal.reader import PLAYER_EXPORT_TYPES
+from turbo_stream.utils.aws_handlers import serialise_data
+from turbo_stream.utils.dataset_handlers import (
+    CategoryPool,
+    partition_table,
+    read_csv_table,
+    to_arrow_table,
+)
+
+MOCK_ROWS = [
+    {
+        "site_url": "https://example.com/",
+        "device": ["mobile", "desktop"][index % 2],
+        "page": f"/page/{index}",
+        "clicks": index,
+    }
+    for index in range(10)
+]
+
+
+class TestDatasetHandlers(unittest.TestCase):
+    """
+    Test turbo_stream.utils.dataset_handlers
+    """
+
+    def test_category_pool(self):
+        """
+        Test if repeated values share an instance, until a column has too many.
+        """
+        pool = CategoryPool(max_categories=2)
+        first = pool.intern("device", "".join(["mob", "ile"]))
+        self.assertIs(pool.intern("device", "".join(["mo", "bile"])), first)
+        self.assertEqual(pool.intern("device", 1), 1)
+
+        for page in ("/a", "/b", "/c"):
+            pool.intern("page", page)
+        self.assertEqual(pool.categories(), {"device": ["mobile"]})
+
+    def test_to_arrow_table(self):
+        """
+        Test if rows become a table with the columns of every row, and if rows that
+        would not serialise the same are left out.
+        """
+        table = to_arrow_table(MOCK_ROWS)
+        self.assertTrue(pa.types.is_string(table.schema.field("device").type))
+        self.assertEqual(table.to_pylist(), MOCK_ROWS)
+
+        self.assertIsNone(to_arrow_table([{"value": 1}, {"value": "one"}]))
+        self.assertIsNone(to_arrow_table([{"value": None}]))
+
+    def test_parquet_output(self):
+        """
+        Test if the parquet files of partitions read back as one dataset, with the
+        dtypes of the rows, and keep repeated values in dictionary pages.
+        """
+        partitions = {
+            # a single device in one partition, every device in the other
+            "mobile": [row for row in MOCK_ROWS if row["device"] == "mobile"][:1],
+            "all": MOCK_ROWS,
+        }
+        files = [
+            io.BytesIO(serialise_data(data=rows, fmt="parquet"))
+            for rows in partitions.values()
+        ]
+        tables = [pq.read_table(file) for file in files]
+        self.assertEqual(tables[0].schema, tables[1].schema)
+        dataset = pa.concat_tables(tables).to_pandas()
+        self.assertEqual(
+            dataset.to_dict(orient="records"), [*partitions["mobile"], *MOCK_ROWS]
+        )
+        self.assertEqual(dict(dataset.dtypes), dict(pd.DataFrame(MOCK_ROWS).dtypes))
+        encodings = pq.ParquetFile(files[1]).metadata.row_group(0).column(1).encodings
+        self.assertIn("RLE_DICTIONARY", encodings)
+
+    def test_read_csv_table(self):
+        """
+        Test if a compressed csv is parsed in blocks with the declared column types,
+        and if the table is written to parquet as it is.
+        """
+        table = read_csv_table(
+            io.BytesIO(players_csv(1000)),
+            column_types={**PLAYER_EXPORT_TYPES, "missing": "int64"},
+            compression="gzip",
+            block_size=4096,
+        )
+        self.assertEqual(table.num_rows, 1000)
+        self.assertEqual(table.schema.field("ad_id").type, pa.string())
+        self.assertEqual(table.schema.field("device_os").type, pa.string())
+        self.assertEqual(table.schema.field("created_at").type, pa.timestamp("ms"))
+        self.assertEqual(table.schema.field("invalid_identifier").type, pa.bool_())
+        self.assertEqual(json.loads(table.column("tags")[3].as_py()), {"level": "3"})
+
+        self.assertIs(to_arrow_table(table), table)
+        parquet = pq.read_table(io.BytesIO(serialise_data(data=table, fmt="parquet")))
+        self.assertEqual(parquet, table)
+        self.assertEqual(
+            len(json.loads(json.loads(serialise_data(table, "json")))), 1000
+        )
+
+    def test_partition_table(self):
+        """
+        Test if a table is split by the values of a column, keeping the order of the
+        rows, and if nulls and missing columns are partitions of their own.
+        """
+        rows = [*MOCK_ROWS, {**MOCK_ROWS[0], "device": None}]
+        partitions = partition_table(pa.Table.from_pylist(rows), "device")
+
+        self.assertEqual(list(partitions), ["mobile", "desktop", None])
+        for device, table in partitions.items():
+            self.assertEqual(
+                table.to_pylist(), [row for row in rows if row["device"] == device]
+            )
+        self.assertEqual(
+            list(partition_table(pa.Table.from_pylist(rows), "missing")), [None]
+        )
@@ -2,11 +2,16 @@
 Test turbo_stream.utils.date_handlers
 """
 import unittest
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 
 from dateutil.relativedelta import relativedelta
 
-from turbo_stream.utils.date_handlers import phrase_to_date, _is_integer, date_range
+from turbo_stream.utils.date_handlers import (
+    phrase_to_date,
+    _is_integer,
+    date_range,
+    plan_windows,
+)
 
 DATE_FORMAT = "%Y-%m-%d"
 
@@ -94,3 +99,64 @@ class TestDateHandlers(unittest.TestCase):
             date_list,
             ["2022-01-01", "2022-01-02", "2022-01-03", "2022-01-04", "2022-01-05"],
         )
+
+    def test_plan_windows(self):
+        """
+        Test if windows are aligned to calendar weeks and months, clipped to the range.
+        """
+        days = plan_windows("2022-01-30", "2022-02-02")
+        self.assertEqual(
+            [window.start_date for window in days],
+            ["2022-01-30", "2022-01-31", "2022-02-01", "2022-02-02"],
+        )
+        self.assertEqual(days[0].start, date(2022, 1, 30))
+
+        # 2022-01-03 is a Monday
+        weeks = plan_windows("2022-01-01", "2022-01-12", window="week")
+        self.assertEqual(
+            [(window.start_date, window.end_date) for window in weeks],
+            [
+                ("2022-01-01", "2022-01-02"),
+                ("2022-01-03", "2022-01-09"),
+                ("2022-01-10", "2022-01-12"),
+            ],
+        )
+
+        months = plan_windows("2022-01-15", "2022-03-03", window="month")
+        self.assertEqual(
+            [(window.start_date, window.end_date) for window in months],
+            [
+                ("2022-01-15", "2022-01-31"),
+                ("2022-02-01", "2022-02-28"),
+                ("2022-03-01", "2022-03-03"),
+            ],
+        )
+        self.assertEqual([window.days for window in months], [17, 28, 3])
+
+        custom = plan_windows("2022-01-01", "2022-01-07", window=timedelta(days=3))
+        self.assertEqual([window.days for window in custom], [3, 3, 1])
+
+        with self.assertRaises(ValueError):
+            plan_windows("2022-01-01", "2022-01-07", window="fortnight")
+
+    def test_plan_windows_reverse_completed(self):
+        """
+        Test if completed windows are skipped and the most recent window comes first.
+        """
+        windows = plan_windows(
+            "2022-01-01", "2022-01-05", reverse=True, completed={"2022-01-04"}
+        )
+        self.assertEqual(
+            [window.start_date for window in windows],
+            ["2022-01-05", "2022-01-03", "2022-01-02", "2022-01-01"],
+        )
+
+        windows = plan_windows(
+            "2022-01-01",
+            "2022-01-05",
+            completed=lambda window: window.start.day % 2 == 0,
+        )
+        self.assertEqual(
+            [window.start_date for window in windows],
+            ["2022-01-01", "2022-01-03", "2022-01-05"],
+        )
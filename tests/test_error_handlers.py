@@ -0,0 +1,90 @@
+"""
+Test turbo_stream.utils.error_handlers
+"""
+import json
+import time
+import unittest
+from socket import timeout
+
+import httplib2
+from googleapiclient.errors import HttpError
+
+from turbo_stream.utils.error_handlers import (
+    CLIENT_ERROR,
+    QUOTA_EXHAUSTED,
+    RATE_LIMITED,
+    SERVER_ERROR,
+    TRANSIENT,
+    CircuitBreaker,
+    CircuitOpenError,
+    classify_error,
+    retry_after,
+)
+
+
+def http_error(status: int, reasons=(), headers=None) -> HttpError:
+    """
+    Build a googleapiclient HttpError with the given status and error reasons.
+    """
+    response = httplib2.Response({"status": status, **(headers or {})})
+    content = json.dumps(
+        {
+            "error": {
+                "code": status,
+                "message": "error",
+                "errors": [{"reason": reason} for reason in reasons],
+            }
+        }
+    ).encode("utf-8")
+    return HttpError(response, content)
+
+
+class TestErrorHandlers(unittest.TestCase):
+    """
+    Test turbo_stream.utils.error_handlers
+    """
+
+    def test_classify_error(self):
+        """
+        Test the classification of google and network errors.
+        """
+        self.assertEqual(classify_error(http_error(429)), RATE_LIMITED)
+        self.assertEqual(
+            classify_error(http_error(403, ["userRateLimitExceeded"])), RATE_LIMITED
+        )
+        self.assertEqual(
+            classify_error(http_error(403, ["dailyLimitExceeded"])), QUOTA_EXHAUSTED
+        )
+        self.assertEqual(classify_error(http_error(403, ["forbidden"])), CLIENT_ERROR)
+        self.assertEqual(classify_error(http_error(400)), CLIENT_ERROR)
+        self.assertEqual(classify_error(http_error(503)), SERVER_ERROR)
+        self.assertEqual(classify_error(timeout()), TRANSIENT)
+
+    def test_retry_after(self):
+        """
+        Test if the Retry-After header is read in seconds.
+        """
+        self.assertEqual(retry_after(http_error(429, headers={"retry-after": "7"})), 7)
+        self.assertIsNone(retry_after(http_error(429)))
+        self.assertIsNone(retry_after(timeout()))
+
+    def test_circuit_breaker(self):
+        """
+        Test if the circuit opens, refuses calls, and closes after a good trial.
+        """
+        breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=0.1)
+        breaker.before_call()
+        breaker.record_failure()
+        breaker.before_call()
+        breaker.record_failure()
+        self.assertTrue(breaker.is_open)
+        with self.assertRaises(CircuitOpenError):
+            breaker.before_call()
+
+        time.sleep(0.15)
+        breaker.before_call()
+        with self.assertRaises(CircuitOpenError):
+            breaker.before_call()
+        breaker.record_success()
+        self.assertFalse(breaker.is_open)
+        breaker.before_call()
@@ -0,0 +1,172 @@
+"""
+Test turbo_stream.utils.flight_handlers
+"""
+import asyncio
+import threading
+import time
+import unittest
+
+import pytest
+
+from benchmarks.run_benchmarks import StandInGoogleAnalyticsReader
+from benchmarks.stand_in import StandInServer
+from turbo_stream.utils.flight_handlers import SingleFlight
+from turbo_stream.utils.rate_handlers import set_rate_limits
+
+
+class TestFlightHandlers(unittest.TestCase):
+    """
+    Test turbo_stream.utils.flight_handlers
+    """
+
+    def test_do(self):
+        """
+        Test if threads calling the same key at the same time share one call.
+        """
+        flight = SingleFlight()
+        calls = []
+
+        def function():
+            calls.append(1)
+            time.sleep(0.2)
+            return {"rows": []}
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(flight.do("key", function)))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(sorted(shared for _, shared in results), [False] + [True] * 4)
+        self.assertTrue(all(response is results[0][0] for response, _ in results))
+
+        # calls are only shared while in flight
+        flight.do("key", function)
+        self.assertEqual(len(calls), 2)
+
+    def test_do_error(self):
+        """
+        Test if every waiting thread raises the error of the shared call.
+        """
+        flight = SingleFlight()
+
+        def function():
+            time.sleep(0.2)
+            raise ConnectionError("upstream")
+
+        errors = []
+
+        def call():
+            try:
+                flight.do("key", function)
+            except ConnectionError as error:
+                errors.append(error)
+
+        threads = [threading.Thread(target=call) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(errors), 3)
+
+    def test_do_async(self):
+        """
+        Test if coroutines awaiting the same key at the same time share one call.
+        """
+        flight = SingleFlight()
+        calls = []
+
+        async def function():
+            calls.append(1)
+            await asyncio.sleep(0.1)
+            return {"rows": []}
+
+        async def run():
+            return await asyncio.gather(
+                *[flight.do_async("key", function) for _ in range(5)],
+                flight.do_async("other", function),
+            )
+
+        results = asyncio.run(run())
+        self.assertEqual(len(calls), 2)
+        self.assertEqual([shared for _, shared in results].count(True), 4)
+
+        async def failing():
+            raise ConnectionError("upstream")
+
+        with pytest.raises(ConnectionError):
+            asyncio.run(flight.do_async("key", failing))
+
+    def test_do_async_cancel_leader(self):
+        """
+        Test if cancelling the coroutine making a call leaves the waiting coroutines
+        to make the call again, rather than cancelling them too.
+        """
+        flight = SingleFlight()
+        calls = []
+
+        async def function():
+            calls.append(1)
+            await asyncio.sleep(0.1)
+            return {"rows": []}
+
+        async def run():
+            leader = asyncio.create_task(flight.do_async("key", function))
+            await asyncio.sleep(0.01)
+            waiters = [
+                asyncio.create_task(flight.do_async("key", function)) for _ in range(3)
+            ]
+            await asyncio.sleep(0.01)
+            leader.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await leader
+            return await asyncio.gather(*waiters)
+
+        results = asyncio.run(run())
+        self.assertEqual([response for response, _ in results], [{"rows": []}] * 3)
+        # the cancelled call, and a single call made again for the waiters
+        self.assertEqual(len(calls), 2)
+        self.assertEqual([shared for _, shared in results].count(True), 2)
+
+    def test_concurrent_readers(self):
+        """
+        Test if readers of the same view and dates send each request once.
+        """
+        set_rate_limits("google_analytics", qps=1e6, burst=1e6)
+        configuration = {
+            "start_date": "2022-01-01",
+            "end_date": "2022-01-03",
+            "view_ids": ["123456"],
+            "metrics": ["ga:users"],
+            "dimensions": ["ga:date"],
+        }
+        try:
+            with StandInServer(ga_rows=5, latency=0.2) as server:
+                readers = [
+                    StandInGoogleAnalyticsReader(
+                        configuration=configuration,
+                        credentials="",
+                        service_account_email="",
+                        root_url=server.url,
+                    )
+                    for _ in range(3)
+                ]
+                threads = [
+                    threading.Thread(target=reader.run_query) for reader in readers
+                ]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+        finally:
+            set_rate_limits("google_analytics")
+
+        self.assertEqual(server.request_counts["ga.batchGet"], 3)
+        for reader in readers:
+            self.assertEqual(len(reader._data_set), 15)
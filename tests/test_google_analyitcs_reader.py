@@ -1,13 +1,19 @@
 """
 Test turbo_stream.google_analytics.reader
 """
+import tempfile
 import unittest
 
 import OpenSSL
 import pytest
 from googleapiclient.discovery import build
+from moto import mock_s3
 
+from benchmarks.run_benchmarks import StandInGoogleAnalyticsReader
+from benchmarks.stand_in import StandInServer
 from turbo_stream.google_analyitcs.reader import GoogleAnalyticsReader
+from turbo_stream.utils.rate_handlers import set_rate_limits
+from turbo_stream.utils.state_handlers import StateStore
 
 
 class TestGoogleAnalyticsReader(unittest.TestCase):
@@ -54,9 +60,9 @@ class TestGoogleAnalyticsReader(unittest.TestCase):
         with pytest.raises(OpenSSL.crypto.Error):
             reader._get_service()
 
-    def test_iterate_report(self):
+    def test_decode_response(self):
         """
-        Test if iterator returns a refined dataset.
+        Test if a batchGet response is decoded into dataset rows.
         """
         reader = GoogleAnalyticsReader(
             credentials="tests/assets/mock_ga_creds.p12",
@@ -65,38 +71,40 @@ class TestGoogleAnalyticsReader(unittest.TestCase):
             intro_off=True,
         )
 
-        reader._iterate_report(
-            reports=[
-                {
-                    "columnHeader": {
-                        "dimensions": ["ga:date"],
-                        "metricHeader": {
-                            "metricHeaderEntries": [
-                                {"name": "ga:users", "type": "INTEGER"},
-                                {"name": "ga:sessions", "type": "INTEGER"},
-                            ]
+        dataset_rows = reader._decode_response(
+            response={
+                "reports": [
+                    {
+                        "columnHeader": {
+                            "dimensions": ["ga:date"],
+                            "metricHeader": {
+                                "metricHeaderEntries": [
+                                    {"name": "ga:users", "type": "INTEGER"},
+                                    {"name": "ga:sessions", "type": "INTEGER"},
+                                ]
+                            },
                         },
-                    },
-                    "data": {
-                        "rows": [
-                            {
-                                "dimensions": ["20010101"],
-                                "metrics": [{"values": ["1000", "1000"]}],
-                            }
-                        ],
-                        "totals": [{"values": ["1000", "1000"]}],
-                        "rowCount": 1,
-                        "minimums": [{"values": ["1000", "1000"]}],
-                        "maximums": [{"values": ["1000", "1000"]}],
-                        "dataLastRefreshed": "2001-01-01T01:01:01Z",
-                    },
-                }
-            ],
+                        "data": {
+                            "rows": [
+                                {
+                                    "dimensions": ["20010101"],
+                                    "metrics": [{"values": ["1000", "1000"]}],
+                                }
+                            ],
+                            "totals": [{"values": ["1000", "1000"]}],
+                            "rowCount": 1,
+                            "minimums": [{"values": ["1000", "1000"]}],
+                            "maximums": [{"values": ["1000", "1000"]}],
+                            "dataLastRefreshed": "2001-01-01T01:01:01Z",
+                        },
+                    }
+                ]
+            },
             view_id="0000",
         )
 
         self.assertEqual(
-            reader._data_set,
+            dataset_rows,
             [
                 {
                     "ga:date": "20010101",
@@ -134,3 +142,172 @@ class TestGoogleAnalyticsReader(unittest.TestCase):
 
         with pytest.raises(TypeError):
             reader.run_query()
+
+    def test_dry_run(self):
+        """
+        Test if the plan is deduplicated and its cost estimated without any request.
+        """
+        # estimate under the default limits of the reader
+        set_rate_limits("google_analytics")
+        reader = GoogleAnalyticsReader(
+            credentials="",
+            configuration={
+                "view_ids": ["123456", "123456", "654321"],
+                "start_date": "2022-01-01",
+                "end_date": "2022-01-20",
+                "metrics": ["ga:sessions"],
+                "dimensions": ["ga:date"],
+            },
+            service_account_email="",
+            intro_off=True,
+        )
+
+        plan = reader.compile_plan()
+        self.assertEqual(len(plan), 40)
+        self.assertEqual(plan[0].request["reportRequests"][0]["viewId"], "123456")
+        # the static fields are built once and shared by every request
+        self.assertIs(
+            plan[0].request["reportRequests"][0]["metrics"],
+            plan[-1].request["reportRequests"][0]["metrics"],
+        )
+        # the compiled requests are read only, so a unit can not change the next
+        with pytest.raises(TypeError):
+            plan[0].request["reportRequests"][0]["viewId"] = "654321"
+        with pytest.raises(TypeError):
+            plan[0].request["reportRequests"][0]["metrics"][0]["expression"] = "ga:x"
+        with pytest.raises(AttributeError):
+            plan[0].request["reportRequests"][0]["metrics"].append({})
+        self.assertEqual(
+            plan[1].request["reportRequests"][0]["metrics"],
+            ({"expression": "ga:sessions"},),
+        )
+        self.assertEqual(
+            reader._build_unit_request("123456", "2022-01-01")["reportRequests"][0][
+                "metrics"
+            ],
+            [{"expression": "ga:sessions"}],
+        )
+
+        estimate = reader.dry_run()
+        self.assertEqual(estimate["units"], 40)
+        self.assertEqual(estimate["requests"], 40)
+        self.assertEqual(estimate["budget_share"], 0.0008)
+        # 10 requests go out at once, the rest at one per second
+        self.assertEqual(estimate["estimated_seconds"], 30)
+
+    def test_run_budget(self):
+        """
+        Test if a truncated run gathers the newest dates, and the next run resumes.
+        """
+        set_rate_limits("google_analytics", qps=1e6, burst=1e6)
+        configuration = {
+            "start_date": "2022-01-01",
+            "end_date": "2022-01-10",
+            "view_ids": ["123456"],
+            "metrics": ["ga:users"],
+            "dimensions": ["ga:date"],
+        }
+        with tempfile.TemporaryDirectory() as directory:
+            state_store = StateStore(file_location=f"{directory}/state.jsonl")
+            try:
+                with StandInServer(ga_rows=1) as server:
+                    runs = []
+                    for max_requests in (4, None):
+                        reader = StandInGoogleAnalyticsReader(
+                            configuration=configuration,
+                            credentials="",
+                            service_account_email="",
+                            root_url=server.url,
+                            state_store=state_store,
+                            max_requests=max_requests,
+                        )
+                        dataset = reader.run_query()
+                        reader.commit_units()
+                        # planning after the run leaves the budget of the run as is
+                        reader.dry_run()
+                        runs.append(
+                            ([row["ga:date"] for row in dataset], reader.is_truncated())
+                        )
+            finally:
+                set_rate_limits("google_analytics")
+
+        self.assertEqual(
+            runs[0], (["20220110", "20220109", "20220108", "20220107"], True)
+        )
+        self.assertEqual(
+            runs[1], ([f"202201{day:02d}" for day in range(6, 0, -1)], False)
+        )
+        self.assertEqual(server.request_counts["ga.batchGet"], 10)
+
+    @mock_s3
+    def test_commit_after_write(self):
+        """
+        Test if gathered units are only recorded as complete once they are written.
+        """
+        set_rate_limits("google_analytics", qps=1e6, burst=1e6)
+        configuration = {
+            "start_date": "2022-01-01",
+            "end_date": "2022-01-02",
+            "view_ids": ["123456"],
+            "metrics": ["ga:users"],
+            "dimensions": ["ga:date"],
+        }
+        with tempfile.TemporaryDirectory() as directory:
+            state_store = StateStore(file_location=f"{directory}/state.jsonl")
+            try:
+                with StandInServer(ga_rows=1) as server:
+                    reader = StandInGoogleAnalyticsReader(
+                        configuration=configuration,
+                        credentials="",
+                        service_account_email="",
+                        root_url=server.url,
+                        state_store=state_store,
+                    )
+                    reader.run_query()
+                    with pytest.raises(Exception):
+                        # the bucket does not exist
+                        reader.write_partition_data_to_s3(
+                            bucket="test", path="path", partition="ga:date"
+                        )
+                    self.assertEqual(
+                        state_store.completed_units("StandInGoogleAnalyticsReader"), {}
+                    )
+
+                    reader.write_date_to_local(f"{directory}/data.json")
+            finally:
+                set_rate_limits("google_analytics")
+
+            self.assertEqual(
+                state_store.completed_units("StandInGoogleAnalyticsReader"),
+                {"123456": ["2022-01-01", "2022-01-02"]},
+            )
+
+    def test_stream_responses(self):
+        """
+        Test if streamed response bodies decode into the same dataset.
+        """
+        set_rate_limits("google_analytics", qps=1e6, burst=1e6)
+        configuration = {
+            "start_date": "2022-01-01",
+            "end_date": "2022-01-03",
+            "view_ids": ["123456"],
+            "metrics": ["ga:users", "ga:sessions"],
+            "dimensions": ["ga:date", "ga:pagePath"],
+        }
+        try:
+            with StandInServer(ga_rows=50) as server:
+                datasets = [
+                    StandInGoogleAnalyticsReader(
+                        configuration=configuration,
+                        credentials="",
+                        service_account_email="",
+                        root_url=server.url,
+                        stream_responses=stream_responses,
+                    ).run_query()
+                    for stream_responses in (False, True)
+                ]
+        finally:
+            set_rate_limits("google_analytics")
+
+        self.assertEqual(len(datasets[0]), 150)
+        self.assertEqual(datasets[1], datasets[0])
@@ -5,11 +5,15 @@ import os
 import unittest
 
 import OpenSSL
+import boto3
 import pytest
 from googleapiclient.discovery import build
 from moto import mock_s3
 
+from benchmarks.run_benchmarks import StandInGoogleSearchConsoleReader
+from benchmarks.stand_in import StandInServer
 from turbo_stream.google_search_console.reader import GoogleSearchConsoleReader
+from turbo_stream.utils.rate_handlers import set_rate_limits
 
 
 class TestGoogleSearchConsoleReader(unittest.TestCase):
@@ -125,3 +129,303 @@ class TestGoogleSearchConsoleReader(unittest.TestCase):
             reader.write_partition_data_to_s3(
                 bucket="my-bucket", path="path", partition="date"
             )
+
+    def test_run_query_batched(self):
+        """
+        Test if batched queries are demultiplexed per dimension, with failed
+        sub-requests sent again on their own.
+        """
+        set_rate_limits("google_search_console", qps=1e6, burst=1e6)
+        configuration = {
+            "start_date": "2022-01-01",
+            "end_date": "2022-01-03",
+            "site_url": "https://example.com/",
+            "dimensions": ["page", "query"],
+            "metrics": ["clicks"],
+            "row_limit": 10,
+        }
+        try:
+            with StandInServer(gsc_rows=25) as server:
+                sequential = StandInGoogleSearchConsoleReader(
+                    configuration=configuration, credentials="", root_url=server.url
+                ).run_query()
+
+            with StandInServer(
+                gsc_rows=25, rate_limit_error_rate=0.2, seed=3
+            ) as server:
+                reader = StandInGoogleSearchConsoleReader(
+                    configuration=configuration,
+                    credentials="",
+                    root_url=server.url,
+                    batch_size=4,
+                )
+                batched = reader.run_query()
+        finally:
+            set_rate_limits("google_search_console")
+
+        self.assertEqual(batched[0], sequential[0])
+        # 6 units of 3 pages in batches of 4 queries, along with the retried ones
+        self.assertEqual(server.request_counts["gsc.searchanalytics.query"], 18)
+        self.assertLess(server.request_counts["batch"], 18)
+        # failed queries follow the retry policy of the query endpoint
+        self.assertTrue(
+            any(
+                counter["name"] == "retries"
+                and counter["labels"]["endpoint"]
+                == "google_search_console.searchanalytics.query"
+                for counter in reader.get_metrics()["counters"]
+            )
+        )
+
+    def test_rollup_dimensions(self):
+        """
+        Test if per dimension rollups sum clicks and impressions, and weight positions.
+        """
+        reader = GoogleSearchConsoleReader(
+            credentials="tests/assets/mock_gsc_creds.pickle",
+            configuration={
+                "site_url": "https://example.com/",
+                "dimensions": ["country", "device"],
+                "metrics": ["clicks", "impressions", "ctr", "position"],
+                "combine_dimensions": True,
+            },
+        )
+        rows = [
+            {
+                "date": "2022-01-01",
+                "country": "a",
+                "device": "MOBILE",
+                "clicks": 1,
+                "impressions": 10,
+                "ctr": 0.1,
+                "position": 2.0,
+            },
+            {
+                "date": "2022-01-01",
+                "country": "a",
+                "device": "DESKTOP",
+                "clicks": 3,
+                "impressions": 30,
+                "ctr": 0.1,
+                "position": 6.0,
+            },
+            {
+                "date": "2022-01-01",
+                "country": "b",
+                "device": "MOBILE",
+                "clicks": 0,
+                "impressions": 5,
+                "ctr": 0.0,
+                "position": 1.0,
+            },
+        ]
+        rollups = reader._rollup_dimensions({"country+device": rows})
+
+        self.assertEqual(
+            rollups["country"],
+            [
+                {
+                    "site_url": "https://example.com/",
+                    "search_type": None,
+                    "date": "2022-01-01",
+                    "country": "a",
+                    "clicks": 4,
+                    "impressions": 40,
+                    "ctr": 0.1,
+                    "position": 5.0,
+                },
+                {
+                    "site_url": "https://example.com/",
+                    "search_type": None,
+                    "date": "2022-01-01",
+                    "country": "b",
+                    "clicks": 0,
+                    "impressions": 5,
+                    "ctr": 0.0,
+                    "position": 1.0,
+                },
+            ],
+        )
+        self.assertEqual(
+            [(row["device"], row["impressions"]) for row in rollups["device"]],
+            [("MOBILE", 15), ("DESKTOP", 30)],
+        )
+
+    def test_run_query_combined(self):
+        """
+        Test if combined mode produces every dimension from one query family.
+        """
+        set_rate_limits("google_search_console", qps=1e6, burst=1e6)
+        configuration = {
+            "start_date": "2022-01-01",
+            "end_date": "2022-01-02",
+            "site_url": "https://example.com/",
+            "dimensions": ["page", "query", "device", "country"],
+            "metrics": ["clicks", "impressions"],
+            "row_limit": 10,
+            "combine_dimensions": True,
+        }
+        try:
+            with StandInServer(gsc_rows=25) as server:
+                reader = StandInGoogleSearchConsoleReader(
+                    configuration=configuration, credentials="", root_url=server.url
+                )
+                data_set = reader.run_query()
+        finally:
+            set_rate_limits("google_search_console")
+
+        self.assertEqual(
+            {dimension: len(rows) for dimension, rows in data_set[0].items()},
+            {"page": 50, "query": 50, "device": 50, "country": 50},
+        )
+        self.assertEqual(
+            list(data_set[0]["device"][0]),
+            ["site_url", "search_type", "date", "device", "clicks", "impressions"],
+        )
+        # 3 pages and the final empty page per date, for device+country, page and
+        # query, rather than for each of the 4 dimensions
+        self.assertEqual(server.request_counts["gsc.searchanalytics.query"], 24)
+
+    def test_run_query_combined_matches(self):
+        """
+        Test if combined mode produces the same datasets as querying per dimension,
+        with the page and query queried on their own.
+        """
+        set_rate_limits("google_search_console", qps=1e6, burst=1e6)
+        configuration = {
+            "start_date": "2022-01-01",
+            "end_date": "2022-01-02",
+            "site_url": "https://example.com/",
+            "dimensions": ["page", "query", "device", "country"],
+            "metrics": ["clicks", "impressions", "ctr", "position"],
+            "row_limit": 10,
+        }
+        data_sets = []
+        try:
+            for combine_dimensions in (False, True):
+                with StandInServer(gsc_rows=25) as server:
+                    reader = StandInGoogleSearchConsoleReader(
+                        configuration={
+                            **configuration,
+                            "combine_dimensions": combine_dimensions,
+                        },
+                        credentials="",
+                        root_url=server.url,
+                    )
+                    data_sets.append(reader.run_query()[0])
+        finally:
+            set_rate_limits("google_search_console")
+
+        per_dimension, combined = data_sets
+        self.assertEqual(list(combined), list(per_dimension))
+        for dimension, rows in per_dimension.items():
+            key = lambda row, dimension=dimension: (row["date"], row[dimension])
+            self.assertEqual(
+                sorted(combined[dimension], key=key), sorted(rows, key=key)
+            )
+
+    def test_dry_run(self):
+        """
+        Test if the estimated requests match the requests of a run.
+        """
+        set_rate_limits("google_search_console", qps=1e6, burst=1e6)
+        configuration = {
+            "start_date": "2022-01-01",
+            "end_date": "2022-01-03",
+            "site_url": "https://example.com/",
+            "dimensions": ["page", "query"],
+            "metrics": ["clicks"],
+            "row_limit": 10,
+        }
+        try:
+            with StandInServer(gsc_rows=5) as server:
+                reader = StandInGoogleSearchConsoleReader(
+                    configuration=configuration, credentials="", root_url=server.url
+                )
+                estimate = reader.dry_run()
+                self.assertNotIn("gsc.searchanalytics.query", server.request_counts)
+                reader.run_query()
+        finally:
+            set_rate_limits("google_search_console")
+
+        self.assertEqual(estimate["units"], 6)
+        self.assertEqual(
+            estimate["requests"], server.request_counts["gsc.searchanalytics.query"]
+        )
+        self.assertEqual(estimate["estimated_seconds"], 0)
+
+    def test_stream_responses(self):
+        """
+        Test if streamed response bodies decode into the same dataset, one query at a
+        time and in batches.
+        """
+        set_rate_limits("google_search_console", qps=1e6, burst=1e6)
+        configuration = {
+            "start_date": "2022-01-01",
+            "end_date": "2022-01-02",
+            "site_url": "https://example.com/",
+            "dimensions": ["page", "query"],
+            "metrics": ["clicks", "impressions"],
+            "row_limit": 10,
+        }
+        try:
+            with StandInServer(gsc_rows=25) as server:
+                datasets = [
+                    StandInGoogleSearchConsoleReader(
+                        configuration=configuration,
+                        credentials="",
+                        root_url=server.url,
+                        batch_size=batch_size,
+                        stream_responses=stream_responses,
+                    ).run_query()
+                    for batch_size, stream_responses in (
+                        (1, False),
+                        (1, True),
+                        (4, True),
+                    )
+                ]
+        finally:
+            set_rate_limits("google_search_console")
+
+        self.assertEqual(len(datasets[0][0]["page"]), 50)
+        self.assertEqual(datasets[1], datasets[0])
+        self.assertEqual(datasets[2], datasets[0])
+
+    @mock_s3
+    def test_run_pipelined(self):
+        """
+        Test if combined units are rolled up per dimension as they are written.
+        """
+        set_rate_limits("google_search_console", qps=1e6, burst=1e6)
+        s3_client = boto3.client("s3", region_name="us-east-1")
+        s3_client.create_bucket(Bucket="my-bucket")
+        configuration = {
+            "start_date": "2022-01-01",
+            "end_date": "2022-01-02",
+            "site_url": "https://example.com/",
+            "dimensions": ["page", "query"],
+            "metrics": ["clicks", "impressions"],
+            "row_limit": 10,
+            "combine_dimensions": True,
+        }
+        try:
+            with StandInServer(gsc_rows=25) as server:
+                reader = StandInGoogleSearchConsoleReader(
+                    configuration=configuration, credentials="", root_url=server.url
+                )
+                reader.run_pipelined(bucket="my-bucket", path="path", partition="date")
+        finally:
+            set_rate_limits("google_search_console")
+
+        self.assertEqual(
+            sorted(
+                item["Key"]
+                for item in s3_client.list_objects_v2(Bucket="my-bucket")["Contents"]
+            ),
+            [
+                "path/2022-01-01_page.json",
+                "path/2022-01-01_query.json",
+                "path/2022-01-02_page.json",
+                "path/2022-01-02_query.json",
+            ],
+        )
@@ -0,0 +1,73 @@
+"""
+Test turbo_stream.utils.hook_handlers
+"""
+import unittest
+
+from turbo_stream import ReaderInterface
+from turbo_stream.utils.hook_handlers import (
+    ProfileHook,
+    SlowStageHook,
+    StageHook,
+    TracemallocHook,
+)
+
+
+class _RecordingHook(StageHook):
+    def __init__(self):
+        self.contexts = []
+
+    def before(self, context: dict) -> None:
+        self.contexts.append(("before", context["stage"], context["function"]))
+
+    def after(self, context: dict) -> None:
+        self.contexts.append(("after", context["size"], context["elapsed"] >= 0))
+
+
+class TestHookHandlers(unittest.TestCase):
+    """
+    Test turbo_stream.utils.hook_handlers
+    """
+
+    def setUp(self):
+        self.reader = ReaderInterface(configuration={}, credentials={}, intro_off=True)
+        self.reader._data_set = [
+            {"date": "2021-01-01", "value": 15},
+            {"date": "2021-01-02", "value": 16},
+        ]
+
+    def test_register_hook(self):
+        """
+        Test if registered hooks run around the partition stage.
+        """
+        hook = _RecordingHook()
+        self.reader.register_hook("partition", hook)
+        self.reader._partition_dataset("date")
+
+        self.assertEqual(
+            hook.contexts,
+            [("before", "partition", "_partition_dataset"), ("after", 2, True)],
+        )
+
+    def test_register_hook_stage(self):
+        """
+        Test if unknown stages are refused.
+        """
+        with self.assertRaises(ValueError):
+            self.reader.register_hook("unknown", StageHook())
+
+    def test_builtin_hooks(self):
+        """
+        Test if the built-in hooks run without interfering with the stage.
+        """
+        self.reader.register_hook("partition", ProfileHook(every=2))
+        self.reader.register_hook("partition", TracemallocHook())
+        self.reader.register_hook("partition", SlowStageHook(threshold=0))
+
+        with self.assertLogs(level="INFO") as logs:
+            self.reader._partition_dataset("date")
+            self.reader._partition_dataset("date")
+
+        output = "\n".join(logs.output)
+        self.assertEqual(output.count("Profile of _partition_dataset"), 1)
+        self.assertEqual(output.count("Memory of _partition_dataset"), 2)
+        self.assertEqual(output.count("Slow partition stage"), 2)
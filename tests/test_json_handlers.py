@@ -0,0 +1,74 @@
+"""
+Test turbo_stream.utils.json_handlers
+"""
+import json
+import unittest
+
+from turbo_stream.utils.json_handlers import raw_body, stream_json
+
+
+class TestJsonHandlers(unittest.TestCase):
+    """
+    Test turbo_stream.utils.json_handlers
+    """
+
+    def test_stream_json(self):
+        """
+        Test if streamed arrays are handed over one element at a time, along with the
+        objects holding them.
+        """
+        document = {
+            "reports": [
+                {
+                    "columnHeader": {"dimensions": ["ga:date"]},
+                    "data": {
+                        "rows": [{"a": 1}, {"a": [2, {"rows": 3}]}],
+                        "rowCount": 2,
+                    },
+                },
+                {"data": {"rows": []}},
+            ],
+            "nextPageToken": None,
+        }
+        items = []
+        response = stream_json(
+            json.dumps(document, indent=2).encode("utf-8"),
+            key="rows",
+            on_item=lambda item, parents: items.append(
+                (item, parents[-2]["columnHeader"])
+            ),
+        )
+
+        self.assertEqual(
+            items,
+            [
+                ({"a": 1}, {"dimensions": ["ga:date"]}),
+                ({"a": [2, {"rows": 3}]}, {"dimensions": ["ga:date"]}),
+            ],
+        )
+        self.assertEqual(response["reports"][0]["data"], {"rows": 2, "rowCount": 2})
+        self.assertEqual(response["reports"][1]["data"], {"rows": 0})
+        self.assertIsNone(response["nextPageToken"])
+
+    def test_stream_json_matches_json(self):
+        """
+        Test if documents without streamed arrays decode as the json module does.
+        """
+        for body in ('{"a": "\\u00e9", "b": [1.5, true, null, {}], "c": []}', " [] "):
+            self.assertEqual(
+                stream_json(body, key="rows", on_item=None), json.loads(body)
+            )
+
+    def test_stream_json_invalid(self):
+        """
+        Test if malformed documents raise a json decode error.
+        """
+        for body in ('{"rows": [1, 2', '{"rows": [1] "a": 1}', '{"a": 1} 2', "{1: 2}"):
+            with self.assertRaises(json.JSONDecodeError):
+                stream_json(body, key="rows", on_item=lambda item, parents: None)
+
+    def test_raw_body(self):
+        """
+        Test if the response body is returned undecoded.
+        """
+        self.assertEqual(raw_body(None, b'{"rows": []}'), '{"rows": []}')
@@ -0,0 +1,100 @@
+"""
+Test turbo_stream.utils.metrics_handlers
+"""
+import os
+import socket
+import tempfile
+import unittest
+
+import boto3
+from moto import mock_s3
+
+from turbo_stream import ReaderInterface
+from turbo_stream.utils.metrics_handlers import RunMetrics
+
+
+class TestMetricsHandlers(unittest.TestCase):
+    """
+    Test turbo_stream.utils.metrics_handlers
+    """
+
+    def test_summary(self):
+        """
+        Test if counters and histograms are summarised.
+        """
+        metrics = RunMetrics()
+        metrics.increment("rows", 10, stage="fetch")
+        metrics.increment("rows", 5, stage="fetch")
+        metrics.observe("request_latency_seconds", 0.2, vendor="test")
+        metrics.observe("request_latency_seconds", 3, vendor="test")
+
+        summary = metrics.summary()
+        self.assertEqual(
+            summary["counters"],
+            [{"name": "rows", "labels": {"stage": "fetch"}, "value": 15}],
+        )
+        histogram = summary["histograms"][0]
+        self.assertEqual(histogram["count"], 2)
+        self.assertEqual(histogram["max"], 3)
+        self.assertEqual(histogram["buckets"]["0.25"], 1)
+        self.assertEqual(histogram["buckets"]["+Inf"], 2)
+        self.assertGreater(summary["peak_rss_bytes"], 0)
+
+    def test_prometheus_textfile(self):
+        """
+        Test if the metrics are written in the Prometheus text format.
+        """
+        metrics = RunMetrics()
+        metrics.increment("rows", 10, stage="fetch")
+        with metrics.timer("serialisation_seconds", fmt="json"):
+            pass
+
+        with tempfile.TemporaryDirectory() as directory:
+            file_location = os.path.join(directory, "turbo_stream.prom")
+            metrics.write_prometheus_textfile(file_location)
+            with open(file_location, "r", encoding="utf-8") as file:
+                text = file.read()
+
+        self.assertIn('turbo_stream_rows_total{stage="fetch"} 10', text)
+        self.assertIn('turbo_stream_serialisation_seconds_count{fmt="json"} 1', text)
+        self.assertIn("# TYPE turbo_stream_serialisation_seconds histogram", text)
+
+    def test_statsd(self):
+        """
+        Test if the metrics are sent as StatsD gauges.
+        """
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as server:
+            server.bind(("127.0.0.1", 0))
+            server.settimeout(1)
+            metrics = RunMetrics()
+            metrics.increment("rows", 10, stage="fetch")
+            metrics.send_to_statsd(host="127.0.0.1", port=server.getsockname()[1])
+
+            lines = set()
+            try:
+                while True:
+                    lines.add(server.recv(1024).decode("utf-8"))
+            except socket.timeout:
+                pass
+
+        self.assertIn("turbo_stream.rows.fetch:10|g", lines)
+
+    @mock_s3
+    def test_reader_write_metrics(self):
+        """
+        Test if the reader records rows and bytes written to s3.
+        """
+        boto3.client("s3", region_name="us-east-1").create_bucket(Bucket="test")
+        reader = ReaderInterface(configuration={}, credentials={}, intro_off=True)
+        reader._data_set = [
+            {"date": "2021-01-01", "value": 15},
+            {"date": "2021-01-02", "value": 16},
+        ]
+        reader.write_partition_data_to_s3(bucket="test", path="test", partition="date")
+
+        counters = {
+            counter["name"]: counter["value"]
+            for counter in reader.get_metrics()["counters"]
+        }
+        self.assertEqual(counters["rows"], 2)
+        self.assertGreater(counters["bytes"], 0)
@@ -1,11 +1,20 @@
 """
 Test turbo_stream.onesignal.reader
 """
+import io
+import json
+import tempfile
 import unittest
+from datetime import datetime
 
+import boto3
+import pyarrow.parquet as pq
 import pytest
+from moto import mock_s3
 
+from benchmarks.stand_in import StandInServer
 from turbo_stream.onesignal.reader import OnesignalReader
+from turbo_stream.utils.rate_handlers import set_rate_limits
 
 
 class TestOnesignalReader(unittest.TestCase):
@@ -111,3 +120,77 @@ class TestOnesignalReader(unittest.TestCase):
 
         with pytest.raises(TypeError):
             reader.run_query()
+
+    @mock_s3
+    def test_arrow_csv_engine(self):
+        """
+        Test if the arrow engine decodes the csv export with the known column types,
+        as rows or as an Arrow table.
+        """
+        set_rate_limits("onesignal_csv_export", qps=1e6, burst=1e6)
+        try:
+            with tempfile.TemporaryDirectory() as directory, StandInServer(
+                onesignal_players=7
+            ) as server:
+                credentials = f"{directory}/onesignal_creds.yml"
+                with open(credentials, "w", encoding="utf-8") as file:
+                    file.write("app_id: test\napi_key: test\n")
+
+                def run(csv_output):
+                    reader = OnesignalReader(
+                        configuration={"endpoint": "csv_export"},
+                        credentials=credentials,
+                        base_url=f"{server.url}api/v1",
+                        intro_off=True,
+                        csv_engine="arrow",
+                        csv_output=csv_output,
+                    )
+                    reader.run_query()
+                    return reader
+
+                rows = run("records")._data_set
+                reader = run("arrow")
+                table = reader._data_set
+                reader.write_date_to_local(f"{directory}/players.json")
+                with open(f"{directory}/players.json", encoding="utf-8") as file:
+                    local_rows = json.load(file)
+        finally:
+            set_rate_limits("onesignal_csv_export")
+
+        self.assertEqual(len(rows), 7)
+        self.assertEqual(rows[1]["session_count"], 1)
+        self.assertEqual(rows[1]["last_active"], datetime(2022, 1, 1))
+        self.assertIs(rows[1]["invalid_identifier"], False)
+        self.assertEqual(table.to_pylist(), rows)
+        self.assertEqual(len(local_rows), 7)
+        self.assertEqual(local_rows[1]["last_active"], "2022-01-01T00:00:00.000")
+
+        # the table is partitioned as it is, rather than as rows
+        s3_client = boto3.client("s3", region_name="us-east-1")
+        s3_client.create_bucket(Bucket="my-bucket")
+        reader.write_partition_data_to_s3(
+            bucket="my-bucket", path="path", partition="device_type", fmt="parquet"
+        )
+        partitions = {
+            item["Key"]: pq.read_table(
+                io.BytesIO(
+                    s3_client.get_object(Bucket="my-bucket", Key=item["Key"])[
+                        "Body"
+                    ].read()
+                )
+            )
+            for item in s3_client.list_objects_v2(Bucket="my-bucket")["Contents"]
+        }
+        self.assertEqual(sorted(partitions), ["path/0.parquet", "path/1.parquet"])
+        self.assertEqual(partitions["path/0.parquet"].num_rows, 4)
+        self.assertEqual(
+            partitions["path/1.parquet"].column("device_type")[0].as_py(), 1
+        )
+
+        with pytest.raises(ValueError):
+            OnesignalReader(
+                configuration={"endpoint": "csv_export"},
+                credentials="tests/assets/mock_onesignal_creds.yml",
+                intro_off=True,
+                csv_output="arrow",
+            )
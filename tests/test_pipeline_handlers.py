@@ -0,0 +1,70 @@
+"""
+Test turbo_stream.utils.pipeline_handlers
+"""
+import threading
+import unittest
+
+import pytest
+
+from turbo_stream.utils.metrics_handlers import RunMetrics
+from turbo_stream.utils.pipeline_handlers import WritePipeline
+
+
+class TestPipelineHandlers(unittest.TestCase):
+    """
+    Test turbo_stream.utils.pipeline_handlers
+    """
+
+    def test_submit(self):
+        """
+        Test if every submitted unit is written before the pipeline closes.
+        """
+        written = []
+        with WritePipeline(write=lambda *unit: written.append(unit), writers=3) as pipe:
+            for index in range(20):
+                pipe.submit("entity", index)
+
+        self.assertEqual(pipe.submitted, 20)
+        self.assertEqual(sorted(written), [("entity", index) for index in range(20)])
+
+    def test_backpressure(self):
+        """
+        Test if submit blocks while the writers are behind.
+        """
+        release = threading.Event()
+        metrics = RunMetrics()
+        pipe = WritePipeline(
+            write=lambda unit: release.wait(), writers=1, max_queued=1, metrics=metrics
+        )
+        # one unit is being written and one waits on the queue
+        pipe.submit(1)
+        pipe.submit(2)
+
+        blocked = threading.Thread(target=pipe.submit, args=(3,))
+        blocked.start()
+        blocked.join(timeout=0.2)
+        self.assertTrue(blocked.is_alive())
+
+        release.set()
+        blocked.join()
+        pipe.close()
+        self.assertEqual(pipe.submitted, 3)
+        (blocked_seconds,) = [
+            counter["value"]
+            for counter in metrics.summary()["counters"]
+            if counter["name"] == "pipeline_blocked_seconds"
+        ]
+        self.assertGreater(blocked_seconds, 0.1)
+
+    def test_write_error(self):
+        """
+        Test if a failed write is raised to the fetching side.
+        """
+
+        def write(unit):
+            raise ValueError(f"Failed {unit}")
+
+        with pytest.raises(ValueError):
+            with WritePipeline(write=write, writers=2, max_queued=1) as pipe:
+                for index in range(10):
+                    pipe.submit(index)
@@ -0,0 +1,94 @@
+"""
+Test turbo_stream.utils.rate_handlers
+"""
+import threading
+import time
+import unittest
+
+from turbo_stream.utils.rate_handlers import (
+    QuotaExhaustedError,
+    RateLimiter,
+    credential_key,
+    get_rate_limiter,
+    set_rate_limits,
+)
+
+
+class TestRateHandlers(unittest.TestCase):
+    """
+    Test turbo_stream.utils.rate_handlers
+    """
+
+    def test_burst(self):
+        """
+        Test if requests within the burst go out without waiting.
+        """
+        limiter = RateLimiter(qps=1, burst=5)
+        started = time.monotonic()
+        for _ in range(5):
+            limiter.acquire()
+            limiter.release()
+        self.assertLess(time.monotonic() - started, 0.5)
+
+    def test_refill(self):
+        """
+        Test if requests wait for tokens once the bucket is empty.
+        """
+        limiter = RateLimiter(qps=20, burst=1)
+        limiter.acquire()
+        self.assertGreater(limiter.acquire(), 0.02)
+
+    def test_daily_budget(self):
+        """
+        Test if the daily budget raises once spent.
+        """
+        limiter = RateLimiter(qps=100, burst=10, daily_budget=2)
+        limiter.acquire()
+        limiter.acquire()
+        with self.assertRaises(QuotaExhaustedError):
+            limiter.acquire()
+
+    def test_tokens(self):
+        """
+        Test if a batch of requests spends a token and budget per request.
+        """
+        limiter = RateLimiter(qps=10, burst=4, daily_budget=6)
+        self.assertEqual(limiter.reserve(tokens=4), 0)
+        self.assertAlmostEqual(limiter.reserve(tokens=2), 0.2, places=2)
+        with self.assertRaises(QuotaExhaustedError):
+            limiter.reserve()
+
+    def test_max_concurrent(self):
+        """
+        Test if the concurrency cap holds requests until a slot is released.
+        """
+        limiter = RateLimiter(qps=100, burst=10, max_concurrent=1)
+        limiter.acquire()
+        acquired = threading.Event()
+
+        def _acquire():
+            with limiter:
+                acquired.set()
+
+        thread = threading.Thread(target=_acquire)
+        thread.start()
+        self.assertFalse(acquired.wait(0.1))
+        limiter.release()
+        self.assertTrue(acquired.wait(1))
+        thread.join()
+
+    def test_registry(self):
+        """
+        Test if limiters are shared per vendor and credential and can be configured.
+        """
+        key = credential_key("tests/assets/mock_ga_creds.p12")
+        limiter = get_rate_limiter("test_vendor", key, qps=1)
+        self.assertIs(limiter, get_rate_limiter("test_vendor", key, qps=1))
+        self.assertIsNot(limiter, get_rate_limiter("test_vendor", "other", qps=1))
+
+        set_rate_limits("test_vendor", qps=50)
+        self.assertEqual(get_rate_limiter("test_vendor", key, qps=1).qps, 50)
+
+        set_rate_limits("test_vendor", credential=key, qps=5)
+        self.assertEqual(get_rate_limiter("test_vendor", key, qps=1).qps, 5)
+        self.assertEqual(get_rate_limiter("test_vendor", "other", qps=1).qps, 50)
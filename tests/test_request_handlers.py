@@ -0,0 +1,264 @@
+"""
+Test turbo_stream.utils.request_handlers
+"""
+import asyncio
+import time
+import unittest
+from socket import timeout
+
+from turbo_stream.utils.error_handlers import CircuitOpenError
+from turbo_stream.utils.metrics_handlers import RunMetrics
+from turbo_stream.utils.request_handlers import (
+    backoff_delay,
+    handled_exceptions,
+    request_handler,
+    retry_handler,
+)
+from turbo_stream.utils.transport_handlers import google_api_errors
+from tests.test_error_handlers import http_error
+
+
+class _Reader:
+    _credentials = "test_request_handlers"
+
+    def __init__(self):
+        self.calls = 0
+
+    @request_handler(vendor="test_request_handler", qps=10, burst=3)
+    def query(self):
+        self.calls += 1
+        return self.calls
+
+
+class _FailingReader:
+    def __init__(self, errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    @retry_handler(
+        exceptions=google_api_errors,
+        total_tries=3,
+        initial_wait=0.01,
+        max_wait=0.01,
+        should_raise=True,
+        endpoint="test_retry_handler",
+        failure_threshold=100,
+    )
+    def query(self):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return "response"
+
+    @retry_handler(
+        exceptions=(timeout,),
+        total_tries=2,
+        initial_wait=0.01,
+        endpoint="test_retry_handler_circuit",
+        failure_threshold=2,
+        reset_timeout=60,
+    )
+    def query_circuit(self):
+        self.calls += 1
+        raise timeout()
+
+    @retry_handler(
+        exceptions=(timeout, Exception),
+        total_tries=1,
+        endpoint="test_retry_handler_trial",
+        failure_threshold=1,
+        reset_timeout=0.05,
+    )
+    def query_trial(self):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return "response"
+
+    @retry_handler(
+        exceptions=(timeout, Exception),
+        total_tries=3,
+        initial_wait=0.01,
+        max_wait=0.01,
+        should_raise=True,
+        endpoint="test_retry_handler_async",
+        failure_threshold=100,
+    )
+    @request_handler(vendor="test_request_handler_async", qps=10, burst=3)
+    async def query_async(self):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return "response"
+
+
+class _MeteredReader(_FailingReader):
+    def __init__(self, errors):
+        super().__init__(errors)
+        self._metrics = RunMetrics()
+
+    @retry_handler(
+        exceptions=(timeout,),
+        total_tries=3,
+        initial_wait=0.05,
+        backoff_factor=1,
+        max_wait=0.05,
+        endpoint="test_retry_handler_metered",
+        failure_threshold=100,
+    )
+    @request_handler(vendor="test_request_handler_metered", qps=1e6, burst=1e6)
+    def query(self):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return "response"
+
+
+class TestRequestHandlers(unittest.TestCase):
+    """
+    Test turbo_stream.utils.request_handlers
+    """
+
+    def test_request_handler(self):
+        """
+        Test if requests within the burst are not delayed, and later ones are paced.
+        """
+        reader = _Reader()
+        started = time.monotonic()
+        for _ in range(3):
+            reader.query()
+        self.assertLess(time.monotonic() - started, 0.05)
+
+        reader.query()
+        self.assertGreater(time.monotonic() - started, 0.05)
+        self.assertEqual(reader.calls, 4)
+
+    def test_retry_handler(self):
+        """
+        Test if retryable errors are retried until the request succeeds.
+        """
+        reader = _FailingReader([timeout(), http_error(503)])
+        self.assertEqual(reader.query(), "response")
+        self.assertEqual(reader.calls, 3)
+
+    def test_handled_exceptions(self):
+        """
+        Test if a callable giving the exceptions is only resolved once.
+        """
+        calls = []
+
+        def resolve():
+            calls.append(1)
+            return [timeout]
+
+        self.assertEqual(handled_exceptions(resolve), (timeout,))
+        self.assertEqual(handled_exceptions(resolve), (timeout,))
+        self.assertEqual(len(calls), 1)
+        self.assertIs(handled_exceptions(timeout), timeout)
+
+    def test_retry_handler_client_error(self):
+        """
+        Test if client errors are raised without retrying.
+        """
+        reader = _FailingReader([http_error(400)])
+        with self.assertRaises(Exception):
+            reader.query()
+        self.assertEqual(reader.calls, 1)
+
+    def test_retry_handler_exhausted(self):
+        """
+        Test if errors are raised once all tries are spent.
+        """
+        reader = _FailingReader([timeout(), timeout(), timeout()])
+        with self.assertRaises(Exception):
+            reader.query()
+        self.assertEqual(reader.calls, 3)
+
+    def test_retry_handler_circuit(self):
+        """
+        Test if the circuit breaker fails fast after repeated failures.
+        """
+        reader = _FailingReader([])
+        self.assertIsNone(reader.query_circuit())
+        with self.assertRaises(CircuitOpenError):
+            reader.query_circuit()
+        self.assertEqual(reader.calls, 2)
+
+    def test_retry_handler_trial(self):
+        """
+        Test if a half open trial ending on a client error, or on an unhandled
+        exception, does not leave the circuit open.
+        """
+        reader = _FailingReader([http_error(503), http_error(404)])
+        self.assertIsNone(reader.query_trial())
+        with self.assertRaises(CircuitOpenError):
+            reader.query_trial()
+
+        time.sleep(0.06)
+        self.assertIsNone(reader.query_trial())
+        self.assertEqual(reader.query_trial(), "response")
+
+        reader.errors = [http_error(503), KeyboardInterrupt()]
+        self.assertIsNone(reader.query_trial())
+        time.sleep(0.06)
+        with self.assertRaises(KeyboardInterrupt):
+            reader.query_trial()
+        self.assertEqual(reader.query_trial(), "response")
+
+    def test_backoff_delay(self):
+        """
+        Test if the Retry-After instruction is honoured up to max_wait.
+        """
+        error = http_error(429, headers={"retry-after": "3600"})
+        self.assertEqual(backoff_delay(error, tries=1, max_wait=5), 5)
+        self.assertEqual(backoff_delay(error, tries=1, max_wait=7200), 3600)
+
+    def test_rate_limit_per_try(self):
+        """
+        Test if every try takes a token from the rate limiter, with the retry_handler
+        placed above the request_handler.
+        """
+        reader = _MeteredReader([timeout(), timeout()])
+        self.assertEqual(reader.query(), "response")
+        self.assertEqual(reader._metrics.total("requests"), 3)
+
+    def test_latency_per_try(self):
+        """
+        Test if the request latency is observed for every try, leaving out the
+        backoff between tries.
+        """
+        reader = _MeteredReader([timeout(), timeout()])
+        reader.query()
+        (latency,) = [
+            histogram
+            for histogram in reader._metrics.summary()["histograms"]
+            if histogram["name"] == "request_latency_seconds"
+        ]
+        self.assertEqual(latency["count"], 3)
+        self.assertLess(latency["max"], 0.05)
+
+    def test_retry_handler_async(self):
+        """
+        Test if coroutines are rate limited and retried without blocking the loop.
+        """
+        reader = _FailingReader([timeout(), http_error(503)])
+
+        async def run():
+            ticks = 0
+
+            async def tick():
+                nonlocal ticks
+                while True:
+                    ticks += 1
+                    await asyncio.sleep(0)
+
+            ticker = asyncio.ensure_future(tick())
+            response = await reader.query_async()
+            ticker.cancel()
+            return response, ticks
+
+        response, ticks = asyncio.run(run())
+        self.assertEqual(response, "response")
+        self.assertEqual(reader.calls, 3)
+        # the loop kept running other tasks while waiting between tries
+        self.assertGreater(ticks, 1)
@@ -0,0 +1,53 @@
+"""
+Test turbo_stream.utils.serialise_handlers
+"""
+import unittest
+
+import pyarrow as pa
+
+from turbo_stream.utils.aws_handlers import serialise_data
+from turbo_stream.utils.serialise_handlers import (
+    serialise_partitions,
+    to_arrow_buffer,
+)
+
+MOCK_ROWS = [
+    {"date": "2021-01-01", "clicks": 1, "ctr": 0.5, "device": "mobile"},
+    {"date": "2021-01-02", "clicks": None, "ctr": 0.25, "page": "/"},
+]
+
+
+class TestSerialiseHandlers(unittest.TestCase):
+    """
+    Test turbo_stream.utils.serialise_handlers
+    """
+
+    def test_to_arrow_buffer(self):
+        """
+        Test if only rows that fit an Arrow table are encoded.
+        """
+        self.assertIsNotNone(to_arrow_buffer(MOCK_ROWS))
+        self.assertIsNone(to_arrow_buffer([{"value": 1}, {"value": "one"}]))
+        self.assertIsNone(to_arrow_buffer([{"value": None}]))
+        self.assertIsNone(to_arrow_buffer([]))
+        self.assertIsNone(to_arrow_buffer("text"))
+
+    def test_serialise_partitions(self):
+        """
+        Test if files serialised by the workers match those serialised in process.
+        """
+        files = {
+            "path/rows.json": MOCK_ROWS,
+            "path/rows.csv": MOCK_ROWS,
+            "path/rows.parquet": MOCK_ROWS,
+            "path/table.parquet": pa.Table.from_pylist(MOCK_ROWS),
+            "path/mixed.json": [{"value": 1}, {"value": "one"}],
+            "path/notes.txt": "text",
+        }
+        self.assertEqual(
+            list(serialise_partitions(files=files, workers=2)),
+            [
+                (key, serialise_data(data=data, fmt=key.split(".")[-1]))
+                for key, data in files.items()
+            ],
+        )
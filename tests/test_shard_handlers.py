@@ -0,0 +1,190 @@
+"""
+Test turbo_stream.utils.shard_handlers
+"""
+import json
+import tempfile
+import unittest
+from datetime import datetime
+
+import boto3
+import pytest
+from moto import mock_s3
+
+from benchmarks.run_benchmarks import StandInGoogleAnalyticsReader
+from benchmarks.stand_in import StandInServer
+from turbo_stream.onesignal.reader import OnesignalReader
+from turbo_stream.utils.rate_handlers import set_rate_limits
+from turbo_stream.utils.shard_handlers import shard_key, shard_of, verify_shards
+from turbo_stream.utils.state_handlers import StateStore
+
+CONFIGURATION = {
+    "start_date": "2022-01-01",
+    "end_date": "2022-01-10",
+    "view_ids": [123456, 654321],
+    "metrics": ["ga:users"],
+    "dimensions": ["ga:date"],
+}
+
+
+class TestShardHandlers(unittest.TestCase):
+    """
+    Test turbo_stream.utils.shard_handlers
+    """
+
+    def test_shard_of(self):
+        """
+        Test if units are assigned to a stable shard within the shard count.
+        """
+        shards = [shard_of("page", f"2022-01-{day:02d}", 4) for day in range(1, 29)]
+        self.assertEqual(
+            shards, [shard_of("page", f"2022-01-{day:02d}", 4) for day in range(1, 29)]
+        )
+        self.assertEqual(set(shards), {0, 1, 2, 3})
+
+    def test_shard_index(self):
+        """
+        Test if the shard index must fall within the shard count.
+        """
+        with pytest.raises(ValueError):
+            StandInGoogleAnalyticsReader(
+                configuration=CONFIGURATION,
+                credentials="",
+                service_account_email="",
+                root_url="",
+                shard_index=3,
+                shard_count=3,
+            )
+
+    def test_verify_shards(self):
+        """
+        Test if the shards gather disjoint units that cover the whole job.
+        """
+        set_rate_limits("google_analytics", qps=1e6, burst=1e6)
+        with tempfile.TemporaryDirectory() as directory:
+            state_stores = [
+                StateStore(file_location=f"{directory}/state_{index}.jsonl")
+                for index in range(3)
+            ]
+            row_counts = []
+            try:
+                with StandInServer(ga_rows=5) as server:
+                    for index, state_store in enumerate(state_stores[:2]):
+                        reader = StandInGoogleAnalyticsReader(
+                            configuration=CONFIGURATION,
+                            credentials="",
+                            service_account_email="",
+                            root_url=server.url,
+                            state_store=state_store,
+                            shard_index=index,
+                            shard_count=3,
+                        )
+                        row_counts.append(len(reader.run_query()))
+                        reader.commit_units()
+
+                    # the last shard has not run yet
+                    self.assertEqual(
+                        verify_shards(reader, state_stores),
+                        [
+                            (view_id, date)
+                            for view_id, date in reader._plan_units()
+                            if shard_of(view_id, date, 3) == 2
+                        ],
+                    )
+
+                    reader = StandInGoogleAnalyticsReader(
+                        configuration=CONFIGURATION,
+                        credentials="",
+                        service_account_email="",
+                        root_url=server.url,
+                        state_store=state_stores[2],
+                        shard_index=2,
+                        shard_count=3,
+                    )
+                    row_counts.append(len(reader.run_query()))
+                    reader.commit_units()
+            finally:
+                set_rate_limits("google_analytics")
+
+            self.assertEqual(verify_shards(reader, state_stores), [])
+            # 2 views of 10 days, of 5 rows each, without a unit gathered twice
+            self.assertEqual(sum(row_counts), 2 * 10 * 5)
+            self.assertEqual(server.request_counts["ga.batchGet"], 20)
+
+    def test_verify_shards_recent(self):
+        """
+        Test if units of today count as covered once recorded, and if readers that do
+        not plan their units can not be verified.
+        """
+        today = datetime.now().strftime("%Y-%m-%d")
+        reader = StandInGoogleAnalyticsReader(
+            configuration={**CONFIGURATION, "start_date": today, "end_date": today},
+            credentials="",
+            service_account_email="",
+            root_url="",
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            state_store = StateStore(file_location=f"{directory}/state.jsonl")
+            self.assertEqual(
+                verify_shards(reader, [state_store]),
+                [(123456, today), (654321, today)],
+            )
+            for view_id in CONFIGURATION["view_ids"]:
+                state_store.mark_complete(
+                    reader=reader.__class__.__name__, entity=view_id, date=today
+                )
+            self.assertEqual(verify_shards(reader, [state_store]), [])
+
+        onesignal_reader = OnesignalReader(
+            configuration={"endpoint": "csv_export"},
+            credentials="tests/assets/mock_onesignal_creds.yml",
+            intro_off=True,
+        )
+        self.assertIsNone(verify_shards(onesignal_reader, [state_store]))
+
+    def test_shard_key(self):
+        """
+        Test if the shard is added to keys only when the units are sharded.
+        """
+        self.assertEqual(shard_key("path/20220101.json", 0, 1), "path/20220101.json")
+        self.assertEqual(
+            shard_key("path/20220101.json", 1, 2), "path/20220101_shard-1-of-2.json"
+        )
+        self.assertEqual(shard_key("data", 0, 2), "data_shard-0-of-2")
+
+    @mock_s3
+    def test_shards_write_same_bucket(self):
+        """
+        Test if shards writing partitions to the same path keep every row.
+        """
+        s3_client = boto3.client("s3", region_name="us-east-1")
+        s3_client.create_bucket(Bucket="test")
+        set_rate_limits("google_analytics", qps=1e6, burst=1e6)
+        try:
+            with StandInServer(ga_rows=5) as server:
+                for index in range(2):
+                    reader = StandInGoogleAnalyticsReader(
+                        configuration=CONFIGURATION,
+                        credentials="",
+                        service_account_email="",
+                        root_url=server.url,
+                        shard_index=index,
+                        shard_count=2,
+                    )
+                    reader.run_query()
+                    reader.write_partition_data_to_s3(
+                        bucket="test", path="path", partition="ga:date"
+                    )
+        finally:
+            set_rate_limits("google_analytics")
+
+        rows = [
+            row
+            for item in s3_client.list_objects_v2(Bucket="test")["Contents"]
+            for row in json.loads(
+                json.loads(
+                    s3_client.get_object(Bucket="test", Key=item["Key"])["Body"].read()
+                )
+            )
+        ]
+        # 2 views of 10 days, of 5 rows each
+        self.assertEqual(len(rows), 2 * 10 * 5)
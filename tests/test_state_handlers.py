@@ -0,0 +1,99 @@
+"""
+Test turbo_stream.utils.state_handlers
+"""
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+import boto3
+from moto import mock_s3
+
+from turbo_stream import ReaderInterface
+from turbo_stream.utils.state_handlers import StateStore
+
+DATE_FORMAT = "%Y-%m-%d"
+
+
+class TestStateHandlers(unittest.TestCase):
+    """
+    Test turbo_stream.utils.state_handlers
+    """
+
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()
+        self.file_location = os.path.join(self._directory.name, "state.jsonl")
+
+    def tearDown(self):
+        self._directory.cleanup()
+
+    def test_mark_complete(self):
+        """
+        Test if a completed unit is recorded and reloaded from the manifest.
+        """
+        store = StateStore(file_location=self.file_location)
+        store.mark_complete(reader="Reader", entity=1234, date="2022-01-01")
+        self.assertTrue(store.is_complete("Reader", 1234, "2022-01-01"))
+        self.assertFalse(store.is_complete("Reader", 1234, "2022-01-02"))
+        self.assertFalse(store.is_complete("Other", 1234, "2022-01-01"))
+
+        reloaded = StateStore(file_location=self.file_location)
+        self.assertTrue(reloaded.is_complete("Reader", "1234", "2022-01-01"))
+        self.assertEqual(reloaded.completed_units("Reader"), {"1234": ["2022-01-01"]})
+
+    def test_mutable_lookback(self):
+        """
+        Test if units within the mutable lookback are never treated as complete.
+        """
+        store = StateStore(file_location=self.file_location)
+        recent = (datetime.now() - timedelta(days=2)).strftime(DATE_FORMAT)
+        store.mark_complete(reader="Reader", entity="page", date=recent)
+
+        self.assertTrue(store.is_complete("Reader", "page", recent, mutable_lookback=1))
+        self.assertFalse(
+            store.is_complete("Reader", "page", recent, mutable_lookback=3)
+        )
+
+    def test_save(self):
+        """
+        Test if saving compacts the manifest to one line per unit.
+        """
+        store = StateStore(file_location=self.file_location)
+        store.mark_complete(reader="Reader", entity="page", date="2022-01-01")
+        store.mark_complete(reader="Reader", entity="page", date="2022-01-01")
+        store.save()
+
+        with open(self.file_location, "r", encoding="utf-8") as file:
+            self.assertEqual(len(file.readlines()), 1)
+
+    @mock_s3
+    def test_save_to_s3(self):
+        """
+        Test if the manifest is mirrored to and loaded from s3.
+        """
+        boto3.client("s3", region_name="us-east-1").create_bucket(Bucket="state")
+        store = StateStore(file_location=self.file_location, bucket="state")
+        store.mark_complete(reader="Reader", entity="page", date="2022-01-01")
+        store.save()
+        os.remove(self.file_location)
+
+        reloaded = StateStore(file_location=self.file_location, bucket="state")
+        self.assertTrue(reloaded.is_complete("Reader", "page", "2022-01-01"))
+
+    def test_reader_units(self):
+        """
+        Test if the reader interface consults the state store.
+        """
+        store = StateStore(file_location=self.file_location)
+        reader = ReaderInterface(
+            configuration={}, credentials={}, state_store=store, intro_off=True
+        )
+        self.assertFalse(reader._is_unit_complete(entity="page", date="2022-01-01"))
+        reader._complete_unit(entity="page", date="2022-01-01")
+        # gathered units are only complete once the dataset is persisted
+        self.assertFalse(reader._is_unit_complete(entity="page", date="2022-01-01"))
+        reader.commit_units()
+        self.assertTrue(reader._is_unit_complete(entity="page", date="2022-01-01"))
+
+        stateless = ReaderInterface(configuration={}, credentials={}, intro_off=True)
+        self.assertFalse(stateless._is_unit_complete(entity="page", date="2022-01-01"))
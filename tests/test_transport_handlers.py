@@ -0,0 +1,177 @@
+"""
+Test turbo_stream.utils.transport_handlers
+"""
+import os
+import tempfile
+import threading
+import time
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+
+from oauth2client.client import OAuth2Credentials
+
+from benchmarks.stand_in import StandInServer
+from turbo_stream.utils import transport_handlers
+from turbo_stream.utils.transport_handlers import TokenCache, TransportPool
+
+
+def _credentials(server, access_token=None, token_expiry=None):
+    return OAuth2Credentials(
+        access_token=access_token,
+        client_id="client_id",
+        client_secret="client_secret",
+        refresh_token="refresh_token",
+        token_expiry=token_expiry,
+        token_uri=f"{server.url}token",
+        user_agent=None,
+    )
+
+
+class TestTransportHandlers(unittest.TestCase):
+    """
+    Test turbo_stream.utils.transport_handlers
+    """
+
+    def test_lease(self):
+        """
+        Test if concurrent leases get their own transport, which is reused afterwards.
+        """
+        pool = TransportPool(pool_size=2)
+        with pool.lease() as first, pool.lease() as second:
+            self.assertIsNot(first, second)
+        with pool.lease() as third:
+            self.assertIn(third, (first, second))
+
+    def test_pool_size(self):
+        """
+        Test if leases wait while every transport is in use.
+        """
+        pool = TransportPool(pool_size=1)
+        leased = threading.Event()
+
+        def lease():
+            with pool.lease():
+                leased.set()
+
+        with pool.lease():
+            thread = threading.Thread(target=lease)
+            thread.start()
+            self.assertFalse(leased.wait(0.1))
+        self.assertTrue(leased.wait(1))
+        thread.join()
+
+    def test_shared_token(self):
+        """
+        Test if the transports of a pool share a single token refresh.
+        """
+        with StandInServer() as server:
+            pool = TransportPool(
+                credentials=lambda: OAuth2Credentials(
+                    access_token=None,
+                    client_id="client_id",
+                    client_secret="client_secret",
+                    refresh_token="refresh_token",
+                    token_expiry=None,
+                    token_uri=f"{server.url}token",
+                    user_agent=None,
+                ),
+                pool_size=3,
+            )
+            with pool.lease() as first, pool.lease() as second, pool.lease() as third:
+                for http in (first, second, third):
+                    response, _ = http.request(f"{server.url}api/v1/notifications")
+                    self.assertEqual(response.status, 200)
+
+        self.assertEqual(server.request_counts["oauth.token"], 1)
+        self.assertEqual(server.request_counts["onesignal.notifications"], 3)
+
+    def test_token_cache(self):
+        """
+        Test if pools sharing a token cache, as separate runs would, exchange a
+        single token, and if expired tokens are refreshed rather than adopted.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            file_location = os.path.join(directory, "tokens.json")
+            with StandInServer() as server:
+                for _ in range(2):
+                    pool = TransportPool(
+                        # stale pickled credentials hold an expired token
+                        credentials=lambda: _credentials(
+                            server, "stale-token", datetime(2000, 1, 1)
+                        ),
+                        token_cache=TokenCache(file_location=file_location),
+                    )
+                    with pool.lease() as http:
+                        response, _ = http.request(f"{server.url}api/v1/notifications")
+                        self.assertEqual(response.status, 200)
+                        self.assertEqual(
+                            http.request.credentials.access_token, "stand-in-token-1"
+                        )
+                    pool.close()
+
+                self.assertEqual(server.request_counts["oauth.token"], 1)
+                self.assertEqual(oct(os.stat(file_location).st_mode & 0o777), "0o600")
+
+                cache = TokenCache(file_location=file_location)
+                key, _ = cache._read().popitem()  # pylint: disable=protected-access
+                self.assertEqual(cache.get(key)[0], "stand-in-token-1")
+                cache.put(key, "expired", datetime.utcnow() + timedelta(seconds=30))
+                self.assertIsNone(cache.get(key))
+
+    def test_refresh_ahead(self):
+        """
+        Test if tokens close to their expiry are refreshed in the background, and
+        handed to the transports leased afterwards.
+        """
+        with tempfile.TemporaryDirectory() as directory, StandInServer() as server:
+            pool = TransportPool(
+                credentials=lambda: _credentials(server),
+                pool_size=1,
+                # stand in tokens expire in an hour, so they are always refreshed
+                token_cache=TokenCache(
+                    file_location=os.path.join(directory, "tokens.json"),
+                    refresh_margin=3600,
+                ),
+            )
+            with mock.patch.object(transport_handlers, "_MIN_REFRESH_INTERVAL", 0.05):
+                with pool.lease() as http:
+                    http.request(f"{server.url}api/v1/notifications")
+
+                deadline = time.monotonic() + 5
+                while server.request_counts["oauth.token"] < 2:
+                    self.assertLess(time.monotonic(), deadline)
+                    time.sleep(0.05)
+                pool.close()
+
+            with pool.lease() as http:
+                self.assertNotEqual(
+                    http.request.credentials.access_token, "stand-in-token-1"
+                )
+
+    def test_refresh_idle(self):
+        """
+        Test if the background refresh stops once the pool is idle, and starts again
+        with the next lease.
+        """
+        with tempfile.TemporaryDirectory() as directory, StandInServer() as server:
+            pool = TransportPool(
+                credentials=lambda: _credentials(server),
+                pool_size=1,
+                token_cache=TokenCache(
+                    file_location=os.path.join(directory, "tokens.json")
+                ),
+            )
+            with mock.patch.multiple(
+                transport_handlers,
+                _MIN_REFRESH_INTERVAL=0.05,
+                _REFRESH_IDLE_TIMEOUT=0.1,
+            ):
+                for _ in range(2):
+                    with pool.lease():
+                        refresher = pool._refresher
+                        self.assertTrue(refresher.is_alive())
+                    refresher.join(timeout=5)
+                    self.assertFalse(refresher.is_alive())
+                    self.assertIsNone(pool._refresher)
+            pool.close()
@@ -1,6 +1,9 @@
 """
 Test turbo_stream.Reader
 """
+import asyncio
+import json
+import tempfile
 import unittest
 
 import botocore
@@ -8,7 +11,8 @@ import boto3
 import pytest
 from moto import mock_s3
 
-from turbo_stream import ReaderInterface
+from turbo_stream import AsyncReaderInterface, Batch, ReaderInterface
+from turbo_stream.utils.state_handlers import StateStore
 
 MOCK_PAYLOAD = {"key": "value"}
 S3_CLIENT = boto3.client("s3")
@@ -123,6 +127,63 @@ class TestTurboStream(unittest.TestCase):
                 bucket="test", path="test", partition="date"
             )
 
+    @mock_s3
+    def test_write_partition_data_to_s3_skip_unchanged(self):
+        """
+        Test if partitions already stored with the same content are not written again.
+        """
+        s3_client = boto3.client("s3", region_name="us-east-1")
+        s3_client.create_bucket(Bucket="test")
+        reader = ReaderInterface(configuration={}, credentials={}, intro_off=True)
+        reader._data_set = [
+            {"date": "2021-01-01", "value": 15},
+            {"date": "2021-01-02", "value": 16},
+        ]
+        self.assertEqual(
+            reader.write_partition_data_to_s3(
+                bucket="test", path="test", partition="date", skip_unchanged=True
+            ),
+            {"written": 2, "skipped": 0},
+        )
+        self.assertEqual(
+            reader.write_partition_data_to_s3(
+                bucket="test", path="test", partition="date", skip_unchanged=True
+            ),
+            {"written": 0, "skipped": 2},
+        )
+
+        reader._data_set[1]["value"] = 17
+        self.assertEqual(
+            reader.write_partition_data_to_s3(
+                bucket="test", path="test", partition="date", skip_unchanged=True
+            ),
+            {"written": 1, "skipped": 1},
+        )
+        body = s3_client.get_object(Bucket="test", Key="test/2021-01-02.json")["Body"]
+        self.assertEqual(
+            json.loads(json.loads(body.read())), [{"date": "2021-01-02", "value": 17}]
+        )
+
+    @mock_s3
+    def test_write_partition_data_to_s3_serialise_workers(self):
+        """
+        Test if partitions serialised in worker processes are written.
+        """
+        s3_client = boto3.client("s3", region_name="us-east-1")
+        s3_client.create_bucket(Bucket="test")
+        reader = ReaderInterface(
+            configuration={}, credentials={}, intro_off=True, serialise_workers=2
+        )
+        reader._data_set = [
+            {"date": f"2021-01-0{day}", "value": day} for day in range(1, 4)
+        ]
+        reader.write_partition_data_to_s3(
+            bucket="test", path="test", partition="date", fmt="csv"
+        )
+
+        body = s3_client.get_object(Bucket="test", Key="test/2021-01-03.csv")["Body"]
+        self.assertEqual(body.read(), b",date,value\n0,2021-01-03,3\n")
+
     @mock_s3
     def test_write_data_to_s3(self):
         """
@@ -137,3 +198,168 @@ class TestTurboStream(unittest.TestCase):
                 {"date": "2021-01-02", "value": 16},
             ]
             reader.write_data_to_s3(bucket="test", key="test.json")
+
+
+class _PipelinedReader(ReaderInterface):
+    def run_query(self):
+        for entity in ("a", "b"):
+            for date in ("2022-01-01", "2022-01-02"):
+                rows = [{"date": date, "entity": entity, "device": "mobile"}]
+                self._data_set.extend(rows)
+                self._complete_unit(entity=entity, date=date, rows=rows)
+        return self._data_set
+
+
+class TestRunPipelined(unittest.TestCase):
+    """
+    Test turbo_stream.ReaderInterface.run_pipelined
+    """
+
+    @mock_s3
+    def test_run_pipelined(self):
+        """
+        Test if every unit is written and only then recorded as complete.
+        """
+        s3_client = boto3.client("s3", region_name="us-east-1")
+        s3_client.create_bucket(Bucket="test")
+        with tempfile.TemporaryDirectory() as directory:
+            state_store = StateStore(file_location=f"{directory}/state.jsonl")
+            reader = _PipelinedReader(
+                configuration={}, credentials={}, state_store=state_store
+            )
+            data_set = reader.run_pipelined(
+                bucket="test", path="path", partition="date", writers=2, max_queued=1
+            )
+
+            self.assertEqual(len(data_set), 4)
+            self.assertEqual(
+                sorted(
+                    item["Key"]
+                    for item in s3_client.list_objects_v2(Bucket="test")["Contents"]
+                ),
+                [
+                    "path/2022-01-01_a.json",
+                    "path/2022-01-01_b.json",
+                    "path/2022-01-02_a.json",
+                    "path/2022-01-02_b.json",
+                ],
+            )
+            self.assertEqual(
+                state_store.completed_units("_PipelinedReader"),
+                {
+                    "a": ["2022-01-01", "2022-01-02"],
+                    "b": ["2022-01-01", "2022-01-02"],
+                },
+            )
+
+    @mock_s3
+    def test_run_pipelined_partition(self):
+        """
+        Test if units sharing a partition other than their date are not overwritten.
+        """
+        s3_client = boto3.client("s3", region_name="us-east-1")
+        s3_client.create_bucket(Bucket="test")
+        reader = _PipelinedReader(configuration={}, credentials={}, intro_off=True)
+        reader.run_pipelined(bucket="test", path="path", partition="device")
+
+        keys = sorted(
+            item["Key"] for item in s3_client.list_objects_v2(Bucket="test")["Contents"]
+        )
+        self.assertEqual(
+            keys,
+            [
+                "path/mobile_a_2022-01-01.json",
+                "path/mobile_a_2022-01-02.json",
+                "path/mobile_b_2022-01-01.json",
+                "path/mobile_b_2022-01-02.json",
+            ],
+        )
+        rows = [
+            row
+            for key in keys
+            for row in json.loads(
+                json.loads(s3_client.get_object(Bucket="test", Key=key)["Body"].read())
+            )
+        ]
+        self.assertEqual(len(rows), 4)
+
+    @mock_s3
+    def test_run_pipelined_write_error(self):
+        """
+        Test if units are not recorded as complete when writing fails.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            state_store = StateStore(file_location=f"{directory}/state.jsonl")
+            reader = _PipelinedReader(
+                configuration={}, credentials={}, state_store=state_store
+            )
+            with pytest.raises(Exception):
+                # the bucket does not exist
+                reader.run_pipelined(bucket="test", path="path", partition="date")
+            self.assertEqual(state_store.completed_units("_PipelinedReader"), {})
+
+
+class _AsyncReader(AsyncReaderInterface):
+    async def _fetch_unit(self, date):
+        # later dates finish first
+        await asyncio.sleep(0.01 * (3 - int(date[-1])))
+        return [{"date": date}]
+
+    async def stream(self):
+        units = [
+            {"date": date}
+            for date in ("2022-01-01", "2022-01-02", "2022-01-03")
+            if not self._is_unit_complete(entity="entity", date=date)
+        ]
+        async for unit, rows in self._ordered_gather(self._fetch_unit, units):
+            yield Batch(entity="entity", date=unit["date"], rows=rows)
+            self._complete_unit(entity="entity", date=unit["date"])
+
+
+class TestAsyncReaderInterface(unittest.TestCase):
+    """
+    Test turbo_stream.AsyncReaderInterface
+    """
+
+    def test_run_query(self):
+        """
+        Test if concurrently fetched batches are collected in order.
+        """
+        reader = _AsyncReader(configuration={}, credentials={}, intro_off=True)
+        self.assertEqual(
+            asyncio.run(reader.run_query()),
+            [{"date": "2022-01-01"}, {"date": "2022-01-02"}, {"date": "2022-01-03"}],
+        )
+
+    def test_stream_state(self):
+        """
+        Test if units are only completed once their batch has been consumed and
+        committed.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            state_store = StateStore(file_location=f"{directory}/state.jsonl")
+            reader = _AsyncReader(
+                configuration={}, credentials={}, state_store=state_store
+            )
+
+            async def consume_first():
+                async for batch in reader.stream():
+                    return batch
+
+            self.assertEqual(asyncio.run(consume_first()).date, "2022-01-01")
+            self.assertEqual(state_store.completed_units("_AsyncReader"), {})
+
+            self.assertEqual(
+                asyncio.run(reader.run_query()),
+                [
+                    {"date": "2022-01-01"},
+                    {"date": "2022-01-02"},
+                    {"date": "2022-01-03"},
+                ],
+            )
+            self.assertEqual(state_store.completed_units("_AsyncReader"), {})
+            reader.commit_units()
+            self.assertEqual(
+                state_store.completed_units("_AsyncReader"),
+                {"entity": ["2022-01-01", "2022-01-02", "2022-01-03"]},
+            )
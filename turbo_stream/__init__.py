@@ -2,11 +2,27 @@
 Turbo Stream Interfaces
 """
 
+import asyncio
 import logging
+import re
+import time
+from functools import partial
+from types import MappingProxyType
+from typing import NamedTuple
 
-from .utils.aws_handlers import write_file_to_s3
+from .utils.aws_handlers import list_etags, write_file_to_s3
+from .utils.dataset_handlers import CategoryPool, partition_table
+from .utils.date_handlers import plan_windows
 from .utils.file_handlers import write_file
+from .utils.hook_handlers import STAGES, stage_handler
+from .utils.metrics_handlers import RunMetrics
+from .utils.pipeline_handlers import WritePipeline
+from .utils.shard_handlers import shard_key, shard_of
 
+UNIT_ORDERS = ("newest_first", "oldest_first")
+
+# configured once for the package, heavy dependencies such as boto3, pandas and the
+# google clients are imported by the handlers and readers once they are first used
 logging.basicConfig(
     format="%(asctime)s %(name)-12s %(levelname)-8s %(message)s", level=logging.INFO
 )
@@ -24,6 +40,60 @@ class ReaderInterface:
 
         self.profile_name = kwargs.get("profile_name")
 
+        # optional persistent record of completed (entity, date) units, along with
+        # the number of recent days that are still subject to change by the vendor
+        self._state_store = kwargs.get("state_store")
+        self._mutable_lookback: int = kwargs.get("mutable_lookback", 0)
+        # units gathered but not yet persisted, recorded once written, see commit_units
+        self._fetched_units: list = []
+
+        # the shard of the units this reader gathers, see shard_handlers
+        self._shard_index: int = kwargs.get("shard_index", 0)
+        self._shard_count: int = kwargs.get("shard_count", 1)
+        if not 0 <= self._shard_index < self._shard_count:
+            raise ValueError(
+                f"Given shard_index: {self._shard_index} is not within "
+                f"shard_count: {self._shard_count}."
+            )
+
+        # optional on-disk cache serving repeated requests without calling the vendor
+        self._response_cache = kwargs.get("response_cache")
+
+        # run metrics recorded by the request handlers, readers and writers
+        self._metrics: RunMetrics = kwargs.get("metrics") or RunMetrics()
+
+        # worker processes serialising partitions, 1 serialises them in this process
+        self._serialise_workers: int = kwargs.get("serialise_workers", 1)
+
+        # the run budget, once spent the remaining units are left for the next run
+        self._max_runtime: float = kwargs.get("max_runtime")
+        self._max_requests: int = kwargs.get("max_requests")
+        self._budget_started: float = None
+        self._budget_requests: float = 0
+        self._truncated = False
+
+        # the order units are gathered in, the most recent dates first by default
+        self._unit_order: str = kwargs.get("unit_order", "newest_first")
+        if self._unit_order not in UNIT_ORDERS:
+            raise ValueError(
+                f"Given unit_order: {self._unit_order} is not supported. "
+                f"Try {', '.join(UNIT_ORDERS)}."
+            )
+
+        # one shared instance of each repeated dimension value, see CategoryPool
+        self._categories = CategoryPool(
+            max_categories=kwargs.get("max_categories", 1000)
+        )
+
+        # request templates compiled from the configuration, see _template
+        self._templates: dict = {}
+
+        # hooks run before and after each stage, keyed by stage name
+        self._hooks: dict = {}
+
+        # the write pipeline completed units are handed to during run_pipelined
+        self._pipeline: WritePipeline = None
+
         if not kwargs.get("intro_off", True):
             # A fun intro banner for the service log
             logging.info(
@@ -56,6 +126,19 @@ class ReaderInterface:
         """
         return self._credentials
 
+    def is_truncated(self) -> bool:
+        """
+        :return: Returns True when the last run stopped once its budget was spent.
+        """
+        return self._truncated
+
+    def get_metrics(self) -> dict:
+        """
+        :return: Returns a structured summary of the run metrics, such as request
+        latency, retries, backoff, rows and bytes per stage and peak memory.
+        """
+        return self._metrics.summary()
+
     def set_configuration(self, configuration: dict) -> None:
         """
         Set configuration object.
@@ -63,6 +146,7 @@ class ReaderInterface:
         :return: None
         """
         self._configuration = configuration
+        self._templates = {}
 
     def set_credentials(self, credentials: dict) -> None:
         """
@@ -72,6 +156,20 @@ class ReaderInterface:
         """
         self._credentials = credentials
 
+    def register_hook(self, stage: str, hook) -> None:
+        """
+        Register a hook to run around a stage of the reader.
+        Built-in hooks live in turbo_stream.utils.hook_handlers.
+        :param stage: One of fetch, decode, partition or write.
+        :param hook: Object with before(context) and after(context) methods.
+        :return: None
+        """
+        if stage not in STAGES:
+            raise ValueError(
+                f"Given stage: {stage} is not supported. Try {', '.join(STAGES)}."
+            )
+        self._hooks.setdefault(stage, []).append(hook)
+
     def _set_data_set(self, data_set: list) -> None:
         """
         Set whole dataset object, overwriting the original one.
@@ -88,17 +186,275 @@ class ReaderInterface:
         """
         self._data_set.append(row)
 
+    def _is_unit_complete(self, entity, date: str) -> bool:
+        """
+        Check the state store for a completed (entity, date) unit of this reader.
+        Units that fall within the mutable lookback are never treated as complete.
+        :param entity: The entity of the unit, such as a view_id or dimension.
+        :param date: The unit date formatted as '%Y-%m-%d'.
+        :return: True if the unit can be skipped.
+        """
+        if self._state_store is None:
+            return False
+
+        return self._state_store.is_complete(
+            reader=self.__class__.__name__,
+            entity=entity,
+            date=date,
+            mutable_lookback=self._mutable_lookback,
+        )
+
+    def _is_unit_in_shard(self, entity, date) -> bool:
+        """
+        Check if a unit belongs to the shard of this reader.
+        :param entity: The entity of the unit, such as a view_id or dimension.
+        :param date: The unit date, or any other key of the unit such as an offset.
+        :return: True if the unit is gathered by this reader.
+        """
+        if self._shard_count == 1:
+            return True
+        return (
+            shard_of(entity=entity, date=date, shard_count=self._shard_count)
+            == self._shard_index
+        )
+
+    def _shard_key(self, key: str) -> str:
+        """
+        Add the shard of this reader to an output key when the units are sharded,
+        see shard_key.
+        """
+        return shard_key(
+            key=key, shard_index=self._shard_index, shard_count=self._shard_count
+        )
+
+    def _plan_dates(self) -> list:
+        """
+        Plan a day for every date between the configured start_date and end_date.
+        :return: List of dates formatted as '%Y-%m-%d'.
+        """
+        return [
+            window.start_date
+            for window in plan_windows(
+                start_date=self._configuration.get("start_date"),
+                end_date=self._configuration.get("end_date"),
+            )
+        ]
+
+    def _plan_units(self) -> list:
+        """
+        Plan every (entity, date) unit of the query, across all shards.
+        :return: List of (entity, date) pairs.
+        """
+        raise NotImplementedError(
+            f"{self.__class__.__name__} does not plan its units ahead of the query."
+        )
+
+    def _pending_units(self) -> list:
+        """
+        Gather the pending units of a run, see _plan_pending_units. Gathering the
+        units starts the run budget, see _budget_spent.
+        :return: List of (entity, date) pairs.
+        """
+        self._start_budget()
+        return self._plan_pending_units()
+
+    def _plan_pending_units(self) -> list:
+        """
+        Gather the planned units of this shard that have not been completed yet,
+        without duplicates, in the unit_order of the reader, with no side effects on
+        the run, so it can also plan dry runs.
+        :return: List of (entity, date) pairs.
+        """
+        units = []
+        for entity, date in dict.fromkeys(self._plan_units()):
+            if not self._is_unit_in_shard(entity=entity, date=date):
+                continue
+            if self._is_unit_complete(entity=entity, date=date):
+                logging.info(f"Skipping completed date: {date} for entity: {entity}.")
+                continue
+            units.append((entity, date))
+
+        if self._unit_order == "newest_first":
+            # a stable sort keeps the entities of a date in the planned order
+            units.sort(key=lambda unit: unit[1], reverse=True)
+        return units
+
+    def _start_budget(self) -> None:
+        self._budget_started = time.monotonic()
+        self._budget_requests = self._metrics.total("requests")
+        self._truncated = False
+
+    def _budget_spent(self) -> bool:
+        """
+        Check the max_runtime and max_requests of the run before starting a unit.
+        Units in flight are finished, so a run can go over its budget by a unit.
+        :return: True once the budget is spent, the remaining units are then left
+        for the next run to resume.
+        """
+        if self._budget_started is None:
+            return False
+
+        reason = None
+        if (
+            self._max_runtime is not None
+            and time.monotonic() - self._budget_started >= self._max_runtime
+        ):
+            reason = "max_runtime"
+        elif (
+            self._max_requests is not None
+            and self._metrics.total("requests") - self._budget_requests
+            >= self._max_requests
+        ):
+            reason = "max_requests"
+
+        if reason is not None and not self._truncated:
+            self._truncated = True
+            self._metrics.increment("truncated_runs", reason=reason)
+            logging.warning(
+                f"{self.__class__.__name__} reached its {reason}, "
+                "leaving the remaining units for the next run."
+            )
+        return reason is not None
+
+    def _template(self, name: str, build) -> dict:
+        """
+        Gather the part of a request that only depends on the configuration, built
+        once and shared by every request, so it must not be modified.
+        :param name: The template name.
+        :param build: Function building the template from the configuration.
+        :return: The template.
+        """
+        if name not in self._templates:
+            self._templates[name] = build()
+        return self._templates[name]
+
+    def _build_unit_request(self, entity, date: str) -> dict:
+        """
+        Build the first request of a unit.
+        :param entity: The entity of the unit, such as a view_id or dimension.
+        :param date: The unit date formatted as '%Y-%m-%d'.
+        :return: The request body.
+        """
+        raise NotImplementedError
+
+    def _requests_per_unit(self) -> int:
+        """
+        :return: The fewest requests a unit costs, see dry_run.
+        """
+        return 1
+
+    def compile_plan(self) -> tuple:
+        """
+        Compile the configuration into the requests this reader will make, one per
+        pending unit of its shard, see _plan_pending_units. The requests are read only,
+        see _freeze, so changing one can not change another, nor the next run.
+        :return: Tuple of PlannedRequest.
+        """
+        memo = {}
+        return tuple(
+            PlannedRequest(
+                entity=entity,
+                date=date,
+                request=_freeze(
+                    self._build_unit_request(entity=entity, date=date), memo
+                ),
+            )
+            for entity, date in self._plan_pending_units()
+        )
+
+    def dry_run(self) -> dict:
+        """
+        Estimate the cost of running the query without making any request.
+        Requests are counted from the compiled plan, where paged units cost a request
+        for every further page of rows, and the duration is the time the rate limiter
+        of the reader spaces those requests over, ignoring the request latency.
+        :return: The units, requests, daily budget share and estimated seconds.
+        """
+        plan = self.compile_plan()
+        limiter = self._query_handler.rate_limiter(self)  # pylint: disable=no-member
+        requests = len(plan) * self._requests_per_unit()
+
+        estimate = {
+            "units": len(plan),
+            "requests": requests,
+            "qps": limiter.qps,
+            "burst": limiter.burst,
+            "daily_budget": limiter.daily_budget,
+            "budget_share": None,
+            "estimated_seconds": round(
+                max(requests - limiter.burst, 0) / limiter.qps, 2
+            ),
+        }
+        if limiter.daily_budget:
+            estimate["budget_share"] = round(requests / limiter.daily_budget, 4)
+
+        logging.info(
+            f"Dry run of {self.__class__.__name__}: {requests} requests for "
+            f"{len(plan)} units, taking at least {estimate['estimated_seconds']} seconds."
+        )
+        return estimate
+
+    def _complete_unit(self, entity, date: str, rows: list = None) -> None:
+        """
+        Note a successfully gathered (entity, date) unit, which is recorded in the
+        state store once the dataset has been written, see commit_units.
+        During run_pipelined a unit given with its rows is queued for writing instead,
+        and only recorded once it has been written.
+        :param entity: The entity of the unit, such as a view_id or dimension.
+        :param date: The unit date formatted as '%Y-%m-%d'.
+        :param rows: The rows gathered for the unit.
+        :return: None
+        """
+        if self._pipeline is not None and rows is not None:
+            self._pipeline.submit(entity, date, rows)
+            return
+        self._fetched_units.append((entity, date))
+
+    def _record_unit(self, entity, date: str) -> None:
+        """
+        Record a written (entity, date) unit as complete in the state store.
+        """
+        if self._state_store is not None:
+            self._state_store.mark_complete(
+                reader=self.__class__.__name__, entity=entity, date=date
+            )
+
+    def commit_units(self) -> None:
+        """
+        Record the units gathered since the last commit as complete in the state
+        store, so the next run skips them. The write methods commit once the dataset
+        is written, call this after persisting the dataset any other way, such as
+        the batches of a stream. Units that are never committed are gathered again.
+        :return: None
+        """
+        units, self._fetched_units = self._fetched_units, []
+        for entity, date in units:
+            self._record_unit(entity=entity, date=date)
+        self._save_state()
+
+    def _save_state(self) -> None:
+        """
+        Compact and mirror the state store once a run is complete.
+        :return: None
+        """
+        if self._state_store is not None:
+            self._state_store.save()
+
+    @stage_handler("partition")
     def _partition_dataset(self, partition: str, dataset=None) -> dict:
         """
         Returns an object where the data is sorted by the keys as partitions, and
         the values relating to the given keys. THe partitions are essentially fields in
         the dataset that become prtitioned within the data.
+        Arrow table datasets are split into tables, see partition_table.
         :param partition: The field name in the dataset what will become the partition.
         :return: Partitioned object.
         """
         # provide the option to modify the class method write object
         if dataset is None:
             dataset = self._data_set
+        if hasattr(dataset, "to_pandas"):
+            return partition_table(table=dataset, partition=partition)
 
         partition_dataset = {}
         for row in dataset:
@@ -109,38 +465,210 @@ class ReaderInterface:
 
         return partition_dataset
 
-    def write_partition_data_to_s3(
-        self, bucket: str, path: str, partition: str, fmt="json"
+    @stage_handler("write")
+    def _write_file_to_s3(
+        self, bucket: str, key: str, data, etags: dict = None, body=None
     ):
+        """
+        Writes a file to s3 with the reader profile, recording the run metrics.
+        :param bucket: The bucket to write to in s3.
+        :param key: The key path and filename where the data will be stored.
+        :param data: The data object to be written.
+        :param etags: Optional stored ETags, unchanged files are not written.
+        :param body: Optional body the data has already been serialised to.
+        :return: The put response, or None when the upload was skipped.
+        """
+        return write_file_to_s3(
+            bucket=bucket,
+            key=key,
+            data=data,
+            profile_name=self.profile_name,
+            metrics=self._metrics,
+            etags=etags,
+            body=body,
+        )
+
+    def _write_files_to_s3(
+        self, bucket: str, path: str, files: dict, skip_unchanged: bool = False
+    ) -> dict:
+        """
+        Writes files to s3 under a path.
+        With the serialise_workers kwarg above 1 the files are serialised across worker
+        processes, handed over as Arrow buffers, while this process uploads them.
+        With skip_unchanged the objects under the path are listed once, and files
+        whose serialised bytes match the stored ETag are not uploaded again.
+        :param bucket: The bucket to write to in s3.
+        :param path: The path in the bucket every key starts with.
+        :param files: The data objects to be written, keyed by key.
+        :param skip_unchanged: Only upload files that changed.
+        :return: The number of written and skipped files.
+        """
+        etags = None
+        if skip_unchanged:
+            etags = list_etags(
+                bucket=bucket, prefix=f"{path}/", profile_name=self.profile_name
+            )
+
+        if self._serialise_workers > 1 and len(files) > 1:
+            # pylint: disable=import-outside-toplevel
+            from .utils.serialise_handlers import serialise_partitions
+
+            bodies = serialise_partitions(files=files, workers=self._serialise_workers)
+        else:
+            bodies = ((key, None) for key in files)
+
+        counts = {"written": 0, "skipped": 0}
+        for key, body in bodies:
+            response = self._write_file_to_s3(
+                bucket=bucket, key=key, data=files[key], etags=etags, body=body
+            )
+            if response is None and etags is not None:
+                counts["skipped"] += 1
+            else:
+                counts["written"] += 1
+
+        logging.info(
+            f"Written {counts['written']} and skipped {counts['skipped']} unchanged "
+            f"files to s3://{bucket}/{path}."
+        )
+        return counts
+
+    def write_partition_data_to_s3(
+        self, bucket: str, path: str, partition: str, fmt="json", skip_unchanged=False
+    ) -> dict:
         """
         Writes a file to s3, partitioned by a given field in the dataset.
         Json objects will be serialised before writing. This works best with date fields
         where the use-case would be to reduce duplicates stored in s3.
         Specifying the file type in the name will serialise the data.Supported formats are
         Json, CSV, Parquet and Text.
+        With skip_unchanged, partitions already stored with the same content are not
+        uploaded again, which saves the PUT and any s3 event it would trigger.
+        With shard_count above 1 the shard is added to each key, see shard_key.
         :param bucket: The bucket to write to in s3.
         :param path: The path in the bucket where the partition file will be written.
         :param partition: The field name in the dataset what will become the partition.
         :param fmt: The format to write in.
-        :return: The partitioned dataset object
+        :param skip_unchanged: Only upload partitions that changed.
+        :return: The number of written and skipped partitions.
         """
         partition_dataset = self._partition_dataset(partition=partition)
-        for partition_name, partition_data in partition_dataset.items():
-            write_file_to_s3(
-                bucket=bucket, key=f"{path}/{partition_name}.{fmt}", data=partition_data
+        counts = self._write_files_to_s3(
+            bucket=bucket,
+            path=path,
+            files={
+                self._shard_key(f"{path}/{partition_name}.{fmt}"): partition_data
+                for partition_name, partition_data in partition_dataset.items()
+            },
+            skip_unchanged=skip_unchanged,
+        )
+        self.commit_units()
+        return counts
+
+    def _unit_datasets(self, entity, rows: list) -> dict:
+        """
+        Split the rows of a completed unit into the datasets written by run_pipelined.
+        :param entity: The entity of the unit, such as a view_id or dimension.
+        :param rows: The rows gathered for the unit.
+        :return: Rows keyed by the name the dataset is written under.
+        """
+        return {entity: rows}
+
+    @staticmethod
+    def _unit_key(path: str, partition_name, name, date: str, fmt) -> str:
+        """
+        Build the key a partition of a unit is written to by run_pipelined.
+        Partitions other than the unit date, such as a device, hold rows of many
+        units, so the unit date is added to keep every unit in its own file.
+        """
+        if re.sub(r"\D", "", str(partition_name)) == re.sub(r"\D", "", str(date)):
+            return f"{path}/{partition_name}_{name}.{fmt}"
+        return f"{path}/{partition_name}_{name}_{date}.{fmt}"
+
+    def _write_unit(
+        self, entity, date: str, rows: list, bucket: str, path: str, partition: str, fmt
+    ) -> None:
+        """
+        Partition and write the rows of a completed unit, then record it as complete.
+        Runs on the writer threads of run_pipelined.
+        """
+        for name, dataset in self._unit_datasets(entity=entity, rows=rows).items():
+            partition_dataset = self._partition_dataset(
+                partition=partition, dataset=dataset
+            )
+            for partition_name, partition_data in partition_dataset.items():
+                self._write_file_to_s3(
+                    bucket=bucket,
+                    key=self._unit_key(path, partition_name, name, date, fmt),
+                    data=partition_data,
+                )
+        self._record_unit(entity=entity, date=date)
+
+    def run_pipelined(
+        self,
+        bucket: str,
+        path: str,
+        partition: str,
+        fmt="json",
+        writers: int = 2,
+        max_queued: int = 4,
+    ):
+        """
+        Run the query while writing each completed (entity, date) unit to s3, so
+        uploads overlap with fetching rather than following it. Units wait on a bounded
+        queue, fetching blocks while max_queued units are waiting to be written.
+        Each unit is partitioned and written to {path}/{partition_name}_{entity}.{fmt},
+        so units of different entities sharing a partition do not overwrite each other.
+        Partitions other than the unit date are written to
+        {path}/{partition_name}_{entity}_{date}.{fmt}, so units of different dates do
+        not overwrite each other either. Unlike write_partition_data_to_s3, the files
+        hold a single unit each, and so always carry the entity.
+        Readers that do not gather by unit write once the query is complete, as with
+        write_partition_data_to_s3.
+        :param bucket: The bucket to write to in s3.
+        :param path: The path in the bucket where the partition files will be written.
+        :param partition: The field name in the dataset what will become the partition.
+        :param fmt: The format to write in.
+        :param writers: The number of writer threads.
+        :param max_queued: The number of completed units that can wait to be written.
+        :return: The response dataset.
+        """
+        write = partial(
+            self._write_unit, bucket=bucket, path=path, partition=partition, fmt=fmt
+        )
+        try:
+            with WritePipeline(
+                write=write,
+                writers=writers,
+                max_queued=max_queued,
+                metrics=self._metrics,
+            ) as pipeline:
+                self._pipeline = pipeline
+                self.run_query()
+        finally:
+            self._pipeline = None
+            # units written after run_query saved the state are only recorded now
+            self._save_state()
+
+        if not pipeline.submitted:
+            self.write_partition_data_to_s3(
+                bucket=bucket, path=path, partition=partition, fmt=fmt
             )
+        return self._data_set
 
     def write_data_to_s3(self, bucket: str, key: str):
         """
         Writes a file to s3. Json objects will be serialised before writing.
         Specifying the file type in the name will serialise the data.Supported formats are
         Json, CSV, Parquet and Text.
+        With shard_count above 1 the shard is added to the key, see shard_key.
         :param bucket: The bucket to write to in s3.
         :param key: The key path and filename where the data will be stored.
         """
-        write_file_to_s3(
-            bucket=bucket, key=key, data=self._data_set, profile_name=self.profile_name
+        self._write_file_to_s3(
+            bucket=bucket, key=self._shard_key(key), data=self._data_set
         )
+        self.commit_units()
 
     def write_date_to_local(self, file_location):
         """
@@ -148,4 +676,127 @@ class ReaderInterface:
         :param file_location: Local file location.
         """
         logging.info(f"Writing data to local path: {file_location}.")
-        write_file(data=self._data_set, file_location=file_location)
+        with self._metrics.timer("local_write_seconds"):
+            write_file(data=self._data_set, file_location=file_location)
+        self.commit_units()
+
+
+# returned for units that were not started once the run budget was spent
+_SKIPPED = object()
+
+
+def _freeze(value, memo: dict):
+    """
+    Make a request of a compiled plan read only, dicts become read only mappings and
+    lists become tuples. Parts shared by the requests, such as the request templates,
+    are frozen once and stay shared.
+    :param value: The request, or a part of it.
+    :param memo: The frozen parts by id, holding the parts so their ids are not reused.
+    :return: The read only value.
+    """
+    if id(value) in memo:
+        return memo[id(value)][1]
+    if isinstance(value, dict):
+        frozen = MappingProxyType(
+            {key: _freeze(item, memo) for key, item in value.items()}
+        )
+    elif isinstance(value, (list, tuple)):
+        frozen = tuple(_freeze(item, memo) for item in value)
+    else:
+        return value
+    memo[id(value)] = (value, frozen)
+    return frozen
+
+
+class PlannedRequest(NamedTuple):
+    """
+    A request of a compiled plan, see ReaderInterface.compile_plan.
+    """
+
+    entity: object
+    date: str
+    request: MappingProxyType
+
+
+class Batch(NamedTuple):
+    """
+    A unit of data streamed by an AsyncReaderInterface.
+    """
+
+    entity: object
+    date: str
+    rows: list
+
+
+class AsyncReaderInterface(ReaderInterface):
+    """
+    Turbo Stream asyncio Reader Class Interface
+    Readers implement stream(), an async generator of Batch objects, so that many
+    readers can share one event loop. Up to the concurrency kwarg units of a reader
+    are fetched at a time, batches are still yielded in order.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._concurrency: int = kwargs.get("concurrency", 10)
+
+    async def stream(self):
+        """
+        Stream the reader data one Batch at a time.
+        A unit is recorded as complete once the consumer asks for the next batch.
+        """
+        raise NotImplementedError
+        yield  # pylint: disable=unreachable
+
+    def _collect_batch(self, batch: Batch) -> None:
+        """
+        Add a streamed batch to the dataset object.
+        :param batch: The batch yielded by stream.
+        :return: None
+        """
+        self._data_set.extend(batch.rows)
+
+    async def run_query(self):
+        """
+        Gather every batch of the stream into the dataset object.
+        :return: The response dataset.
+        """
+        async for batch in self.stream():
+            self._collect_batch(batch)
+
+        self._save_state()
+        logging.info(f"{self.__class__.__name__} process complete!")
+        return self._data_set
+
+    async def _run_blocking(self, function, *args, **kwargs):
+        """
+        Run a blocking function in the default executor, keeping the event loop free.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, partial(function, *args, **kwargs))
+
+    async def _ordered_gather(self, function, units: list):
+        """
+        Run a coroutine function for each unit of kwargs, at most the reader concurrency
+        at a time, yielding (unit, result) in the order of the units.
+        Once the run budget is spent no further units are started.
+        """
+        semaphore = asyncio.Semaphore(self._concurrency)
+
+        async def bounded(unit):
+            async with semaphore:
+                if self._budget_spent():
+                    return _SKIPPED
+                return await function(**unit)
+
+        tasks = [asyncio.ensure_future(bounded(unit)) for unit in units]
+        try:
+            for unit, task in zip(units, tasks):
+                result = await task
+                if result is _SKIPPED:
+                    return
+                yield unit, result
+        finally:
+            # the consumer stopped early or a unit failed
+            for task in tasks:
+                task.cancel()
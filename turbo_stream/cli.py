@@ -0,0 +1,217 @@
+"""
+Turbo Stream Command Line Interface
+Runs the jobs of a yaml manifest through the JobScheduler:
+
+    turbo-stream jobs.yml
+
+    workers: 8                  # jobs run at a time
+    vendor_concurrency:         # optional jobs run at a time per vendor
+      google_analytics: 2
+    credential_concurrency: 1   # optional jobs run at a time per credential
+    state_store:                # optional StateStore shared by every job
+      file_location: state.jsonl
+    response_cache:             # optional ResponseCache shared by every job
+      directory: .turbo_stream_cache
+    token_cache:                # optional TokenCache shared by every job and run
+      file_location: .turbo_stream_tokens.json
+    shard_count: 1              # optional shards every job is split into
+    shard_index: 0              # the shard run on this node
+    jobs:
+      - name: ga_daily
+        reader: google_analytics  # or package.module:ReaderClass
+        priority: 10
+        configuration: ga_config.yml
+        credentials: ga_credentials.p12
+        options:                # reader kwargs
+          service_account_email: reader@project.iam.gserviceaccount.com
+        write:                  # a write method of the reader and its arguments
+          method: write_partition_data_to_s3
+          bucket: my-bucket
+          path: google_analytics
+          partition: ga:date
+"""
+import argparse
+import importlib
+import json
+import logging
+import sys
+
+from turbo_stream.utils.file_handlers import load_file
+from turbo_stream.utils.rate_handlers import credential_key
+from turbo_stream.utils.schedule_handlers import Job, JobScheduler
+
+# readers by manifest name, imported once a job uses them
+READERS = {
+    "google_analytics": "turbo_stream.google_analyitcs.reader:GoogleAnalyticsReader",
+    "google_search_console": (
+        "turbo_stream.google_search_console.reader:GoogleSearchConsoleReader"
+    ),
+    "onesignal": "turbo_stream.onesignal.reader:OnesignalReader",
+}
+
+WRITE_METHODS = (
+    "write_partition_data_to_s3",
+    "write_data_to_s3",
+    "write_date_to_local",
+    "run_pipelined",
+)
+
+
+def _load(value):
+    """
+    Load a manifest value given either inline or as a path to a yaml or json file.
+    """
+    if isinstance(value, str) and value.split(".")[-1] in ("yaml", "yml", "json"):
+        return load_file(file_location=value, fmt=value.split(".")[-1])
+    return value
+
+
+def import_reader(reader: str):
+    """
+    :param reader: A name in READERS, or a package.module:ReaderClass path.
+    :return: The reader class.
+    """
+    path = READERS.get(reader, reader)
+    if ":" not in path:
+        raise ValueError(
+            f"Given reader: {reader} is not supported. "
+            f"Try {', '.join(READERS)} or package.module:ReaderClass."
+        )
+    module, name = path.split(":")
+    return getattr(importlib.import_module(module), name)
+
+
+def run_job(job: dict, **shared):
+    """
+    Build the reader of a manifest job, run its query and write the data.
+    :param job: The manifest job.
+    :param shared: Reader kwargs shared by every job, such as the state_store.
+    :return: The return value of the write method, if any.
+    """
+    reader_class = import_reader(job["reader"])
+    reader = reader_class(
+        configuration=_load(job.get("configuration", {})),
+        credentials=job.get("credentials"),
+        **{**shared, **job.get("options", {})},
+    )
+
+    write = dict(job.get("write") or {})
+    method = write.pop("method", None)
+    if method is not None and method not in WRITE_METHODS:
+        raise ValueError(
+            f"Given write method: {method} is not supported. "
+            f"Try {', '.join(WRITE_METHODS)}."
+        )
+
+    # run_pipelined runs the query itself
+    if method != "run_pipelined":
+        reader.run_query()
+    if method is None:
+        return None
+    result = getattr(reader, method)(**write)
+    # the dataset is returned by run_pipelined, keep only the write counts
+    return None if method == "run_pipelined" else result
+
+
+def build_jobs(manifest: dict) -> list:
+    """
+    Build a Job for each job of a manifest.
+    :param manifest: The loaded manifest.
+    :return: List of Job objects.
+    """
+    shared = {}
+    if manifest.get("state_store") is not None:
+        # pylint: disable=import-outside-toplevel
+        from turbo_stream.utils.state_handlers import StateStore
+
+        shared["state_store"] = StateStore(**manifest["state_store"])
+    if manifest.get("response_cache") is not None:
+        # pylint: disable=import-outside-toplevel
+        from turbo_stream.utils.cache_handlers import ResponseCache
+
+        shared["response_cache"] = ResponseCache(**manifest["response_cache"])
+    if manifest.get("token_cache") is not None:
+        # pylint: disable=import-outside-toplevel
+        from turbo_stream.utils.transport_handlers import TokenCache
+
+        shared["token_cache"] = TokenCache(**manifest["token_cache"])
+    for key in ("shard_index", "shard_count"):
+        if manifest.get(key) is not None:
+            shared[key] = manifest[key]
+
+    jobs = []
+    names = set()
+    for index, job in enumerate(manifest.get("jobs", [])):
+        name = job.get("name", f"job-{index}")
+        if name in names:
+            raise ValueError(f"Job name: {name} is used more than once.")
+        names.add(name)
+
+        jobs.append(
+            Job(
+                name=name,
+                function=lambda job=job: run_job(job, **shared),
+                vendor=job["reader"],
+                credential=credential_key(job.get("credentials")),
+                priority=job.get("priority", 0),
+            )
+        )
+    return jobs
+
+
+def run_manifest(manifest: dict) -> dict:
+    """
+    Run every job of a manifest.
+    :param manifest: The loaded manifest.
+    :return: The status of each job, keyed by name, see JobScheduler.run.
+    """
+    scheduler = JobScheduler(
+        workers=manifest.get("workers", 4),
+        vendor_limits=manifest.get("vendor_concurrency"),
+        credential_limit=manifest.get("credential_concurrency"),
+    )
+    return scheduler.run(build_jobs(manifest))
+
+
+def main(argv=None) -> int:
+    """
+    Parse arguments and run the manifest.
+    :return: Exit code, 1 when any job failed.
+    """
+    parser = argparse.ArgumentParser(
+        prog="turbo-stream", description="Run the jobs of a yaml manifest."
+    )
+    parser.add_argument("manifest", help="Path to the yaml or json manifest.")
+    parser.add_argument("--workers", type=int, help="Override the manifest workers.")
+    parser.add_argument(
+        "--jobs", nargs="+", help="Only run the named jobs of the manifest."
+    )
+    parser.add_argument("--shard-index", type=int, help="The shard run on this node.")
+    parser.add_argument(
+        "--shard-count", type=int, help="The shards jobs are split into."
+    )
+    parser.add_argument("--output", help="Write the job statuses to a json file.")
+    args = parser.parse_args(argv)
+
+    manifest = _load(args.manifest)
+    for key in ("workers", "shard_index", "shard_count"):
+        if getattr(args, key) is not None:
+            manifest[key] = getattr(args, key)
+    if args.jobs:
+        manifest["jobs"] = [
+            job for job in manifest.get("jobs", []) if job.get("name") in args.jobs
+        ]
+
+    results = run_manifest(manifest)
+    failed = [name for name, result in results.items() if result["status"] == "failed"]
+    logging.info(f"{len(results) - len(failed)} of {len(results)} jobs succeeded.")
+    if failed:
+        logging.error(f"Failed jobs: {', '.join(failed)}.")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2, default=str)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+"""
+Google Analytics v4 Core Reporting API, asyncio
+"""
+import logging
+
+
+from turbo_stream import AsyncReaderInterface, Batch
+from turbo_stream.google_analyitcs.reader import GoogleAnalyticsReader
+from turbo_stream.utils.cache_handlers import cache_handler
+from turbo_stream.utils.flight_handlers import coalesce_handler
+from turbo_stream.utils.hook_handlers import stage_handler
+from turbo_stream.utils.json_handlers import raw_body
+from turbo_stream.utils.request_handlers import request_handler, retry_handler
+from turbo_stream.utils.transport_handlers import google_api_errors
+
+
+class AsyncGoogleAnalyticsReader(AsyncReaderInterface, GoogleAnalyticsReader):
+    """
+    Google Analytics v4 Core Reporting API Reader for asyncio.
+    The google client is blocking, so requests are executed in the default executor
+    on a transport leased from the reader pool, while rate limiting and retries wait
+    on the loop.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._service = None
+
+    def _execute(self, view_id, date) -> dict:
+        """
+        Execute a batchGet request on a leased transport.
+        """
+        response = self._service.reports().batchGet(
+            body=self._build_request(view_id=view_id, date=date)
+        )
+        if self._stream_responses:
+            response.postproc = raw_body
+        with self._transport_pool.lease() as http:
+            return response.execute(http=http)
+
+    @stage_handler("fetch")
+    @cache_handler(api="google_analytics", key_builder="_cache_key")
+    @coalesce_handler(api="google_analytics", key_builder="_cache_key")
+    @retry_handler(
+        exceptions=google_api_errors,
+        total_tries=5,
+        initial_wait=2,
+        backoff_factor=4,
+        max_wait=300,
+        should_raise=True,
+        endpoint="google_analytics.reports.batchGet",
+    )
+    @request_handler(
+        vendor="google_analytics",
+        qps=1,
+        burst=10,
+        max_concurrent=10,
+        daily_budget=50000,
+    )
+    async def _async_query_handler(self, view_id, date):
+        """
+        Separated query coroutine to handle retry and delay methods.
+        """
+        logging.info(f"Querying at date: {date}.")
+        return await self._run_blocking(self._execute, view_id=view_id, date=date)
+
+    async def _fetch_unit(self, view_id, date) -> list:
+        response = await self._async_query_handler(view_id=view_id, date=date)
+        return self._decode_response(response=response, view_id=view_id)
+
+    async def stream(self):
+        """
+        Stream a Batch of rows per (view_id, date), see GoogleAnalyticsReader.run_query.
+        """
+        if self._service is None:
+            self._service = await self._run_blocking(self._get_service)
+
+        units = [
+            {"view_id": view_id, "date": date}
+            for view_id, date in self._pending_units()
+        ]
+
+        async for unit, rows in self._ordered_gather(self._fetch_unit, units):
+            yield Batch(entity=unit["view_id"], date=unit["date"], rows=rows)
+            self._complete_unit(entity=unit["view_id"], date=unit["date"])
@@ -3,19 +3,15 @@ Google Analytics v4 Core Reporting API
 """
 import json
 import logging
-from socket import timeout
 
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
-from oauth2client.service_account import ServiceAccountCredentials
 
 from turbo_stream import ReaderInterface
-from turbo_stream.utils.date_handlers import phrase_to_date, date_range
+from turbo_stream.utils.cache_handlers import cache_handler
+from turbo_stream.utils.flight_handlers import coalesce_handler
+from turbo_stream.utils.hook_handlers import stage_handler
+from turbo_stream.utils.json_handlers import raw_body, stream_json
 from turbo_stream.utils.request_handlers import request_handler, retry_handler
-
-logging.basicConfig(
-    format="%(asctime)s %(name)-12s %(levelname)-8s %(message)s", level=logging.INFO
-)
+from turbo_stream.utils.transport_handlers import TransportPool, google_api_errors
 
 
 class GoogleAnalyticsReader(ReaderInterface):
@@ -30,7 +26,10 @@ class GoogleAnalyticsReader(ReaderInterface):
         service_account_email: str,
         **kwargs,
     ):
-        super().__init__(configuration, credentials)
+        super().__init__(configuration, credentials, **kwargs)
+
+        # google analytics data is subject to change for up to 48 hours
+        self._mutable_lookback = kwargs.get("mutable_lookback", 2)
 
         # google analytics expects a path to a .p12 file
         self._credentials = credentials
@@ -40,36 +39,52 @@ class GoogleAnalyticsReader(ReaderInterface):
             "scopes", ["https://www.googleapis.com/auth/analytics.readonly"]
         )
 
-    def _get_service(self) -> build:
+        # decode the rows of each response body one at a time, see _decode_response
+        self._stream_responses: bool = kwargs.get("stream_responses", False)
+
+        # requests lease an authorised transport, so they can be run concurrently,
+        # with an optional TokenCache their token is shared across processes and runs
+        self._transport_pool: TransportPool = kwargs.get("transport_pool")
+        if self._transport_pool is None:
+            self._transport_pool = TransportPool(
+                credentials=self._get_credentials,
+                pool_size=kwargs.get("pool_size", 10),
+                token_cache=kwargs.get("token_cache"),
+            )
+
+    def _get_credentials(self):
         """
-        Get a service that communicates to the Google v4 Core Reporting API.
+        Load the service account credentials from the .p12 file.
         """
-        credentials = ServiceAccountCredentials.from_p12_keyfile(
+        # pylint: disable=import-outside-toplevel
+        from oauth2client.service_account import ServiceAccountCredentials
+
+        return ServiceAccountCredentials.from_p12_keyfile(
             filename=self._credentials,
             scopes=self.scopes,
             service_account_email=self.service_account_email,
         )
-        return build(
-            serviceName="analytics",
-            version="v4",
-            credentials=credentials,
-            cache_discovery=False,
-            discoveryServiceUrl="https://analyticsreporting.googleapis.com/$discovery/rest",
-        )
 
-    @request_handler(wait=1, backoff_factor=0.5)
-    @retry_handler(
-        exceptions=(timeout, HttpError),
-        total_tries=5,
-        initial_wait=60,
-        backoff_factor=5,
-    )
-    def _query_handler(self, view_id, service, date):
+    def _get_service(self):
         """
-        Separated query method to handle retry and delay methods.
+        Get a service that communicates to the Google v4 Core Reporting API.
         """
-        logging.info(f"Querying at date: {date}.")
+        # pylint: disable=import-outside-toplevel
+        from googleapiclient.discovery import build
+
+        with self._transport_pool.lease() as http:
+            return build(
+                serviceName="analytics",
+                version="v4",
+                http=http,
+                cache_discovery=False,
+                discoveryServiceUrl="https://analyticsreporting.googleapis.com/$discovery/rest",
+            )
 
+    def _report_template(self) -> dict:
+        """
+        Build the fields of a report request that are the same for every view and date.
+        """
         metrics_set = []
         for metric in self._configuration.get("metrics", []):
             metrics_set.append({"expression": metric})
@@ -78,78 +93,200 @@ class GoogleAnalyticsReader(ReaderInterface):
         for dimension in self._configuration.get("dimensions", []):
             dimensions_set.append({"name": dimension})
 
+        return {
+            "metrics": metrics_set,
+            "dimensions": dimensions_set,
+            "metricFilterClauses": self._configuration.get("metric_filter_clauses", []),
+            "dimensionFilterClauses": self._configuration.get(
+                "dimension_filter_clauses", []
+            ),
+            "filtersExpression": self._configuration.get("filters_expression"),
+            "segments": self._configuration.get("segments"),
+            "pivots": self._configuration.get("pivots"),
+            "orderBys": self._configuration.get("order_bys", []),
+            "samplingLevel": self._configuration.get("sampling_level", "LARGE"),
+            "includeEmptyRows": self._configuration.get("include_empty_rows", True),
+            "hideTotals": self._configuration.get("hide_totals", False),
+            "hideValueRanges": self._configuration.get("hide_value_ranges", False),
+        }
+
+    def _build_request(self, view_id, date) -> dict:
+        """
+        Build the batchGet request body for a single view_id and date.
+        """
+        return {
+            "reportRequests": [
+                {
+                    "viewId": view_id,
+                    "dateRanges": [{"startDate": date, "endDate": date}],
+                    **self._template("report", self._report_template),
+                },
+            ],
+            "useResourceQuotas": self._configuration.get("use_resource_quotas"),
+        }
+
+    def _build_unit_request(self, entity, date: str) -> dict:
+        return self._build_request(view_id=entity, date=date)
+
+    def _plan_units(self) -> list:
+        """
+        Plan a (view_id, date) unit for every view and date of the configuration.
+        """
+        dates = self._plan_dates()
+        return [
+            (view_id, date)
+            for view_id in self._configuration.get("view_ids")
+            for date in dates
+        ]
+
+    def _cache_key(self, view_id, service=None, date=None) -> dict:
+        """
+        Describe a query for the response cache.
+        """
+        return {
+            "entity": view_id,
+            "request": self._build_request(view_id=view_id, date=date),
+            "date": date,
+        }
+
+    @stage_handler("fetch")
+    @cache_handler(api="google_analytics", key_builder="_cache_key")
+    @coalesce_handler(api="google_analytics", key_builder="_cache_key")
+    @retry_handler(
+        exceptions=google_api_errors,
+        total_tries=5,
+        initial_wait=2,
+        backoff_factor=4,
+        max_wait=300,
+        should_raise=True,
+        endpoint="google_analytics.reports.batchGet",
+    )
+    # reporting api v4: 100 requests per 100 seconds per user, 10 concurrent
+    # requests per view and 50,000 requests per project per day
+    @request_handler(
+        vendor="google_analytics",
+        qps=1,
+        burst=10,
+        max_concurrent=10,
+        daily_budget=50000,
+    )
+    def _query_handler(self, view_id, service, date):
+        """
+        Separated query method to handle retry and delay methods.
+        """
+        logging.info(f"Querying at date: {date}.")
+
         response = service.reports().batchGet(
-            body={
-                "reportRequests": [
-                    {
-                        "viewId": view_id,
-                        "dateRanges": [{"startDate": date, "endDate": date}],
-                        "metrics": metrics_set,
-                        "dimensions": dimensions_set,
-                        "metricFilterClauses": self._configuration.get(
-                            "metric_filter_clauses", []
-                        ),
-                        "dimensionFilterClauses": self._configuration.get(
-                            "dimension_filter_clauses", []
-                        ),
-                        "filtersExpression": self._configuration.get(
-                            "filters_expression"
-                        ),
-                        "segments": self._configuration.get("segments"),
-                        "pivots": self._configuration.get("pivots"),
-                        "orderBys": self._configuration.get("order_bys", []),
-                        "samplingLevel": self._configuration.get(
-                            "sampling_level", "LARGE"
-                        ),
-                        "includeEmptyRows": self._configuration.get(
-                            "include_empty_rows", True
-                        ),
-                        "hideTotals": self._configuration.get("hide_totals", False),
-                        "hideValueRanges": self._configuration.get(
-                            "hide_value_ranges", False
-                        ),
-                    },
-                ],
-                "useResourceQuotas": self._configuration.get("use_resource_quotas"),
-            }
+            body=self._build_request(view_id=view_id, date=date)
+        )
+        if self._stream_responses:
+            response.postproc = raw_body
+
+        with self._transport_pool.lease() as http:
+            return response.execute(http=http)
+
+    @staticmethod
+    def _report_headers(report: dict) -> tuple:
+        """
+        :return: The dimension names and metric header entries of a report.
+        """
+        column_header = report.get("columnHeader", {})
+        return (
+            column_header.get("dimensions", []),
+            column_header.get("metricHeader", {}).get("metricHeaderEntries", []),
         )
 
-        return response.execute()
+    def _decode_row(self, row: dict, headers: tuple, view_id) -> dict:
+        """
+        Process a report row into the dataset format.
+        """
+        dimension_headers, metric_headers = headers
+
+        # create dict for each row
+        row_dict = {}
+        dimensions = row.get("dimensions", [])
+        date_range_values = row.get("metrics", [])
+
+        for header, dimension in zip(dimension_headers, dimensions):
+            row_dict[header] = self._categories.intern(header, dimension)
 
-    def _iterate_report(self, reports, view_id):
+        for values in date_range_values:
+            for metric, value in zip(metric_headers, values.get("values")):
+                # clean up ints and floats
+                if "," in value or "." in value:
+                    row_dict[metric.get("name")] = float(value)
+                else:
+                    row_dict[metric.get("name")] = int(value)
+
+        # add additional data
+        row_dict["ga:viewId"] = view_id
+        return row_dict
+
+    @stage_handler("decode")
+    def _decode_report(self, reports, view_id) -> list:
         """
-        Iterate and process report data.
+        Process report data into the dataset format.
         :param reports: Reports object returned from GA
         :param view_id: Given view_id from config.
-        :return: GA Dataset.
+        :return: List of rows.
         """
+        dataset_rows = []
         for report in reports:
-            column_header = report.get("columnHeader", {})
-            dimension_headers = column_header.get("dimensions", [])
-            metric_headers = column_header.get("metricHeader", {}).get(
-                "metricHeaderEntries", []
-            )
+            headers = self._report_headers(report)
+            rows = report.get("data", {}).get("rows", [])
+            for row in rows:
+                dataset_rows.append(self._decode_row(row, headers, view_id))
+
+            self._metrics.increment("rows", len(rows), stage="fetch", entity=view_id)
+
+        return dataset_rows
+
+    @stage_handler("decode")
+    def _stream_report(self, body: str, view_id) -> list:
+        """
+        Decode the rows of a raw batchGet response body one at a time, so that the
+        response never exists as a whole nested object.
+        :param body: The response body, see stream_responses.
+        :param view_id: Given view_id from config.
+        :return: List of rows.
+        """
+        dataset_rows = []
+        # rows seen ahead of the column header of their report, decoded once it is
+        pending = []
 
-            for row in report.get("data", {}).get("rows", []):
-                # create dict for each row
-                row_dict = {}
-                dimensions = row.get("dimensions", [])
-                date_range_values = row.get("metrics", [])
+        def on_row(row, parents):
+            report = parents[-2]
+            if "columnHeader" in report:
+                dataset_rows.append(
+                    self._decode_row(row, self._report_headers(report), view_id)
+                )
+            else:
+                pending.append((len(dataset_rows), row, report))
+                dataset_rows.append(None)
 
-                for header, dimension in zip(dimension_headers, dimensions):
-                    row_dict[header] = dimension
+        response = stream_json(body, key="rows", on_item=on_row)
+        for index, row, report in pending:
+            dataset_rows[index] = self._decode_row(
+                row, self._report_headers(report), view_id
+            )
 
-                for values in date_range_values:
-                    for metric, value in zip(metric_headers, values.get("values")):
-                        # clean up ints and floats
-                        if "," in value or "." in value:
-                            row_dict[metric.get("name")] = float(value)
-                        else:
-                            row_dict[metric.get("name")] = int(value)
+        for report in response.get("reports", []):
+            self._metrics.increment(
+                "rows",
+                report.get("data", {}).get("rows", 0),
+                stage="fetch",
+                entity=view_id,
+            )
+        return dataset_rows
 
-                # add additional data
-                row_dict["ga:viewId"] = view_id
-                self._data_set.append(row_dict)
+    def _decode_response(self, response, view_id) -> list:
+        """
+        Process a batchGet response into the dataset format, given either as the
+        decoded response or, with stream_responses set, as the raw response body.
+        """
+        if isinstance(response, (str, bytes)):
+            return self._stream_report(body=response, view_id=view_id)
+        return self._decode_report(reports=response.get("reports", []), view_id=view_id)
 
     def run_query(self):
         """
@@ -175,18 +312,28 @@ class GoogleAnalyticsReader(ReaderInterface):
             property_ids: |
               A list of the unique table ID of the form ga:XXXX, where XXXX is the
               Analytics view (profile) ID for which the query will retrieve the data.
+        When a state_store is given, (view_id, date) units that have already been
+        completed are skipped, unless they fall within the mutable lookback.
+        With shard_count set, only the units of shard_index are queried.
+        Units are queried newest first unless unit_order is oldest_first, and once the
+        max_runtime or max_requests of the run are spent the remaining units are left
+        for the next run.
         """
-        start_date = phrase_to_date(self._configuration.get("start_date"))
-        end_date = phrase_to_date(self._configuration.get("end_date"))
-        for view_id in self._configuration.get("view_ids"):
+        # requests lease their own transport, so a single service is shared, and
+        # only built once a unit needs querying
+        service = None
+        for view_id, date in self._pending_units():
+            if self._budget_spent():
+                break
+            if service is None:
+                service = self._get_service()
+
             logging.info(f"Querying data for View Id: {view_id}.")
-            service = self._get_service()  # new service for each view_id
-            for date in date_range(start_date=start_date, end_date=end_date):
-                response = self._query_handler(
-                    view_id=view_id, service=service, date=date
-                )
-                reports = response.get("reports", [])
-                self._iterate_report(reports=reports, view_id=view_id)
+            response = self._query_handler(view_id=view_id, service=service, date=date)
+            dataset_rows = self._decode_response(response=response, view_id=view_id)
+            self._data_set.extend(dataset_rows)
+            self._complete_unit(entity=view_id, date=date, rows=dataset_rows)
 
+        self._save_state()
         logging.info(f"{self.__class__.__name__} process complete!")
         return self._data_set
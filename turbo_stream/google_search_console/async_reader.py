@@ -0,0 +1,123 @@
+"""
+Google Search Console API, asyncio
+"""
+import logging
+
+
+from turbo_stream import AsyncReaderInterface, Batch
+from turbo_stream.google_search_console.reader import GoogleSearchConsoleReader
+from turbo_stream.utils.cache_handlers import cache_handler
+from turbo_stream.utils.flight_handlers import coalesce_handler
+from turbo_stream.utils.hook_handlers import stage_handler
+from turbo_stream.utils.json_handlers import raw_body
+from turbo_stream.utils.request_handlers import request_handler, retry_handler
+from turbo_stream.utils.transport_handlers import google_api_errors
+
+
+class AsyncGoogleSearchConsoleReader(AsyncReaderInterface, GoogleSearchConsoleReader):
+    """
+    Google Search Console API Reader for asyncio.
+    The google client is blocking, so requests are executed in the default executor
+    on a transport leased from the reader pool, while rate limiting and retries wait
+    on the loop.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._service = None
+
+    def _execute(self, request, site_url) -> dict:
+        """
+        Execute a searchanalytics query on a leased transport.
+        """
+        response = self._service.searchanalytics().query(siteUrl=site_url, body=request)
+        if self._stream_responses:
+            response.postproc = raw_body
+        with self._transport_pool.lease() as http:
+            return response.execute(http=http)
+
+    @stage_handler("fetch")
+    @cache_handler(api="google_search_console", key_builder="_cache_key")
+    @coalesce_handler(api="google_search_console", key_builder="_cache_key")
+    @retry_handler(
+        exceptions=google_api_errors,
+        total_tries=5,
+        initial_wait=2,
+        backoff_factor=4,
+        max_wait=300,
+        should_raise=True,
+        endpoint="google_search_console.searchanalytics.query",
+    )
+    @request_handler(vendor="google_search_console", qps=20, burst=20)
+    async def _async_query_handler(self, request, site_url):
+        """
+        Run the API request that consumes a request payload and site url.
+        """
+        return await self._run_blocking(
+            self._execute, request=request, site_url=site_url
+        )
+
+    async def _fetch_unit(self, dimension, date) -> list:
+        """
+        Page through the rows of a single (dimension, date) unit.
+        """
+        logging.info(f"Querying at date: {date} for dimension: {dimension}.")
+        dim_query_set = self._dimension_query_set(dimension)
+        dataset_rows = []
+        row_index = 0
+        while True:
+            response = await self._async_query_handler(
+                request=self._build_request(
+                    date=date, dim_query_set=dim_query_set, row_index=row_index
+                ),
+                site_url=self._configuration.get("site_url"),
+            )
+            if response is None:
+                return dataset_rows
+            page_rows = self._decode_response(
+                response=response, dim_query_set=dim_query_set
+            )
+            if not page_rows:
+                return dataset_rows
+
+            dataset_rows.extend(page_rows)
+            self._metrics.increment(
+                "rows", len(page_rows), stage="fetch", entity=dimension
+            )
+            row_index += 1
+
+    async def stream(self):
+        """
+        Stream a Batch of rows per (dimension, date), see GoogleSearchConsoleReader.run_query.
+        """
+        if self._service is None:
+            self._service = await self._run_blocking(self._get_service)
+
+        units = [
+            {"dimension": dimension, "date": date}
+            for dimension, date in self._pending_units()
+        ]
+
+        async for unit, rows in self._ordered_gather(self._fetch_unit, units):
+            yield Batch(entity=unit["dimension"], date=unit["date"], rows=rows)
+            self._complete_unit(entity=unit["dimension"], date=unit["date"])
+
+    def _collect_batch(self, batch: Batch) -> None:
+        """
+        Add a streamed batch to the dimension keyed dataset object, see write_date_to_local.
+        """
+        if not self._data_set:
+            self._data_set.append({})
+        if batch.rows:
+            self._data_set[0].setdefault(batch.entity, []).extend(batch.rows)
+
+    async def run_query(self):
+        """
+        Gather every batch of the stream into the dimension keyed dataset object,
+        deriving the per dimension datasets locally in combined mode.
+        :return: The response dataset.
+        """
+        await super().run_query()
+        if self._configuration.get("combine_dimensions") and self._data_set:
+            self._data_set[0] = self._rollup_dimensions(self._data_set[0])
+        return self._data_set
@@ -3,19 +3,24 @@ Google Search Console API
 """
 import logging
 import pickle
-from socket import timeout
+import time
+from collections import deque
 
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
-from oauth2client.client import OAuth2WebServerFlow
 
-from turbo_stream import ReaderInterface, write_file, write_file_to_s3
-from turbo_stream.utils.date_handlers import date_range
+from turbo_stream import ReaderInterface, write_file
+from turbo_stream.utils.cache_handlers import cache_handler
+from turbo_stream.utils.flight_handlers import coalesce_handler
+from turbo_stream.utils.hook_handlers import stage_handler
+from turbo_stream.utils.json_handlers import raw_body, stream_json
 from turbo_stream.utils.request_handlers import request_handler, retry_handler
+from turbo_stream.utils.transport_handlers import TransportPool, google_api_errors
 
-logging.basicConfig(
-    format="%(asctime)s %(name)-12s %(levelname)-8s %(message)s", level=logging.INFO
-)
+# every search analytics row holds these metrics, whichever are configured
+SEARCH_ANALYTICS_METRICS = ("clicks", "impressions", "ctr", "position")
+
+# dimensions queried on their own in combined mode, as rows holding the page are
+# aggregated by page, and rows holding the query leave out anonymised queries
+SEPARATE_DIMENSIONS = ("page", "query")
 
 
 class GoogleSearchConsoleReader(ReaderInterface):
@@ -24,7 +29,13 @@ class GoogleSearchConsoleReader(ReaderInterface):
     """
 
     def __init__(self, configuration: dict, credentials: (dict, str), **kwargs):
-        super().__init__(configuration, credentials)
+        super().__init__(configuration, credentials, **kwargs)
+
+        # search console data takes around 3 days to be finalised
+        self._mutable_lookback = kwargs.get("mutable_lookback", 3)
+
+        # queries sent per batch http request, 1 sends every query on its own
+        self._batch_size: int = kwargs.get("batch_size", 1)
 
         self.scopes = kwargs.get(
             "scopes",
@@ -42,6 +53,19 @@ class GoogleSearchConsoleReader(ReaderInterface):
         )
         self.redirect_uri = kwargs.get("redirect_uri", "urn:ietf:wg:oauth:2.0:oob")
 
+        # decode the rows of each response body one at a time, see _decode_response
+        self._stream_responses: bool = kwargs.get("stream_responses", False)
+
+        # requests lease an authorised transport, so they can be run concurrently,
+        # with an optional TokenCache their token is shared across processes and runs
+        self._transport_pool: TransportPool = kwargs.get("transport_pool")
+        if self._transport_pool is None:
+            self._transport_pool = TransportPool(
+                credentials=self._get_credentials,
+                pool_size=kwargs.get("pool_size", 10),
+                token_cache=kwargs.get("token_cache"),
+            )
+
     def generate_authentication(
         self, auth_file_location="gsc_credentials.pickle"
     ) -> None:
@@ -53,6 +77,10 @@ class GoogleSearchConsoleReader(ReaderInterface):
         “pickled” credentials stored in credentials.pickle to build the
         connection to Search Console.
         """
+        from oauth2client.client import (  # pylint: disable=import-outside-toplevel
+            OAuth2WebServerFlow,
+        )
+
         flow = OAuth2WebServerFlow(
             self._credentials["installed"].get("client_id"),
             self._credentials["installed"].get("client_secret"),
@@ -65,114 +93,552 @@ class GoogleSearchConsoleReader(ReaderInterface):
         credentials = flow.step2_exchange(code)
         pickle.dump(credentials, open(auth_file_location, "wb"))
 
-    def _get_service(self) -> build:
+    def _get_credentials(self):
         """
-        Makes use of the .pickle cred file to establish a webmaster connection.
+        Load the credentials from the .pickle cred file.
         """
         with open(self._credentials, "rb") as _file:
-            credentials = pickle.load(_file)
+            return pickle.load(_file)
 
-        return build(
-            "searchconsole", "v1", credentials=credentials, cache_discovery=False
+    def _get_service(self):
+        """
+        Makes use of the .pickle cred file to establish a webmaster connection.
+        """
+        # pylint: disable=import-outside-toplevel
+        from googleapiclient.discovery import build
+
+        with self._transport_pool.lease() as http:
+            return build("searchconsole", "v1", http=http, cache_discovery=False)
+
+    def _query_template(self) -> dict:
+        """
+        Build the fields of a searchanalytics query that are the same for every page.
+        """
+        return {
+            "metrics": self._configuration.get("metrics"),
+            "type": self._configuration.get("type"),
+            "rowLimit": self._configuration.get("row_limit", 25000),
+            "aggregationType": self._configuration.get("aggregation_type", "auto"),
+            "dimensionFilterGroups": self._configuration.get(
+                "dimension_filter_groups", []
+            ),
+            "dataState": self._configuration.get("data_state", "final"),
+        }
+
+    def _build_request(self, date: str, dim_query_set: list, row_index: int) -> dict:
+        """
+        Build the searchanalytics query body for a page of a single date.
+        """
+        template = self._template("query", self._query_template)
+        return {
+            "startDate": date,
+            "endDate": date,
+            "dimensions": dim_query_set,
+            "startRow": row_index * template["rowLimit"],
+            **template,
+        }
+
+    def _build_unit_request(self, entity, date: str) -> dict:
+        return self._build_request(
+            date=date, dim_query_set=self._dimension_query_set(entity), row_index=0
         )
 
-    @request_handler(wait=1, backoff_factor=0.5)
+    def _requests_per_unit(self) -> int:
+        """
+        Queried one at a time, a unit ends on an empty page, so costs a request more
+        than its pages, while a batched unit ends on its first short page.
+        """
+        return 1 if self._batch_size > 1 else 2
+
+    def _cache_key(self, service=None, request=None, site_url=None) -> dict:
+        """
+        Describe a query for the response cache.
+        """
+        return {
+            "entity": site_url,
+            "request": request,
+            "date": request.get("startDate"),
+            "data_state": request.get("dataState"),
+        }
+
+    @stage_handler("fetch")
+    @cache_handler(api="google_search_console", key_builder="_cache_key")
+    @coalesce_handler(api="google_search_console", key_builder="_cache_key")
     @retry_handler(
-        exceptions=(timeout, HttpError),
+        exceptions=google_api_errors,
         total_tries=5,
-        initial_wait=60,
-        backoff_factor=5,
+        initial_wait=2,
+        backoff_factor=4,
+        max_wait=300,
+        should_raise=True,
+        endpoint="google_search_console.searchanalytics.query",
     )
+    # search analytics: 1,200 queries per minute per site and per user
+    @request_handler(vendor="google_search_console", qps=20, burst=20)
     def _query_handler(self, service, request, site_url):
         """
         Run the API request that consumes a request payload and site url.
         This separates the request with the request handler from the rest of the logic.
         """
-        return service.searchanalytics().query(siteUrl=site_url, body=request).execute()
+        response = service.searchanalytics().query(siteUrl=site_url, body=request)
+        if self._stream_responses:
+            response.postproc = raw_body
+        with self._transport_pool.lease() as http:
+            return response.execute(http=http)
+
+    def _batch_cost(self, service, requests: list, site_url) -> int:
+        """
+        Count every query of a batch against the rate limits.
+        """
+        return len(requests)
+
+    @stage_handler("fetch")
+    @retry_handler(
+        exceptions=google_api_errors,
+        total_tries=5,
+        initial_wait=2,
+        backoff_factor=4,
+        max_wait=300,
+        should_raise=True,
+        endpoint="google_search_console.batch",
+    )
+    @request_handler(
+        vendor="google_search_console", qps=20, burst=20, cost="_batch_cost"
+    )
+    def _batch_query_handler(self, service, requests: list, site_url) -> list:
+        """
+        Send many searchanalytics queries in a single multipart batch http request.
+        A failed query does not fail the batch, its exception is returned instead.
+        :return: A (response, exception) pair per request, in order of the requests.
+        """
+        results = [(None, None)] * len(requests)
+
+        def callback(request_id, response, exception):
+            results[int(request_id)] = (response, exception)
+
+        batch = service.new_batch_http_request(callback=callback)
+        for index, request in enumerate(requests):
+            query = service.searchanalytics().query(siteUrl=site_url, body=request)
+            if self._stream_responses:
+                query.postproc = raw_body
+            batch.add(query, request_id=str(index))
+        with self._transport_pool.lease() as http:
+            batch.execute(http=http)
+        return results
+
+    def _send_batch(self, service, requests: list, site_url) -> list:
+        """
+        Serve the queries of a batch from the response cache where possible and send
+        the rest as a single batch http request.
+        :return: A (response, exception) pair per request, in order of the requests.
+        """
+        cache = self._response_cache
+        keys = [
+            self._cache_key(request=request, site_url=site_url) for request in requests
+        ]
+        results = [(None, None)] * len(requests)
+        if cache is not None:
+            for index, key in enumerate(keys):
+                response = cache.get(
+                    api="google_search_console",
+                    entity=key["entity"],
+                    request=key["request"],
+                )
+                results[index] = (response, None)
+
+        misses = [
+            index for index, (response, _) in enumerate(results) if response is None
+        ]
+        if not misses:
+            return results
+
+        logging.info(f"Sending a batch of {len(misses)} queries.")
+        sent = self._batch_query_handler(
+            service=service,
+            requests=[requests[index] for index in misses],
+            site_url=site_url,
+        )
+        for index, (response, exception) in zip(misses, sent):
+            results[index] = (response, exception)
+            if cache is not None and response is not None:
+                cache.set(
+                    api="google_search_console",
+                    entity=keys[index]["entity"],
+                    request=keys[index]["request"],
+                    response=response,
+                    date=keys[index].get("date"),
+                    data_state=keys[index].get("data_state"),
+                    mutable_lookback=self._mutable_lookback,
+                )
+        return results
+
+    def _run_batched_query(self, service, units: list) -> dict:
+        """
+        Gather (dimension, date) units through batch http requests of up to batch_size
+        queries. Each page is demultiplexed back to its unit, the next page of a unit is
+        queued once a full page comes back and failed queries are sent again on their
+        own in a later batch, following the retry policy and circuit breaker of
+        _query_handler. Once the run budget is spent only the units in flight
+        are finished.
+        :param service: The search console service.
+        :param units: (dimension, date) pairs to gather.
+        :return: Rows keyed by dimension.
+        """
+        site_url = self._configuration.get("site_url")
+        row_limit = self._configuration.get("row_limit", 25000)
+        breaker = self._query_handler.circuit_breaker
+
+        pages = {unit: {} for unit in units}
+        # queued queries as (dimension, date, row_index, tries)
+        queue = deque((dimension, date, 0, 1) for dimension, date in units)
+        delay = 0
+        while queue:
+            if self._budget_spent():
+                # finish the units in flight, leaving the rest for the next run
+                queue = deque(
+                    query
+                    for query in queue
+                    if query[2] > 0 or pages[(query[0], query[1])]
+                )
+                if not queue:
+                    break
+
+            time.sleep(delay)
+            delay = 0
+
+            queries = [
+                queue.popleft() for _ in range(min(self._batch_size, len(queue)))
+            ]
+            requests = [
+                self._build_request(
+                    date=date,
+                    dim_query_set=self._dimension_query_set(dimension),
+                    row_index=row_index,
+                )
+                for dimension, date, row_index, _ in queries
+            ]
+            # the queries of a batch count as calls of the query endpoint
+            trial = breaker.before_call()
+            try:
+                results = self._send_batch(
+                    service=service, requests=requests, site_url=site_url
+                )
+                for query, request, (response, exception) in zip(
+                    queries, requests, results
+                ):
+                    dimension, date, row_index, tries = query
+                    if exception is not None:
+                        # raises once the query is not worth another try
+                        retry_delay = self._query_handler.retry_delay(
+                            exception, tries, self
+                        )
+                        if retry_delay is not None:
+                            delay = max(delay, retry_delay)
+                            queue.append((dimension, date, row_index, tries + 1))
+                        continue
+                    breaker.record_success()
+
+                    unit_pages = pages[(dimension, date)]
+                    unit_pages[row_index] = self._decode_response(
+                        response=response, dim_query_set=request["dimensions"]
+                    )
+                    rows = len(unit_pages[row_index])
+                    self._metrics.increment(
+                        "rows", rows, stage="fetch", entity=dimension
+                    )
+
+                    # a short page is the last page of the unit
+                    if rows == row_limit:
+                        queue.append((dimension, date, row_index + 1, 1))
+                    else:
+                        unit_rows = [
+                            row
+                            for page in sorted(unit_pages)
+                            for row in unit_pages[page]
+                        ]
+                        pages[(dimension, date)] = unit_rows
+                        self._complete_unit(entity=dimension, date=date, rows=unit_rows)
+            finally:
+                if trial:
+                    breaker.release_trial()
+
+        dimension_data_set = {}
+        for (dimension, _), unit_rows in pages.items():
+            if unit_rows:
+                dimension_data_set.setdefault(dimension, []).extend(unit_rows)
+        return dimension_data_set
+
+    def _query_entities(self) -> list:
+        """
+        Gather the entities queried for each date, a dimension each, or in combined
+        mode a single entity joining every dimension, such as country+device.
+        The page and query dimensions are always queried on their own, as rollups of
+        rows holding them would diverge from the per dimension datasets, see
+        SEPARATE_DIMENSIONS.
+        """
+        dimensions = self._configuration.get("dimensions")
+        if self._configuration.get("combine_dimensions"):
+            combined = [
+                dimension
+                for dimension in dimensions
+                if dimension not in SEPARATE_DIMENSIONS
+            ]
+            separate = [
+                dimension
+                for dimension in dimensions
+                if dimension in SEPARATE_DIMENSIONS
+            ]
+            return (["+".join(combined)] if combined else []) + separate
+        return dimensions
+
+    def _plan_units(self) -> list:
+        """
+        Plan a (dimension, date) unit for every queried entity and date of the
+        configuration, see _query_entities.
+        """
+        dates = self._plan_dates()
+        return [
+            (dimension, date) for dimension in self._query_entities() for date in dates
+        ]
+
+    @staticmethod
+    def _dimension_query_set(entity: str) -> list:
+        """
+        :return: The dimensions queried for an entity, always along with the date.
+        """
+        return list(dict.fromkeys(["date", *entity.split("+")]))
+
+    @stage_handler("decode")
+    def _rollup_dimensions(self, dimension_data_set: dict) -> dict:
+        """
+        Derive the per dimension datasets from rows of the combined dimensions, with
+        a vectorised group by. Clicks and impressions are summed, the ctr is derived
+        from those and the position is averaged weighted by impressions, matching how
+        the api aggregates by property. Rows of the page and query, which are queried
+        on their own in combined mode, are kept as they are, see _query_entities.
+        :param dimension_data_set: Rows keyed by queried entity.
+        :return: Rows keyed by dimension.
+        """
+        import pandas as pd  # pylint: disable=import-outside-toplevel
+
+        metrics = self._configuration.get("metrics", [])
+        data_frame = pd.DataFrame(
+            [
+                row
+                for entity, rows in dimension_data_set.items()
+                if entity not in SEPARATE_DIMENSIONS
+                for row in rows
+            ]
+        )
+        if not data_frame.empty:
+            data_frame["weighted_position"] = (
+                data_frame["position"] * data_frame["impressions"]
+            )
+
+        # the site url and search type are the same for every row
+        constants = {
+            "site_url": self._configuration.get("site_url"),
+            "search_type": self._configuration.get("search_type"),
+        }
+        rollup_data_set = {}
+        for dimension in self._configuration.get("dimensions"):
+            if dimension in SEPARATE_DIMENSIONS:
+                # their rows only drop the metrics that were kept for the rollups
+                if dimension_data_set.get(dimension):
+                    rollup_data_set[dimension] = [
+                        {
+                            key: value
+                            for key, value in row.items()
+                            if key in metrics or key not in SEARCH_ANALYTICS_METRICS
+                        }
+                        for row in dimension_data_set[dimension]
+                    ]
+                continue
+            if data_frame.empty:
+                continue
+            keys = self._dimension_query_set(dimension)
+            rollup = (
+                data_frame.groupby(keys, sort=False)[
+                    ["clicks", "impressions", "weighted_position"]
+                ]
+                .sum()
+                .reset_index()
+            )
+            rollup["ctr"] = rollup["clicks"] / rollup["impressions"]
+            rollup["position"] = rollup["weighted_position"] / rollup["impressions"]
+            rollup_data_set[dimension] = [
+                {**constants, **row}
+                for row in rollup[keys + metrics].to_dict(orient="records")
+            ]
+
+        return rollup_data_set
+
+    def _row_metrics(self) -> list:
+        """
+        :return: The metrics kept for each row.
+        """
+        # combined rows keep every metric to derive the rollups from
+        if self._configuration.get("combine_dimensions"):
+            return SEARCH_ANALYTICS_METRICS
+        return self._configuration.get("metrics", [])
+
+    def _decode_row(self, row: dict, dim_query_set: list, metrics: list) -> dict:
+        """
+        Process a response row into the dataset format.
+        """
+        # added additional data that the api does not provide
+        dataset = {
+            "site_url": self._configuration.get("site_url"),
+            "search_type": self._configuration.get("search_type"),
+        }
+
+        # get dimension data keys and values
+        for dimension, key in zip(dim_query_set, row.get("keys", [])):
+            dataset[dimension] = self._categories.intern(dimension, key)
+
+        # get metrics data
+        for metric in metrics:
+            dataset[metric] = row.get(metric)
+
+        return dataset
+
+    @stage_handler("decode")
+    def _iterate_rows(self, rows: list, dim_query_set: list) -> list:
+        """
+        Process response rows into the dataset format.
+        :param rows: Rows object returned from GSC.
+        :param dim_query_set: The dimensions queried, in order of the row keys.
+        :return: List of rows.
+        """
+        metrics = self._row_metrics()
+        return [self._decode_row(row, dim_query_set, metrics) for row in rows]
+
+    @stage_handler("decode")
+    def _stream_rows(self, body: str, dim_query_set: list) -> list:
+        """
+        Decode the rows of a raw searchanalytics response body one at a time, so that
+        the response never exists as a whole nested object.
+        :param body: The response body, see stream_responses.
+        :param dim_query_set: The dimensions queried, in order of the row keys.
+        :return: List of rows.
+        """
+        metrics = self._row_metrics()
+        dataset_rows = []
+        stream_json(
+            body,
+            key="rows",
+            on_item=lambda row, _: dataset_rows.append(
+                self._decode_row(row, dim_query_set, metrics)
+            ),
+        )
+        return dataset_rows
+
+    def _decode_response(self, response, dim_query_set: list) -> list:
+        """
+        Process a searchanalytics response into the dataset format, given either as
+        the decoded response or, with stream_responses set, as the raw response body.
+        """
+        if isinstance(response, (str, bytes)):
+            return self._stream_rows(body=response, dim_query_set=dim_query_set)
+        return self._iterate_rows(
+            rows=response.get("rows", []), dim_query_set=dim_query_set
+        )
 
     def run_query(self):
         """
         Consumes a .yaml config file and loops through the date and url
         to return relevant data from GSC API.
+        When a state_store is given, (dimension, date) units that have already been
+        completed are skipped, unless they fall within the mutable lookback.
+        With shard_count set, only the units of shard_index are queried.
+        Units are queried newest first unless unit_order is oldest_first, and once the
+        max_runtime or max_requests of the run are spent the remaining units are left
+        for the next run.
+        With a batch_size above 1 the queries are sent through batch http requests.
+        With combine_dimensions set in the config the full dimension tuple is queried
+        once per date, apart from the page and query, and the per dimension datasets are derived
+        locally, see _rollup_dimensions, which suits sites that fit under the row
+        limit.
         """
-        service: build = self._get_service()
+        service = self._get_service()
         start_date: str = self._configuration.get("start_date")
         end_date: str = self._configuration.get("end_date")
-        dimensions: list = self._configuration.get("dimensions")
 
         logging.info(
             f"Gathering data between given dates {start_date} and {end_date}. "
             f"Querying for Site Url: {self._configuration.get('site_url')}."
         )
 
+        units = self._pending_units()
+        if self._batch_size > 1:
+            dimension_data_set = self._run_batched_query(service, units)
+        else:
+            dimension_data_set = self._run_sequential_query(service, units)
+
+        if self._configuration.get("combine_dimensions"):
+            dimension_data_set = self._rollup_dimensions(dimension_data_set)
+
+        self._append_data_set(dimension_data_set)
+        self._save_state()
+        logging.info(f"{self.__class__.__name__} process complete!")
+        return self._data_set
+
+    def _run_sequential_query(self, service, units: list) -> dict:
+        """
+        Gather (dimension, date) units one query at a time.
+        :param service: The search console service.
+        :param units: (dimension, date) pairs to gather.
+        :return: Rows keyed by dimension.
+        """
         dimension_data_set = {}
         # split request by date to reduce 504 errors
-        for dimension in dimensions:
-            for date in date_range(start_date=start_date, end_date=end_date):
-                logging.info(f"Querying at date: {date} for dimension: {dimension}.")
-                # run until none is returned or there is no more data in rows
-                row_index = 0
-                while True:
-                    dim_query_set = list(dict.fromkeys(["date", dimension]))
-                    response = self._query_handler(
-                        service=service,
-                        request={
-                            "startDate": date,
-                            "endDate": date,
-                            "dimensions": dim_query_set,
-                            "metrics": self._configuration.get("metrics"),
-                            "type": self._configuration.get("type"),
-                            "rowLimit": self._configuration.get("row_limit", 25000),
-                            "startRow": row_index
-                            * self._configuration.get("row_limit", 25000),
-                            "aggregationType": self._configuration.get(
-                                "aggregation_type", "auto"
-                            ),
-                            "dimensionFilterGroups": self._configuration.get(
-                                "dimension_filter_groups", []
-                            ),
-                            "dataState": self._configuration.get("data_state", "final"),
-                        },
-                        site_url=self._configuration.get("site_url"),
-                    )
-
-                    if response is None:
-                        logging.info("Response is None, exiting process...")
-                        break
-                    if "rows" not in response:
-                        logging.info("No more data in given row, moving on....")
-                        break
-
-                    # added additional data that the api does not provide
-                    for row in response["rows"]:
-                        dataset = {
-                            "site_url": self._configuration.get("site_url"),
-                            "search_type": self._configuration.get("search_type"),
-                        }
+        for dimension, date in units:
+            if self._budget_spent():
+                break
+            logging.info(f"Querying at date: {date} for dimension: {dimension}.")
+            # run until none is returned or there is no more data in rows
+            unit_rows = []
+            row_index = 0
+            while True:
+                dim_query_set = self._dimension_query_set(dimension)
+                response = self._query_handler(
+                    service=service,
+                    request=self._build_request(
+                        date=date, dim_query_set=dim_query_set, row_index=row_index
+                    ),
+                    site_url=self._configuration.get("site_url"),
+                )
 
-                        # get dimension data keys and values
-                        dataset.update(
-                            dict(
-                                zip(
-                                    dim_query_set,
-                                    row.get("keys", []),
-                                )
-                            )
-                        )
+                if response is None:
+                    logging.info("Response is None, exiting process...")
+                    break
+                page_rows = self._decode_response(
+                    response=response, dim_query_set=dim_query_set
+                )
+                if not page_rows:
+                    logging.info("No more data in given row, moving on....")
+                    break
 
-                        # get metrics data
-                        for metric in self._configuration.get("metrics", []):
-                            dataset[metric] = row.get(metric)
+                unit_rows.extend(page_rows)
+                self._metrics.increment(
+                    "rows", len(page_rows), stage="fetch", entity=dimension
+                )
+                row_index += 1
 
-                        if dimension not in dimension_data_set:
-                            dimension_data_set[dimension] = []
-                        dimension_data_set[dimension].append(dataset)
-                    row_index += 1
+            if unit_rows:
+                dimension_data_set.setdefault(dimension, []).extend(unit_rows)
+            self._complete_unit(entity=dimension, date=date, rows=unit_rows)
 
-            self._append_data_set(dimension_data_set)
+        return dimension_data_set
 
-        logging.info(f"{self.__class__.__name__} process complete!")
-        return self._data_set
+    def _unit_datasets(self, entity, rows: list) -> dict:
+        """
+        In combined mode the per dimension datasets of a unit are derived from its
+        rows, see _rollup_dimensions.
+        """
+        if self._configuration.get("combine_dimensions"):
+            return self._rollup_dimensions({entity: rows})
+        return {entity: rows}
 
     def write_date_to_local(self, file_location):
         """
@@ -189,11 +655,13 @@ class GoogleSearchConsoleReader(ReaderInterface):
             file_split = file_location.split(".")
             filepath = f"{file_split[0]}_{dimension}.{file_split[-1]}"
             logging.info(f"Writing {dimension} data to local path: {filepath}.")
-            write_file(data=dimension_dataset, file_location=filepath)
+            with self._metrics.timer("local_write_seconds"):
+                write_file(data=dimension_dataset, file_location=filepath)
+        self.commit_units()
 
     def write_partition_data_to_s3(
-        self, bucket: str, path: str, partition: str, fmt="json"
-    ):
+        self, bucket: str, path: str, partition: str, fmt="json", skip_unchanged=False
+    ) -> dict:
         """
         Writes a file to s3, partitioned by a given field in the dataset.
         Json objects will be serialised before writing. This works best with date fields
@@ -204,15 +672,20 @@ class GoogleSearchConsoleReader(ReaderInterface):
         :param path: The path in the bucket where the partition file will be written.
         :param partition: The field name in the dataset what will become the partition.
         :param fmt: The format to write in.
-        :return: The partitioned dataset object
+        :param skip_unchanged: Only upload partitions that changed.
+        :return: The number of written and skipped partitions.
         """
+        files = {}
         for dimension, dimension_dataset in self._data_set[0].items():
             partition_dataset = self._partition_dataset(
                 partition=partition, dataset=dimension_dataset
             )
             for partition_name, partition_data in partition_dataset.items():
-                write_file_to_s3(
-                    bucket=bucket,
-                    key=f"{path}/{partition_name}_{dimension}.{fmt}",
-                    data=partition_data,
-                )
+                key = self._shard_key(f"{path}/{partition_name}_{dimension}.{fmt}")
+                files[key] = partition_data
+
+        counts = self._write_files_to_s3(
+            bucket=bucket, path=path, files=files, skip_unchanged=skip_unchanged
+        )
+        self.commit_units()
+        return counts
@@ -0,0 +1,175 @@
+"""
+Onesignal API, asyncio
+"""
+import asyncio
+import logging
+from urllib.error import URLError
+
+from turbo_stream import AsyncReaderInterface, Batch
+from turbo_stream.onesignal.reader import OnesignalReader
+from turbo_stream.utils.cache_handlers import cache_handler
+from turbo_stream.utils.flight_handlers import coalesce_handler
+from turbo_stream.utils.hook_handlers import stage_handler
+from turbo_stream.utils.request_handlers import request_handler, retry_handler
+
+try:
+    import aiohttp
+except ImportError as error:
+    raise ImportError(
+        "AsyncOnesignalReader requires aiohttp, install it with: "
+        "pip install turbo_stream[async]"
+    ) from error
+
+
+class AsyncOnesignalReader(AsyncReaderInterface, OnesignalReader):
+    """
+    Onesignal API Reader for View Notifications and CSV Exports for asyncio.
+    Notification pages are gathered concurrently over a single aiohttp session.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._session = None
+
+    def _collect_batch(self, batch: Batch) -> None:
+        """
+        Add a streamed batch to the dataset object, an Arrow table of the csv export
+        becomes the dataset as it is, see OnesignalReader.run_query.
+        """
+        if isinstance(batch.rows, list):
+            super()._collect_batch(batch)
+        else:
+            self._data_set = batch.rows
+
+    @coalesce_handler(api="onesignal", key_builder="_cache_key")
+    @retry_handler(
+        exceptions=(aiohttp.ClientError, asyncio.TimeoutError),
+        total_tries=5,
+        initial_wait=2,
+        backoff_factor=4,
+        max_wait=300,
+        should_raise=True,
+        endpoint="onesignal.notifications",
+    )
+    @request_handler(vendor="onesignal", qps=2, burst=2)
+    async def _async_view_notification_query_handler(self, limit: int, offset: int):
+        async with self._session.get(
+            self._generate_url(endpoint="view_notification"),
+            params={"limit": limit, "total_count": "true", "offset": offset},
+        ) as response:
+            response.raise_for_status()
+            return await response.json(content_type=None)
+
+    @stage_handler("fetch")
+    @cache_handler(api="onesignal", key_builder="_cache_key")
+    async def _async_view_notification_query(self, limit: int, offset: int) -> dict:
+        """
+        Gather a page of notifications as a json object.
+        """
+        logging.info(f"At offset {offset}.")
+        response = await self._async_view_notification_query_handler(
+            limit=limit, offset=offset
+        )
+        self._metrics.increment(
+            "rows",
+            len(response.get("notifications", [])),
+            stage="fetch",
+            entity="view_notification",
+        )
+        return response
+
+    @stage_handler("fetch")
+    @retry_handler(
+        exceptions=(aiohttp.ClientError, asyncio.TimeoutError),
+        total_tries=5,
+        initial_wait=2,
+        backoff_factor=4,
+        max_wait=300,
+        should_raise=True,
+        endpoint="onesignal.players.csv_export",
+    )
+    @request_handler(vendor="onesignal_csv_export", qps=1)
+    async def _async_csv_export_query_handler(self) -> dict:
+        async with self._session.post(
+            self._generate_url(endpoint="csv_export")
+        ) as response:
+            response.raise_for_status()
+            return await response.json(content_type=None)
+
+    async def _async_get_csv_export(self, response: dict) -> list:
+        """
+        Attempts to gather the data from the csv url, and waits on the loop while
+        it is being generated, see OnesignalReader._get_csv_export_handler.
+        :param response: Onesignal response object.
+        """
+        csv_url = response.get("csv_file_url", None)
+        if csv_url is None:
+            raise ConnectionError(response)
+
+        attempts = 1
+        while True:
+            try:
+                logging.info(f"Attempting to gather data from url: {csv_url}.")
+                # the download and decode are blocking, keep them off the loop
+                dataset_rows = await self._run_blocking(
+                    self._read_csv_export, csv_url=csv_url
+                )
+                self._metrics.increment(
+                    "rows", len(dataset_rows), stage="fetch", entity="csv_export"
+                )
+                return dataset_rows
+
+            except URLError:
+                logging.info(
+                    f"CSV file not generated, waiting for {self._csv_wait_time} seconds. "
+                    f"Attempt {attempts}/{self._csv_get_attempts}."
+                )
+                await asyncio.sleep(self._csv_wait_time)
+                if attempts > self._csv_get_attempts:
+                    raise ConnectionError(
+                        f"CSV file failed to generate after {attempts} attempts. "
+                        "Contact Onesignal for help."
+                    )
+                attempts += 1
+
+    async def stream(self):
+        """
+        Stream a Batch per page of notifications, or a single Batch of the csv export.
+        The rows of each batch match the dataset of OnesignalReader.run_query.
+        """
+        _endpoint = self._configuration.get("endpoint")
+        _limit = self._configuration.get("limit", 50)
+        logging.info(f"Gathering data for {_endpoint}.")
+        if _endpoint not in ("view_notification", "csv_export"):
+            raise ValueError(
+                f"Given endpoint: {_endpoint} is not supported. "
+                f"Try csv_export or view_notifications."
+            )
+
+        async with aiohttp.ClientSession(headers=self._header) as self._session:
+            if _endpoint == "view_notification":
+                # the first page gives the total count, the rest are gathered concurrently
+                response = await self._async_view_notification_query(
+                    limit=_limit, offset=0
+                )
+                if self._is_unit_in_shard(entity=self._app_id, date=0):
+                    yield Batch(entity=_endpoint, date=None, rows=[response])
+
+                self._start_budget()
+                units = [
+                    {"limit": _limit, "offset": offset}
+                    for offset in range(
+                        _limit, int(response.get("total_count")), _limit
+                    )
+                    if self._is_unit_in_shard(entity=self._app_id, date=offset)
+                ]
+                async for _, response in self._ordered_gather(
+                    self._async_view_notification_query, units
+                ):
+                    yield Batch(entity=_endpoint, date=None, rows=[response])
+
+            elif self._is_unit_in_shard(entity=self._app_id, date="csv_export"):
+                # the csv export could take time to generate, so wait for it
+                response = await self._async_csv_export_query_handler()
+                rows = await self._async_get_csv_export(response=response)
+                yield Batch(entity=_endpoint, date=None, rows=rows)
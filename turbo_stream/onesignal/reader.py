@@ -4,17 +4,44 @@ Onesignal API
 import logging
 import time
 from urllib.error import URLError
-
-import pandas as pd
-import requests
+from urllib.parse import urlparse
+from urllib.request import urlopen
 
 from turbo_stream import ReaderInterface
+from turbo_stream.utils.cache_handlers import cache_handler
+from turbo_stream.utils.dataset_handlers import read_csv_table
 from turbo_stream.utils.file_handlers import load_file
+from turbo_stream.utils.flight_handlers import coalesce_handler
+from turbo_stream.utils.hook_handlers import stage_handler
 from turbo_stream.utils.request_handlers import request_handler
 
-logging.basicConfig(
-    format="%(asctime)s %(name)-12s %(levelname)-8s %(message)s", level=logging.INFO
-)
+# arrow types of the known columns of the player csv export, tags hold json objects
+# and timestamps are kept in milliseconds, the coarsest unit parquet stores
+PLAYER_EXPORT_TYPES = {
+    "id": "string",
+    "identifier": "string",
+    "session_count": "int64",
+    "language": "string",
+    "timezone": "int64",
+    "game_version": "string",
+    "device_os": "string",
+    "device_type": "int64",
+    "device_model": "string",
+    "ad_id": "string",
+    "tags": "string",
+    "last_active": "timestamp[ms]",
+    "playtime": "int64",
+    "amount_spent": "double",
+    "created_at": "timestamp[ms]",
+    "invalid_identifier": "bool",
+    "badge_count": "int64",
+}
+
+# the codecs of compressed csv exports, by file extension
+_CSV_COMPRESSION = {".gz": "gzip", ".bz2": "bz2", ".zst": "zstd"}
+
+CSV_ENGINES = ("pandas", "arrow")
+CSV_OUTPUTS = ("records", "arrow")
 
 
 class OnesignalReader(ReaderInterface):
@@ -23,7 +50,7 @@ class OnesignalReader(ReaderInterface):
     """
 
     def __init__(self, configuration: dict, credentials: (dict, str), **kwargs):
-        super().__init__(configuration, credentials)
+        super().__init__(configuration, credentials, **kwargs)
 
         # load credentials file to object
         self._credentials = load_file(
@@ -37,9 +64,28 @@ class OnesignalReader(ReaderInterface):
             "Authorization": f"Basic {self._api_key}",
         }
 
+        self._base_url = kwargs.get("base_url", "https://onesignal.com/api/v1")
         self._csv_wait_time = kwargs.get("csv_wait_time", 30)
         self._csv_get_attempts = kwargs.get("csv_get_attempts", 5)
 
+        # the arrow engine parses the csv export on multiple threads with the known
+        # column types, and an arrow output keeps the export as an Arrow table
+        self._csv_engine: str = kwargs.get("csv_engine", "pandas")
+        self._csv_output: str = kwargs.get("csv_output", "records")
+        self._csv_block_size: int = kwargs.get("csv_block_size")
+        if self._csv_engine not in CSV_ENGINES:
+            raise ValueError(
+                f"Given csv_engine: {self._csv_engine} is not supported. "
+                f"Try {' or '.join(CSV_ENGINES)}."
+            )
+        if self._csv_output not in CSV_OUTPUTS:
+            raise ValueError(
+                f"Given csv_output: {self._csv_output} is not supported. "
+                f"Try {' or '.join(CSV_OUTPUTS)}."
+            )
+        if self._csv_output == "arrow" and self._csv_engine != "arrow":
+            raise ValueError("csv_output arrow requires the arrow csv_engine.")
+
     def _generate_url(self, endpoint: str):
         """
         Generate url string for authentication from given endpoints.
@@ -47,19 +93,20 @@ class OnesignalReader(ReaderInterface):
         :return: Url string.
         """
         if endpoint == "view_notification":
-            return f"https://onesignal.com/api/v1/notifications?app_id={self._app_id}"
+            return f"{self._base_url}/notifications?app_id={self._app_id}"
         if endpoint == "csv_export":
-            return (
-                f"https://onesignal.com/api/v1/players/csv_export?app_id={self._app_id}"
-            )
+            return f"{self._base_url}/players/csv_export?app_id={self._app_id}"
 
         raise ValueError(
             f"Given endpoint: {endpoint} is not supported. "
             f"Try csv_export or view_notifications."
         )
 
-    @request_handler(wait=0.5, backoff_factor=0.5)
+    @coalesce_handler(api="onesignal", key_builder="_cache_key")
+    @request_handler(vendor="onesignal", qps=2, burst=2)
     def _view_notification_query_handler(self, limit: int, offset: int):
+        import requests  # pylint: disable=import-outside-toplevel
+
         url = self._generate_url(endpoint="view_notification")
         return requests.get(
             url=url,
@@ -67,11 +114,74 @@ class OnesignalReader(ReaderInterface):
             params={"limit": limit, "total_count": "true", "offset": offset},
         )
 
-    @request_handler(wait=1, backoff_factor=0.5)
+    def _cache_key(self, limit: int, offset: int) -> dict:
+        """
+        Describe a view notification query for the response cache.
+        """
+        return {
+            "entity": self._app_id,
+            "request": {"limit": limit, "total_count": "true", "offset": offset},
+        }
+
+    @stage_handler("fetch")
+    @cache_handler(api="onesignal", key_builder="_cache_key")
+    def _view_notification_query(self, limit: int, offset: int) -> dict:
+        """
+        Gather a page of notifications as a json object.
+        """
+        return self._view_notification_query_handler(limit=limit, offset=offset).json()
+
+    @stage_handler("fetch")
+    @request_handler(vendor="onesignal_csv_export", qps=1)
     def _csv_export_query_handler(self):
+        import requests  # pylint: disable=import-outside-toplevel
+
         url = self._generate_url(endpoint="csv_export")
         return requests.post(url=url, headers=self._header)
 
+    def _read_csv_table(self, csv_url: str):
+        """
+        Stream the csv export into an Arrow table, decompressing it as it is
+        downloaded, see read_csv_table.
+        :param csv_url: The csv export url returned by Onesignal.
+        :return: The Arrow table.
+        """
+        path = urlparse(csv_url).path
+        compression = next(
+            (
+                codec
+                for extension, codec in _CSV_COMPRESSION.items()
+                if path.endswith(extension)
+            ),
+            None,
+        )
+        with urlopen(csv_url) as response:
+            return read_csv_table(
+                response,
+                column_types=PLAYER_EXPORT_TYPES,
+                compression=compression,
+                block_size=self._csv_block_size,
+            )
+
+    @stage_handler("decode")
+    def _read_csv_export(self, csv_url: str):
+        """
+        Download and decode the csv export.
+        :param csv_url: The csv export url returned by Onesignal.
+        :return: List of rows, or an Arrow table with the arrow csv_output.
+        """
+        with self._metrics.timer("decode_seconds", stage="csv_export"):
+            if self._csv_engine == "arrow":
+                table = self._read_csv_table(csv_url=csv_url)
+                if self._csv_output == "arrow":
+                    return table
+                return table.to_pylist()
+
+            import pandas as pd  # pylint: disable=import-outside-toplevel
+
+            data_frame: pd.DataFrame = pd.read_csv(csv_url)
+            return data_frame.to_dict(orient="records")
+
     def _get_csv_export_handler(self, response):
         """
         Attempts to gather the data from the csv url, and waits while
@@ -84,8 +194,10 @@ class OnesignalReader(ReaderInterface):
             while True:
                 try:
                     logging.info(f"Attempting to gather data from url: {csv_url}.")
-                    data_frame: pd.DataFrame = pd.read_csv(csv_url)
-                    self._data_set = data_frame.to_dict(orient="records")
+                    self._data_set = self._read_csv_export(csv_url=csv_url)
+                    self._metrics.increment(
+                        "rows", len(self._data_set), stage="fetch", entity="csv_export"
+                    )
                     logging.info("Data gathered, decompressing and serialising...")
 
                     logging.info(f"{self.__class__.__name__} process complete!")
@@ -112,6 +224,11 @@ class OnesignalReader(ReaderInterface):
         Generate a compressed CSV export of all of your current user data.
         This method can be used to generate a compressed CSV export of all of your current user data.
         View the details of multiple notifications.
+        With shard_count set, only the view notification offsets of shard_index are
+        gathered, while the csv export is gathered by a single shard.
+        Once the max_runtime or max_requests of the run are spent no further offsets
+        are gathered. With the arrow csv_output, the csv export dataset is an Arrow
+        table, written as it is by write_data_to_s3.
         :return: The response dataset.
         """
         _endpoint = self._configuration.get("endpoint")
@@ -120,22 +237,35 @@ class OnesignalReader(ReaderInterface):
 
         if _endpoint == "view_notification":
             # gather data per offset given the set of limits
-            initial_response = self._view_notification_query_handler(
-                limit=_limit, offset=0
-            ).json()
+            initial_response = self._view_notification_query(limit=_limit, offset=0)
             _total_records = int(initial_response.get("total_count"))
 
+            self._start_budget()
             for offset in range(0, _total_records, _limit):
+                if not self._is_unit_in_shard(entity=self._app_id, date=offset):
+                    continue
+                if self._budget_spent():
+                    break
+
                 logging.info(f"At offset {offset} of {_total_records}.")
-                response = self._view_notification_query_handler(
-                    limit=_limit, offset=offset
-                ).json()
+                response = self._view_notification_query(limit=_limit, offset=offset)
                 self._data_set.append(response)
+                self._metrics.increment(
+                    "rows",
+                    len(response.get("notifications", [])),
+                    stage="fetch",
+                    entity="view_notification",
+                )
 
             logging.info(f"{self.__class__.__name__} process complete!")
             return self._data_set
 
         if _endpoint == "csv_export":
+            # the export is a single unit, gathered by one shard
+            if not self._is_unit_in_shard(entity=self._app_id, date="csv_export"):
+                logging.info("The csv export belongs to another shard.")
+                return self._data_set
+
             # if connection is good, try to get the csv file from the Onesignal
             # Athena wrapper, it could take time to generate, so wait for it.
             response = self._csv_export_query_handler().json()
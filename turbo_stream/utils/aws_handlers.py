@@ -1,45 +1,155 @@
+import hashlib
 import json
 import logging
+import time
 
-import boto3
-import pandas as pd
 
-logging.basicConfig(
-    format="%(asctime)s %(name)-12s %(levelname)-8s %(message)s", level=logging.INFO
-)
+def _session(profile_name=None):
+    """
+    :param profile_name: Optional AWS profile name.
+    :return: A boto3 session, boto3 is imported on first use as it is slow to import.
+    """
+    import boto3  # pylint: disable=import-outside-toplevel
+
+    if profile_name is None:
+        return boto3.Session()
+    return boto3.Session(profile_name=profile_name)
 
 
-def write_file_to_s3(bucket: str, key: str, data: (list[dict], str), profile_name=None):
+def serialise_data(data: (list[dict], str), fmt: str):
+    """
+    Serialise data for writing, the same data always serialises to the same bytes.
+    :param data: The data object to be written, rows or an Arrow table.
+    :param fmt: json, csv or parquet, anything else is written as is. Rows are
+    written to Parquet through pandas, so every file of a dataset gets the same
+    dtypes, and repeated values are stored once per column chunk in its dictionary
+    pages. Arrow tables are written to Parquet as they are.
+    :return: The body as str or bytes.
+    """
+    import pandas as pd  # pylint: disable=import-outside-toplevel
+
+    if fmt in ("json", "csv") and hasattr(data, "to_pandas"):
+        data = data.to_pandas()
+
+    if fmt == "json":
+        return json.dumps(pd.DataFrame(data).to_json(orient="records"))
+    if fmt == "csv":
+        return pd.DataFrame(data).to_csv(header=True)
+    if fmt == "parquet":
+        if hasattr(data, "to_pandas"):
+            # pylint: disable=import-outside-toplevel
+            from .dataset_handlers import to_parquet_bytes
+
+            return to_parquet_bytes(data)
+        return pd.DataFrame(data).to_parquet()
+    return data
+
+
+def content_hash(body: (str, bytes)) -> str:
+    """
+    :return: The md5 hex digest of a body, matching the ETag s3 gives a single part
+    upload that is not encrypted with KMS.
+    """
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    return hashlib.md5(body).hexdigest()
+
+
+def list_etags(bucket: str, prefix: str, profile_name=None) -> dict:
+    """
+    List the ETags of every object under a prefix, a page of up to 1000 keys per call.
+    :param bucket: The bucket to list in s3.
+    :param prefix: The key prefix to list.
+    :param profile_name: Optional AWS profile name.
+    :return: ETags without quotes, keyed by key.
+    """
+    boto3_session = _session(profile_name)
+    s3_client = boto3_session.client("s3")
+    etags = {}
+    for page in s3_client.get_paginator("list_objects_v2").paginate(
+        Bucket=bucket, Prefix=prefix
+    ):
+        for item in page.get("Contents", []):
+            etags[item["Key"]] = item["ETag"].strip('"')
+    return etags
+
+
+def write_file_to_s3(
+    bucket: str,
+    key: str,
+    data: (list[dict], str),
+    profile_name=None,
+    metrics=None,
+    etags: dict = None,
+    body=None,
+):
     """
     Writes a file to s3. Json objects will be serialised before writing.
     :param bucket: The bucket to write to in s3.
     :param key: The key path and filename where the data will be stored.
     :param data: The data object to be written.
     :param profile_name: Optional AWS profile name.
-    :return: None
+    :param metrics: Optional RunMetrics recording serialisation time, rows and bytes.
+    :param etags: Optional stored ETags keyed by key, see list_etags. The upload is
+    skipped when the stored object already holds the same bytes.
+    :param body: Optional body the data has already been serialised to, see
+    serialise_handlers.serialise_partitions.
+    :return: The put response, or None when the upload was skipped.
     """
-    logging.info(f"Attempting to write data to s3://{bucket}/{key}")
+    file_fmt = key.split(".")[-1]
 
-    if profile_name is None:
-        boto3_session = boto3.Session()
-    else:
-        boto3_session = boto3.Session(profile_name=profile_name)
+    if body is None:
+        started = time.perf_counter()
+        body = serialise_data(data=data, fmt=file_fmt)
+
+        if metrics is not None:
+            metrics.observe(
+                "serialisation_seconds", time.perf_counter() - started, fmt=file_fmt
+            )
+
+    if etags is not None and etags.get(key) == content_hash(body):
+        logging.info(f"Skipping unchanged s3://{bucket}/{key}")
+        if metrics is not None:
+            metrics.increment("skipped_writes")
+        return None
+
+    logging.info(f"Attempting to write data to s3://{bucket}/{key}")
 
+    boto3_session = _session(profile_name)
     s3_resource = boto3_session.resource("s3")
     s3_object = s3_resource.Object(bucket, key)
-    data_frame = pd.DataFrame(data)
-    file_fmt = key.split(".")[-1]
 
-    if file_fmt == "json":
-        data_frame = data_frame.to_json(orient="records")
-        response = s3_object.put(Body=json.dumps(data_frame))
-    elif file_fmt == "csv":
-        data_frame = data_frame.to_csv(header=True)
-        response = s3_object.put(Body=data_frame)
-    elif file_fmt == "parquet":
-        data_frame = data_frame.to_parquet()
-        response = s3_object.put(Body=data_frame)
-    else:
-        response = s3_object.put(Body=data)
+    if metrics is not None:
+        if isinstance(body, str):
+            metrics.increment("bytes", len(body.encode("utf-8")), stage="write")
+        elif isinstance(body, bytes):
+            metrics.increment("bytes", len(body), stage="write")
+        if isinstance(data, list):
+            metrics.increment("rows", len(data), stage="write")
+
+    started = time.perf_counter()
+    response = s3_object.put(Body=body)
+    if metrics is not None:
+        metrics.observe("upload_seconds", time.perf_counter() - started)
 
     return response
+
+
+def read_file_from_s3(bucket: str, key: str, profile_name=None):
+    """
+    Reads a file from s3 and returns the raw body.
+    :param bucket: The bucket to read from in s3.
+    :param key: The key path and filename of the stored data.
+    :param profile_name: Optional AWS profile name.
+    :return: The body as bytes, or None if the key does not exist.
+    """
+    logging.info(f"Attempting to read data from s3://{bucket}/{key}")
+
+    boto3_session = _session(profile_name)
+    s3_client = boto3_session.client("s3")
+    try:
+        response = s3_client.get_object(Bucket=bucket, Key=key)
+    except s3_client.exceptions.NoSuchKey:
+        return None
+
+    return response["Body"].read()
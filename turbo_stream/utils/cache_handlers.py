@@ -0,0 +1,241 @@
+"""
+Cache Handler Methods & Wrappers
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from functools import wraps
+
+
+class ResponseCache:
+    """
+    Content addressed on-disk cache for api responses.
+    Entries are keyed on the api, the entity (site url, view id or app id) and the
+    canonical request body. Responses for dates older than the finalisation lag of
+    the vendor never expire, anything more recent is kept for mutable_ttl seconds.
+    The cache is bounded by max_bytes, evicting the least recently used entries.
+    """
+
+    def __init__(
+        self,
+        directory: str = ".turbo_stream_cache",
+        max_bytes: int = 1024**3,
+        mutable_ttl: float = 0,
+    ):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.mutable_ttl = mutable_ttl
+
+        self._lock = threading.Lock()
+        self._index: dict = {}  # path -> [size, last used]
+        self._total_bytes = 0
+        self._load_index()
+
+    def _load_index(self) -> None:
+        for root, _, files in os.walk(self.directory):
+            for file in files:
+                if not file.endswith(".json"):
+                    continue
+                path = os.path.join(root, file)
+                stat = os.stat(path)
+                self._index[path] = [stat.st_size, stat.st_mtime]
+                self._total_bytes += stat.st_size
+
+    @staticmethod
+    def cache_key(api: str, entity, request) -> str:
+        """
+        Generate the content address of a request.
+        :param api: The api name, such as google_analytics.
+        :param entity: The site url, view id or app id the request is made for.
+        :param request: The request body, serialised with sorted keys.
+        :return: Sha256 hex digest.
+        """
+        canonical = json.dumps(
+            {"api": api, "entity": entity, "request": request},
+            sort_keys=True,
+            separators=(",", ":"),
+            default=str,
+        )
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def _expires_at(self, date: str, data_state: str, mutable_lookback: int):
+        """
+        :return: None if the response never expires, otherwise the expiry timestamp.
+        """
+        cutoff = (datetime.now() - timedelta(days=mutable_lookback)).strftime(
+            "%Y-%m-%d"
+        )
+        if date is not None and date < cutoff and data_state in (None, "final"):
+            return None
+
+        return time.time() + self.mutable_ttl
+
+    def get(self, api: str, entity, request):
+        """
+        Gather a cached response.
+        :param api: The api name, such as google_analytics.
+        :param entity: The site url, view id or app id the request is made for.
+        :param request: The request body.
+        :return: The cached response, or None on a cache miss.
+        """
+        path = self._path(self.cache_key(api=api, entity=entity, request=request))
+        with self._lock:
+            if path not in self._index:
+                return None
+            try:
+                with open(path, "r", encoding="utf-8") as file:
+                    entry = json.load(file)
+            except (OSError, ValueError):
+                self._remove(path)
+                return None
+
+            if entry["expires_at"] is not None and entry["expires_at"] < time.time():
+                self._remove(path)
+                return None
+
+            now = time.time()
+            os.utime(path, (now, now))
+            self._index[path][1] = now
+            return entry["response"]
+
+    def set(
+        self,
+        api: str,
+        entity,
+        request,
+        response,
+        date: str = None,
+        data_state: str = None,
+        mutable_lookback: int = 0,
+    ) -> None:
+        """
+        Store a response, if its data is final or a mutable ttl is configured.
+        :param api: The api name, such as google_analytics.
+        :param entity: The site url, view id or app id the request is made for.
+        :param request: The request body.
+        :param response: Json serialisable response object.
+        :param date: The date of the data in the response formatted as '%Y-%m-%d'.
+        :param data_state: The vendor data state, such as final or all.
+        :param mutable_lookback: Number of days in which the data is still subject to change.
+        :return: None
+        """
+        expires_at = self._expires_at(
+            date=date, data_state=data_state, mutable_lookback=mutable_lookback
+        )
+        if expires_at is not None and self.mutable_ttl <= 0:
+            return
+
+        path = self._path(self.cache_key(api=api, entity=entity, request=request))
+        body = json.dumps({"expires_at": expires_at, "response": response})
+
+        with self._lock:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as file:
+                file.write(body)
+            os.replace(temp_path, path)
+
+            if path in self._index:
+                self._total_bytes -= self._index[path][0]
+            size = os.path.getsize(path)
+            self._index[path] = [size, time.time()]
+            self._total_bytes += size
+            self._evict()
+
+    def _remove(self, path: str) -> None:
+        size, _ = self._index.pop(path, (0, 0))
+        self._total_bytes -= size
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def _evict(self) -> None:
+        """
+        Remove the least recently used entries until the cache fits in max_bytes.
+        """
+        if self._total_bytes <= self.max_bytes:
+            return
+
+        for path, _ in sorted(self._index.items(), key=lambda item: item[1][1]):
+            if self._total_bytes <= self.max_bytes:
+                break
+            self._remove(path)
+
+
+def cache_handler(api: str, key_builder: str):
+    """
+    Wrapper to serve reader requests from the reader response cache.
+    The wrapped method is only called on a cache miss, the reader is
+    expected to hold a _response_cache, with None disabling the cache.
+    Coroutine methods are wrapped with a coroutine.
+    :param api: The api name the cache entries are stored under.
+    :param key_builder: Name of the reader method returning a dict of entity, request,
+    and optionally date and data_state, given the same arguments as the wrapped method.
+    :return: None
+    """
+
+    def _key(self, args, kwargs):
+        cache = getattr(self, "_response_cache", None)
+        if cache is None:
+            return None, None
+        return cache, getattr(self, key_builder)(*args, **kwargs)
+
+    def _store(self, cache, key, response) -> None:
+        if response is not None:
+            cache.set(
+                api=api,
+                entity=key["entity"],
+                request=key["request"],
+                response=response,
+                date=key.get("date"),
+                data_state=key.get("data_state"),
+                mutable_lookback=getattr(self, "_mutable_lookback", 0),
+            )
+
+    def _cached(cache, key):
+        response = cache.get(api=api, entity=key["entity"], request=key["request"])
+        if response is not None:
+            logging.info(f"Serving {api} response from cache.")
+        return response
+
+    def cache_decorator(function):
+        if asyncio.iscoroutinefunction(function):
+
+            @wraps(function)
+            async def async_func_with_cache(self, *args, **kwargs):
+                cache, key = _key(self, args, kwargs)
+                if cache is None:
+                    return await function(self, *args, **kwargs)
+
+                response = _cached(cache, key)
+                if response is None:
+                    response = await function(self, *args, **kwargs)
+                    _store(self, cache, key, response)
+                return response
+
+            return async_func_with_cache
+
+        @wraps(function)
+        def func_with_cache(self, *args, **kwargs):
+            cache, key = _key(self, args, kwargs)
+            if cache is None:
+                return function(self, *args, **kwargs)
+
+            response = _cached(cache, key)
+            if response is None:
+                response = function(self, *args, **kwargs)
+                _store(self, cache, key, response)
+            return response
+
+        return func_with_cache
+
+    return cache_decorator
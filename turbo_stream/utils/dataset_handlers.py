@@ -0,0 +1,168 @@
+"""
+Dataset Handler Methods
+"""
+import io
+
+
+class CategoryPool:
+    """
+    Share a single instance of each repeated string value of a column, so that low
+    cardinality fields such as dates, devices or countries are not held as a separate
+    string object on every row.
+    A column is left alone once it has more than max_categories distinct values,
+    which keeps high cardinality fields such as page urls out of the pool.
+    """
+
+    def __init__(self, max_categories: int = 1000):
+        self.max_categories = max_categories
+        self._columns: dict = {}  # column -> {value: value}, None once too many
+
+    def intern(self, column, value):
+        """
+        :param column: The column the value belongs to.
+        :param value: The value of a row.
+        :return: The pooled instance of a string value, otherwise the value itself.
+        """
+        if not isinstance(value, str):
+            return value
+
+        values = self._columns.setdefault(column, {})
+        if values is None:
+            return value
+        pooled = values.get(value)
+        if pooled is not None:
+            return pooled
+
+        if len(values) >= self.max_categories:
+            self._columns[column] = None
+            return value
+        values[value] = value
+        return value
+
+    def categories(self) -> dict:
+        """
+        :return: The distinct values of each pooled column, keyed by column.
+        """
+        return {
+            column: list(values)
+            for column, values in self._columns.items()
+            if values is not None
+        }
+
+
+def to_arrow_table(data: list):
+    """
+    Build an Arrow table from rows, with the columns of every row in order of
+    appearance, as pandas builds its columns. Arrow tables are returned as they are.
+    :param data: List of rows.
+    :return: The table, or None when the rows would not serialise the same through an
+    Arrow table, such as columns of mixed types or only nulls.
+    """
+    import pyarrow as pa  # pylint: disable=import-outside-toplevel
+
+    if isinstance(data, pa.Table):
+        return data
+    if not isinstance(data, list) or not data or not isinstance(data[0], dict):
+        return None
+
+    columns = list(dict.fromkeys(key for row in data for key in row))
+    try:
+        table = pa.Table.from_pydict(
+            {column: [row.get(column) for row in data] for column in columns}
+        )
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return None
+    # pandas keeps columns of only nulls as objects, which arrow can not tell apart
+    if any(pa.types.is_null(field.type) for field in table.schema):
+        return None
+    return table
+
+
+def to_parquet_bytes(table) -> bytes:
+    """
+    Write an Arrow table as a Parquet file, keeping its dictionary encoded columns
+    and schema metadata.
+    :param table: The Arrow table.
+    :return: The Parquet file body.
+    """
+    import pyarrow.parquet as pq  # pylint: disable=import-outside-toplevel
+
+    sink = io.BytesIO()
+    pq.write_table(table, sink)
+    return sink.getvalue()
+
+
+def read_csv_table(
+    source,
+    column_types: dict = None,
+    compression: str = None,
+    block_size: int = None,
+    use_threads: bool = True,
+):
+    """
+    Decode a csv file into an Arrow table, parsing blocks of the file on a pool of
+    threads, without a pandas round trip.
+    :param source: A path, or a file object such as an http response.
+    :param column_types: Optional Arrow type aliases keyed by column, such as int64 or
+    timestamp[s]. Columns left out are inferred, and declared columns missing from the
+    file are ignored. Boolean columns also accept t and f.
+    :param compression: Optional codec the source is compressed with, such as gzip.
+    :param block_size: Optional bytes parsed per block, see pyarrow.csv.ReadOptions.
+    :param use_threads: Parse the blocks on multiple threads.
+    :return: The table.
+    """
+    # pylint: disable=import-outside-toplevel
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+
+    if not isinstance(source, (str, pa.NativeFile)):
+        source = pa.PythonFile(source, mode="r")
+    if compression is not None:
+        source = pa.CompressedInputStream(source, compression)
+
+    read_options = pa_csv.ReadOptions(use_threads=use_threads)
+    if block_size is not None:
+        read_options.block_size = block_size
+    convert_options = pa_csv.ConvertOptions(
+        column_types={
+            column: pa.type_for_alias(alias)
+            for column, alias in (column_types or {}).items()
+        },
+        true_values=["t", "true", "True", "TRUE", "1"],
+        false_values=["f", "false", "False", "FALSE", "0"],
+    )
+    return pa_csv.read_csv(
+        source, read_options=read_options, convert_options=convert_options
+    )
+
+
+def partition_table(table, partition: str) -> dict:
+    """
+    Split an Arrow table by the values of a column with Arrow compute functions, the
+    table counterpart of partitioning rows. The rows are grouped with a stable sort
+    on the dictionary indices of the column, so each partition keeps the order of
+    its rows.
+    :param table: The Arrow table.
+    :param partition: The column to partition by, a missing column gives a single
+    partition keyed by None.
+    :return: Tables keyed by partition value, in order of first appearance.
+    """
+    import pyarrow.compute as pc  # pylint: disable=import-outside-toplevel
+
+    if partition not in table.column_names:
+        return {None: table}
+
+    encoded = pc.dictionary_encode(
+        table.column(partition).combine_chunks(), null_encoding="encode"
+    )
+    order = pc.sort_indices(encoded.indices)
+    table = table.take(order)
+
+    partition_dataset = {}
+    offset = 0
+    for item in pc.value_counts(encoded.indices.take(order)):
+        count = item["counts"].as_py()
+        value = encoded.dictionary[item["values"].as_py()].as_py()
+        partition_dataset[value] = table.slice(offset, count)
+        offset += count
+    return partition_dataset
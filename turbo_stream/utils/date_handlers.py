@@ -1,16 +1,12 @@
 """
 Date Handler Methods
 """
-import logging
 import re
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
+from typing import NamedTuple
 
 from dateutil.relativedelta import relativedelta
 
-logging.basicConfig(
-    format="%(asctime)s %(name)-12s %(levelname)-8s %(message)s", level=logging.INFO
-)
-
 
 def _is_integer(num):
     try:
@@ -105,3 +101,102 @@ def date_range(start_date, end_date, delta=timedelta(days=1), date_format="%Y-%m
     while current_date <= end_date:
         yield current_date.strftime(date_format)
         current_date += delta
+
+
+class DateWindow(NamedTuple):
+    """
+    An inclusive window of dates, see plan_windows.
+    """
+
+    start: date
+    end: date
+    start_date: str
+    end_date: str
+
+    @property
+    def days(self) -> int:
+        """
+        :return: The number of days in the window.
+        """
+        return (self.end - self.start).days + 1
+
+
+def _window_start(day: date, window) -> date:
+    """
+    :return: The start of the aligned window a day falls in.
+    """
+    if window == "day":
+        return day
+    if window == "week":
+        return day - timedelta(days=day.weekday())
+    if window == "month":
+        return day.replace(day=1)
+
+    raise ValueError(
+        f"Given window: {window} is not supported. "
+        f"Try day, week, month or a number of days."
+    )
+
+
+def plan_windows(
+    start_date,
+    end_date,
+    window="day",
+    reverse: bool = False,
+    completed=None,
+    date_format="%Y-%m-%d",
+) -> list:
+    """
+    Split an inclusive date range into windows, aligned to calendar weeks (starting on
+    Monday) or months, with the first and last windows clipped to the range.
+    A number of days, or a timedelta, gives windows of that length from start_date.
+    :param start_date: The first date of the range, a date string or a phrase such as
+    3_days_ago, see phrase_to_date.
+    :param end_date: The last date of the range, a date string or a phrase.
+    :param window: day, week, month, or a number of days.
+    :param reverse: Plan the most recent window first.
+    :param completed: Optional container of window start dates, formatted as
+    date_format, or a function given a window returning True once it is complete.
+    Completed windows are left out of the plan.
+    :param date_format: The format of the given dates and the window strings.
+    :return: List of DateWindow objects.
+    """
+    first = datetime.strptime(phrase_to_date(start_date, date_format), date_format)
+    last = datetime.strptime(phrase_to_date(end_date, date_format), date_format)
+    first, last = first.date(), last.date()
+
+    if isinstance(window, timedelta):
+        window = window.days
+    if isinstance(window, int) and window < 1:
+        raise ValueError(f"Given window: {window} must be at least a day.")
+
+    windows = []
+    start = first
+    while start <= last:
+        if isinstance(window, int):
+            next_start = start + timedelta(days=window)
+        elif window == "month":
+            next_start = _window_start(start, window) + relativedelta(months=1)
+        else:
+            next_start = _window_start(start, window) + timedelta(
+                days=7 if window == "week" else 1
+            )
+        end = min(next_start - timedelta(days=1), last)
+
+        planned = DateWindow(
+            start=start,
+            end=end,
+            start_date=start.strftime(date_format),
+            end_date=end.strftime(date_format),
+        )
+        if completed is None or not (
+            completed(planned)
+            if callable(completed)
+            else planned.start_date in completed
+        ):
+            windows.append(planned)
+        start = next_start
+
+    if reverse:
+        windows.reverse()
+    return windows
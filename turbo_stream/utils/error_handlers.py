@@ -0,0 +1,229 @@
+"""
+Error Handler Methods
+"""
+import json
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+# error classes returned by classify_error
+RATE_LIMITED = "rate_limited"
+QUOTA_EXHAUSTED = "quota_exhausted"
+SERVER_ERROR = "server_error"
+CLIENT_ERROR = "client_error"
+TRANSIENT = "transient"
+
+# error classes worth another attempt
+RETRYABLE_ERRORS = (RATE_LIMITED, SERVER_ERROR, TRANSIENT)
+
+# google error reasons, see https://developers.google.com/analytics/devguides/reporting/core/v4/errors
+_DAILY_QUOTA_REASONS = {"dailyLimitExceeded", "dailyLimitExceededUnreg"}
+_RATE_LIMIT_REASONS = {
+    "rateLimitExceeded",
+    "userRateLimitExceeded",
+    "quotaExceeded",
+    "RATE_LIMIT_EXCEEDED",
+    "RESOURCE_EXHAUSTED",
+}
+
+_CIRCUIT_BREAKERS: dict = {}
+_REGISTRY_LOCK = threading.Lock()
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised when calls to an endpoint are refused while its circuit is open.
+    """
+
+
+def _error_response(exception):
+    """
+    Gather the status code, headers and body of a googleapiclient, requests or aiohttp error.
+    :return: (status, headers, content), with None for anything not available.
+    """
+    # googleapiclient.errors.HttpError keeps a httplib2 response with lowercase headers
+    resp = getattr(exception, "resp", None)
+    if resp is not None and getattr(resp, "status", None) is not None:
+        return int(resp.status), resp, getattr(exception, "content", None)
+
+    # requests.exceptions.HTTPError keeps the requests response
+    response = getattr(exception, "response", None)
+    if response is not None and getattr(response, "status_code", None) is not None:
+        headers = {key.lower(): value for key, value in response.headers.items()}
+        return int(response.status_code), headers, response.content
+
+    # aiohttp.ClientResponseError keeps the status and headers on the exception
+    status = getattr(exception, "status", None)
+    if isinstance(status, int):
+        headers = getattr(exception, "headers", None) or {}
+        headers = {key.lower(): value for key, value in headers.items()}
+        return status, headers, None
+
+    return None, {}, None
+
+
+def _error_reasons(content) -> set:
+    """
+    Gather the error reasons from a google error body.
+    """
+    try:
+        error = json.loads(content).get("error", {})
+    except (TypeError, ValueError, AttributeError):
+        return set()
+    if not isinstance(error, dict):
+        return set()
+
+    reasons = {item.get("reason") for item in error.get("errors", [])}
+    reasons.add(error.get("status"))
+    for detail in error.get("details", []):
+        reasons.add(detail.get("reason"))
+        quota_limit = detail.get("metadata", {}).get("quota_limit", "")
+        if "perday" in quota_limit.lower():
+            reasons.add("dailyLimitExceeded")
+    if "per day" in str(error.get("message", "")).lower():
+        reasons.add("dailyLimitExceeded")
+
+    reasons.discard(None)
+    return reasons
+
+
+def classify_error(exception) -> str:
+    """
+    Classify an exception raised by a vendor request.
+    :param exception: The exception raised.
+    :return: One of rate_limited, quota_exhausted, server_error, client_error or transient.
+    """
+    status, _, content = _error_response(exception)
+    if status is None:
+        # timeouts and connection errors carry no response
+        return TRANSIENT
+
+    reasons = _error_reasons(content)
+    if reasons & _DAILY_QUOTA_REASONS:
+        return QUOTA_EXHAUSTED
+    if status == 429 or (status == 403 and reasons & _RATE_LIMIT_REASONS):
+        return RATE_LIMITED
+    if status >= 500:
+        return SERVER_ERROR
+    return CLIENT_ERROR
+
+
+def retry_after(exception):
+    """
+    Gather the Retry-After header of an error response in seconds.
+    :param exception: The exception raised.
+    :return: Seconds to wait, or None if the vendor gave no instruction.
+    """
+    _, headers, _ = _error_response(exception)
+    value = headers.get("retry-after") if headers else None
+    if value is None:
+        return None
+
+    try:
+        return max(float(value), 0)
+    except ValueError:
+        pass
+
+    try:
+        retry_date = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max((retry_date - datetime.now(timezone.utc)).total_seconds(), 0)
+
+
+class CircuitBreaker:
+    """
+    Fails fast on an endpoint that keeps failing.
+    After failure_threshold consecutive failures the circuit opens and calls are
+    refused for reset_timeout seconds, after which a single trial call is let through.
+    A successful trial closes the circuit, a failed one opens it again, and a trial
+    that ends without either is released, so that the next call is a trial instead.
+    """
+
+    def __init__(self, endpoint: str, failure_threshold: int = 5, reset_timeout=60):
+        self.endpoint = endpoint
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+
+    @property
+    def is_open(self) -> bool:
+        """
+        :return: True while calls to the endpoint are being refused.
+        """
+        with self._lock:
+            return self._opened_at is not None and (
+                time.monotonic() - self._opened_at < self.reset_timeout
+                or self._trial_in_flight
+            )
+
+    def before_call(self) -> bool:
+        """
+        Raise CircuitOpenError if the endpoint is currently refusing calls.
+        :return: True if the call is the trial call of a half open circuit.
+        """
+        with self._lock:
+            if self._opened_at is None:
+                return False
+
+            remaining = self.reset_timeout - (time.monotonic() - self._opened_at)
+            if remaining <= 0 and not self._trial_in_flight:
+                self._trial_in_flight = True
+                logging.info(f"Circuit for {self.endpoint} half open, trying a call.")
+                return True
+
+            raise CircuitOpenError(
+                f"Circuit for {self.endpoint} is open after {self._failures} "
+                f"consecutive failures, refusing calls for {round(max(remaining, 0), 2)} seconds."
+            )
+
+    def record_success(self) -> None:
+        """
+        Close the circuit.
+        """
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def release_trial(self) -> None:
+        """
+        Let the next call through as a trial, when the trial call ended without
+        recording a success or a failure, such as on an unhandled exception.
+        """
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        """
+        Count a failure, opening the circuit once the threshold is reached.
+        """
+        with self._lock:
+            self._failures += 1
+            if self._trial_in_flight or self._failures >= self.failure_threshold:
+                if self._opened_at is None or self._trial_in_flight:
+                    logging.warning(
+                        f"Opening circuit for {self.endpoint} after "
+                        f"{self._failures} consecutive failures."
+                    )
+                self._opened_at = time.monotonic()
+                self._trial_in_flight = False
+
+
+def get_circuit_breaker(endpoint: str, **kwargs) -> CircuitBreaker:
+    """
+    Gather the circuit breaker shared by every caller of an endpoint.
+    :param endpoint: The endpoint name.
+    :param kwargs: failure_threshold and reset_timeout used when first created.
+    :return: Shared CircuitBreaker.
+    """
+    with _REGISTRY_LOCK:
+        if endpoint not in _CIRCUIT_BREAKERS:
+            _CIRCUIT_BREAKERS[endpoint] = CircuitBreaker(endpoint=endpoint, **kwargs)
+        return _CIRCUIT_BREAKERS[endpoint]
@@ -2,14 +2,6 @@
 File Handler Methods
 """
 import json
-import logging
-
-import pandas as pd
-import yaml
-
-logging.basicConfig(
-    format="%(asctime)s %(name)-12s %(levelname)-8s %(message)s", level=logging.INFO
-)
 
 
 def load_file(file_location: str, fmt: str) -> dict:
@@ -17,6 +9,8 @@ def load_file(file_location: str, fmt: str) -> dict:
     Gathers file data from json or yaml.
     """
     if fmt in ["yaml", "yml"]:
+        import yaml  # pylint: disable=import-outside-toplevel
+
         with open(file_location, "r", encoding="utf-8") as file:
             return yaml.safe_load(file)
 
@@ -29,11 +23,17 @@ def load_file(file_location: str, fmt: str) -> dict:
 
 def write_file(data: (dict, list), file_location):
     """
-    Writes object to json, csv or yaml.
+    Writes object to json, csv or yaml. Arrow tables are written as rows, with
+    timestamps as iso strings.
     """
     fmt = file_location.split(".")[-1]
 
+    if hasattr(data, "to_pandas"):
+        data = json.loads(data.to_pandas().to_json(orient="records", date_format="iso"))
+
     if fmt in ["yaml", "yml"]:
+        import yaml  # pylint: disable=import-outside-toplevel
+
         with open(file_location, "w", encoding="utf-8") as file:
             file.write(yaml.dump(data, sort_keys=False))
 
@@ -42,6 +42,8 @@ def write_file(data: (dict, list), file_location):
             file.write(json.dumps(data))
 
     elif fmt == "csv":
+        import pandas as pd  # pylint: disable=import-outside-toplevel
+
         try:
             df = pd.DataFrame(data)
             df.to_csv(file_location, header=True, index=True)
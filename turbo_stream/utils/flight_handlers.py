@@ -0,0 +1,167 @@
+"""
+Flight Handler Methods & Wrappers
+"""
+import asyncio
+import threading
+from functools import wraps
+
+from .cache_handlers import ResponseCache
+from .rate_handlers import credential_key
+
+
+# handed to the waiters of a coroutine call whose leader was cancelled
+_LEADER_CANCELLED = object()
+
+
+class _Call:
+    """
+    An upstream call in flight, along with its outcome once it is done.
+    """
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: BaseException = None
+
+
+class SingleFlight:
+    """
+    Share a single upstream call between identical calls made at the same time.
+    The first caller of a key makes the call, while later callers of the key wait
+    for it and are given the same response object, or raise the same exception.
+    Calls are only shared while in flight, a call made after it is done is sent again.
+    Threads share calls across the process, coroutines across their event loop.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: dict = {}
+        self._futures: dict = {}
+
+    def do(self, key: str, function):
+        """
+        Call a function, unless a call of the same key is already in flight.
+        :param key: The key identifying identical calls.
+        :param function: Function making the upstream call.
+        :return: A (response, shared) pair, shared is True for a waiting caller.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = function()
+            return call.result, False
+        except BaseException as error:
+            call.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    async def do_async(self, key: str, function):
+        """
+        Await a coroutine function, unless a call of the same key is already in flight
+        on the running event loop. A cancelled caller only cancels its own await, when
+        the caller making the call is cancelled the waiters issue the call again.
+        :param key: The key identifying identical calls.
+        :param function: Coroutine function making the upstream call.
+        :return: A (response, shared) pair, shared is True for a waiting caller.
+        """
+        loop = asyncio.get_running_loop()
+        flight_key = (id(loop), key)
+        with self._lock:
+            future = self._futures.get(flight_key)
+            leader = future is None
+            if leader:
+                future = self._futures[flight_key] = loop.create_future()
+
+        if not leader:
+            # a waiter being cancelled leaves the call to the other callers
+            result = await asyncio.shield(future)
+            if result is _LEADER_CANCELLED:
+                # the call was left unfinished rather than failing, one of the
+                # waiters leads it again and the rest wait on that call
+                return await self.do_async(key, function)
+            return result, True
+
+        try:
+            result = await function()
+            future.set_result(result)
+            return result, False
+        except asyncio.CancelledError:
+            future.set_result(_LEADER_CANCELLED)
+            raise
+        except BaseException as error:
+            future.set_exception(error)
+            # the exception is raised here, whether or not anyone else waited
+            future.exception()
+            raise
+        finally:
+            with self._lock:
+                del self._futures[flight_key]
+
+
+# shared by every reader, so identical requests of concurrent jobs are sent once
+_SINGLE_FLIGHT = SingleFlight()
+
+
+def coalesce_handler(api: str, key_builder: str):
+    """
+    Wrapper to share one upstream call between identical reader requests that are
+    in flight at the same time, such as jobs querying the same view and dates.
+    Requests are identical when their api, credentials, entity and canonical request
+    body match, waiting requests do not count against the rate limits, so the
+    wrapper is placed above the request_handler. Coroutine methods are wrapped with
+    a coroutine.
+    :param api: The api name the requests are keyed under.
+    :param key_builder: Name of the reader method returning a dict of entity and
+    request, given the same arguments as the wrapped method, see cache_handler.
+    :return: None
+    """
+
+    def _key(self, args, kwargs) -> str:
+        key = getattr(self, key_builder)(*args, **kwargs)
+        return ResponseCache.cache_key(
+            api=f"{api}:{credential_key(getattr(self, '_credentials', None))}",
+            entity=key["entity"],
+            request=key["request"],
+        )
+
+    def _record(self, shared: bool) -> None:
+        if shared:
+            self._metrics.increment("coalesced_requests", api=api)
+
+    def coalesce_decorator(function):
+        if asyncio.iscoroutinefunction(function):
+
+            @wraps(function)
+            async def async_func_with_coalesce(self, *args, **kwargs):
+                response, shared = await _SINGLE_FLIGHT.do_async(
+                    _key(self, args, kwargs), lambda: function(self, *args, **kwargs)
+                )
+                _record(self, shared)
+                return response
+
+            return async_func_with_coalesce
+
+        @wraps(function)
+        def func_with_coalesce(self, *args, **kwargs):
+            response, shared = _SINGLE_FLIGHT.do(
+                _key(self, args, kwargs), lambda: function(self, *args, **kwargs)
+            )
+            _record(self, shared)
+            return response
+
+        return func_with_coalesce
+
+    return coalesce_decorator
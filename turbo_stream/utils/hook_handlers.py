@@ -0,0 +1,229 @@
+"""
+Hook Handler Methods & Wrappers
+"""
+import asyncio
+import cProfile
+import io
+import logging
+import pstats
+import threading
+import time
+import tracemalloc
+from functools import wraps
+
+# reader stages that hooks can be registered for
+STAGES = ("fetch", "decode", "partition", "write")
+
+
+def stage_handler(stage: str):
+    """
+    Wrapper to run the hooks registered on a reader around one of its stages.
+    Hooks receive a context dict holding the stage, reader, function, args and kwargs,
+    after the call it also holds the elapsed seconds, the result, its size and any error.
+    When no hooks are registered for the stage the wrapped method is called directly.
+    Coroutine methods are wrapped with a coroutine.
+    :param stage: One of fetch, decode, partition or write.
+    :return: None
+    """
+
+    def _before(self, function, args, kwargs):
+        context = {
+            "stage": stage,
+            "reader": self,
+            "function": function.__name__,
+            "args": args,
+            "kwargs": kwargs,
+        }
+        for hook in self._hooks[stage]:
+            hook.before(context)
+        return context
+
+    def _after(self, context, started: float) -> None:
+        context["elapsed"] = time.perf_counter() - started
+        for hook in reversed(self._hooks[stage]):
+            hook.after(context)
+
+    def stage_decorator(function):
+        if asyncio.iscoroutinefunction(function):
+
+            @wraps(function)
+            async def async_func_with_hooks(self, *args, **kwargs):
+                if not self._hooks.get(stage):
+                    return await function(self, *args, **kwargs)
+
+                context = _before(self, function, args, kwargs)
+                started = time.perf_counter()
+                try:
+                    result = await function(self, *args, **kwargs)
+                except Exception as exception:
+                    context["error"] = exception
+                    raise
+                else:
+                    context["result"] = result
+                    context["size"] = _size(result)
+                    return result
+                finally:
+                    _after(self, context, started)
+
+            return async_func_with_hooks
+
+        @wraps(function)
+        def func_with_hooks(self, *args, **kwargs):
+            if not self._hooks.get(stage):
+                return function(self, *args, **kwargs)
+
+            context = _before(self, function, args, kwargs)
+            started = time.perf_counter()
+            try:
+                result = function(self, *args, **kwargs)
+            except Exception as exception:
+                context["error"] = exception
+                raise
+            else:
+                context["result"] = result
+                context["size"] = _size(result)
+                return result
+            finally:
+                _after(self, context, started)
+
+        return func_with_hooks
+
+    return stage_decorator
+
+
+def _size(result):
+    """
+    :return: The number of items or bytes in a stage result, or None if unknown.
+    """
+    if isinstance(result, int) and not isinstance(result, bool):
+        return result
+    try:
+        return len(result)
+    except TypeError:
+        return None
+
+
+class StageHook:
+    """
+    Base class for stage hooks, override before and after as needed.
+    """
+
+    def before(self, context: dict) -> None:
+        """
+        Called before the stage runs.
+        :param context: The stage context.
+        """
+
+    def after(self, context: dict) -> None:
+        """
+        Called after the stage ran, including when it raised.
+        :param context: The stage context, including elapsed, size and result or error.
+        """
+
+
+class SlowStageHook(StageHook):
+    """
+    Logs stage calls that take longer than a threshold, such as slow requests.
+    """
+
+    def __init__(self, threshold: float = 5):
+        self.threshold = threshold
+
+    def after(self, context: dict) -> None:
+        if context["elapsed"] >= self.threshold:
+            logging.warning(
+                f"Slow {context['stage']} stage: {context['function']} took "
+                f"{round(context['elapsed'], 2)} seconds, args: {context['args']}, "
+                f"kwargs: {context['kwargs']}."
+            )
+
+
+class ProfileHook(StageHook):
+    """
+    Profiles every n-th call of a stage with cProfile, logging the top functions.
+    Optionally dumps the stats of each profiled call for snakeviz or pstats.
+    """
+
+    def __init__(
+        self,
+        every: int = 1,
+        sort: str = "cumulative",
+        limit: int = 20,
+        file_location: str = None,
+    ):
+        self.every = max(every, 1)
+        self.sort = sort
+        self.limit = limit
+        self.file_location = file_location
+
+        self._lock = threading.Lock()
+        self._calls = 0
+        self._profiled = 0
+
+    def before(self, context: dict) -> None:
+        with self._lock:
+            self._calls += 1
+            if (self._calls - 1) % self.every:
+                return
+
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # only one profiler can be active at a time on python 3.12 and up
+            logging.info(f"Profiler busy, skipping {context['function']}.")
+            return
+        context["profiler"] = profiler
+
+    def after(self, context: dict) -> None:
+        profiler = context.pop("profiler", None)
+        if profiler is None:
+            return
+        profiler.disable()
+
+        stream = io.StringIO()
+        stats = pstats.Stats(profiler, stream=stream).sort_stats(self.sort)
+        stats.print_stats(self.limit)
+        logging.info(f"Profile of {context['function']}:\n{stream.getvalue()}")
+
+        if self.file_location is not None:
+            with self._lock:
+                self._profiled += 1
+                file_location = f"{self.file_location}.{self._profiled}"
+            stats.dump_stats(file_location)
+
+
+class TracemallocHook(StageHook):
+    """
+    Takes tracemalloc snapshots around a stage, logging the largest allocations.
+    Tracing is started if needed, and stopped again if it was started by this hook.
+    """
+
+    def __init__(self, limit: int = 10, frames: int = 1):
+        self.limit = limit
+        self.frames = frames
+
+    def before(self, context: dict) -> None:
+        context["tracemalloc_started"] = not tracemalloc.is_tracing()
+        if context["tracemalloc_started"]:
+            tracemalloc.start(self.frames)
+        if hasattr(tracemalloc, "reset_peak"):
+            # python 3.9 and up
+            tracemalloc.reset_peak()
+        context["snapshot"] = tracemalloc.take_snapshot()
+
+    def after(self, context: dict) -> None:
+        snapshot = context.pop("snapshot", None)
+        if snapshot is None:
+            return
+
+        statistics = tracemalloc.take_snapshot().compare_to(snapshot, "lineno")
+        _, peak = tracemalloc.get_traced_memory()
+        context["peak_traced_bytes"] = peak
+        if context.pop("tracemalloc_started"):
+            tracemalloc.stop()
+
+        top = "\n".join(str(statistic) for statistic in statistics[: self.limit])
+        logging.info(
+            f"Memory of {context['function']}, peak {peak} bytes traced:\n{top}"
+        )
@@ -0,0 +1,134 @@
+"""
+Json Handler Methods
+"""
+import json
+import re
+
+_DECODER = json.JSONDecoder()
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+
+def raw_body(response, content) -> str:
+    """
+    A googleapiclient postproc returning the undecoded response body, so that it can
+    be decoded with stream_json rather than into a single nested object.
+    :param response: The http response, unused.
+    :param content: The response body.
+    :return: The body as a string.
+    """
+    if isinstance(content, bytes):
+        return content.decode("utf-8")
+    return content
+
+
+def _skip(text: str, index: int) -> int:
+    return _WHITESPACE.match(text, index).end()
+
+
+def _unexpected(text: str, index: int, expected: str):
+    return json.JSONDecodeError(f"Expecting {expected}", text, index)
+
+
+def _stream_array(text: str, index: int, parents: tuple, on_item) -> tuple:
+    """
+    Decode the elements of an array one at a time, handing each to on_item.
+    :return: The number of elements and the index after the array.
+    """
+    count = 0
+    index = _skip(text, index + 1)
+    if text[index : index + 1] == "]":
+        return count, index + 1
+
+    while True:
+        item, index = _DECODER.raw_decode(text, index)
+        on_item(item, parents)
+        count += 1
+
+        index = _skip(text, index)
+        if text[index : index + 1] == ",":
+            index = _skip(text, index + 1)
+        elif text[index : index + 1] == "]":
+            return count, index + 1
+        else:
+            raise _unexpected(text, index, "',' or ']'")
+
+
+def _decode(text: str, index: int, key: str, on_item, parents: tuple) -> tuple:
+    """
+    Decode the value at index, descending into objects and arrays so that the arrays
+    held under key are streamed, anything else is decoded by the json scanner.
+    :return: The value and the index after it.
+    """
+    char = text[index : index + 1]
+    if char == "{":
+        value = {}
+        index = _skip(text, index + 1)
+        if text[index : index + 1] == "}":
+            return value, index + 1
+
+        while True:
+            name, index = _DECODER.raw_decode(text, index)
+            if not isinstance(name, str):
+                raise _unexpected(text, index, "property name")
+            index = _skip(text, index)
+            if text[index : index + 1] != ":":
+                raise _unexpected(text, index, "':'")
+            index = _skip(text, index + 1)
+
+            if name == key and text[index : index + 1] == "[":
+                value[name], index = _stream_array(
+                    text, index, (*parents, value), on_item
+                )
+            else:
+                value[name], index = _decode(
+                    text, index, key, on_item, (*parents, value)
+                )
+
+            index = _skip(text, index)
+            if text[index : index + 1] == ",":
+                index = _skip(text, index + 1)
+            elif text[index : index + 1] == "}":
+                return value, index + 1
+            else:
+                raise _unexpected(text, index, "',' or '}'")
+
+    if char == "[":
+        value = []
+        index = _skip(text, index + 1)
+        if text[index : index + 1] == "]":
+            return value, index + 1
+
+        while True:
+            item, index = _decode(text, index, key, on_item, (*parents, value))
+            value.append(item)
+
+            index = _skip(text, index)
+            if text[index : index + 1] == ",":
+                index = _skip(text, index + 1)
+            elif text[index : index + 1] == "]":
+                return value, index + 1
+            else:
+                raise _unexpected(text, index, "',' or ']'")
+
+    return _DECODER.raw_decode(text, index)
+
+
+def stream_json(body, key: str, on_item) -> object:
+    """
+    Decode a json document, handing each element of the arrays held under key to
+    on_item as soon as it is decoded rather than keeping it, so that a large array
+    never exists as a whole. Each element is decoded by the json scanner, only the
+    objects and arrays around them are walked here.
+    :param body: The json document, as a string or utf-8 bytes.
+    :param key: The name of the streamed arrays, such as rows.
+    :param on_item: Function given each element and the tuple of objects and arrays
+    holding it, outermost first. Members of a holding object that come after the
+    array are not decoded yet.
+    :return: The document, with each streamed array replaced by its number of elements.
+    """
+    text = body.decode("utf-8") if isinstance(body, bytes) else body
+    value, index = _decode(text, _skip(text, 0), key, on_item, ())
+    index = _skip(text, index)
+    if index != len(text):
+        raise _unexpected(text, index, "end of document")
+    return value
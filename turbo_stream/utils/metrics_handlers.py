@@ -0,0 +1,250 @@
+"""
+Metrics Handler Methods
+"""
+import os
+import socket
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# histogram upper bounds in seconds, suited to api request latency
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+def peak_rss_bytes():
+    """
+    :return: The peak resident set size of the process in bytes, or None if unknown.
+    """
+    try:
+        import resource  # pylint: disable=import-outside-toplevel
+    except ImportError:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # linux reports kilobytes, macos reports bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _escape_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class _Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.bucket_counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.bucket_counts[index] += 1
+                break
+
+    def to_dict(self) -> dict:
+        cumulative, buckets = 0, {}
+        for bound, bucket_count in zip(self.buckets, self.bucket_counts):
+            cumulative += bucket_count
+            buckets[str(bound)] = cumulative
+        buckets["+Inf"] = self.count
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min,
+            "max": self.max,
+            "mean": self.sum / self.count if self.count else None,
+            "buckets": buckets,
+        }
+
+
+class RunMetrics:
+    """
+    Thread safe collection of counters and histograms describing a run.
+    Readers record request latency, retries, backoff and rate limit waits,
+    rows and bytes per stage and serialisation time. The metrics are available
+    as a structured summary, or as a Prometheus textfile and StatsD gauges.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._started_at = time.monotonic()
+        self._counters: dict = {}
+        self._histograms: dict = {}
+
+    @staticmethod
+    def _key(name: str, labels: dict) -> tuple:
+        return name, tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+    def increment(self, name: str, value: float = 1, **labels) -> None:
+        """
+        Add to a counter.
+        :param name: Counter name, such as rows or bytes.
+        :param value: Amount to add.
+        :param labels: Labels of the counter, such as stage or vendor.
+        :return: None
+        """
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def total(self, name: str) -> float:
+        """
+        :param name: Counter name, such as requests.
+        :return: The sum of a counter across all of its labels.
+        """
+        with self._lock:
+            return sum(
+                value for (key, _), value in self._counters.items() if key == name
+            )
+
+    def observe(self, name: str, value: float, buckets=LATENCY_BUCKETS, **labels):
+        """
+        Record an observation in a histogram.
+        :param name: Histogram name, such as request_latency_seconds.
+        :param value: Observed value.
+        :param buckets: Histogram upper bounds used when the histogram is first created.
+        :param labels: Labels of the histogram, such as stage or vendor.
+        :return: None
+        """
+        key = self._key(name, labels)
+        with self._lock:
+            if key not in self._histograms:
+                self._histograms[key] = _Histogram(buckets)
+            self._histograms[key].observe(value)
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        """
+        Observe the time spent in a block of code in a histogram.
+        :param name: Histogram name, such as serialisation_seconds.
+        :param labels: Labels of the histogram, such as stage or vendor.
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def summary(self) -> dict:
+        """
+        :return: Structured summary of the run metrics.
+        """
+        with self._lock:
+            counters = [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in sorted(self._counters.items())
+            ]
+            histograms = [
+                {"name": name, "labels": dict(labels), **histogram.to_dict()}
+                for (name, labels), histogram in sorted(self._histograms.items())
+            ]
+
+        return {
+            "duration_seconds": time.monotonic() - self._started_at,
+            "peak_rss_bytes": peak_rss_bytes(),
+            "counters": counters,
+            "histograms": histograms,
+        }
+
+    @staticmethod
+    def _prometheus_labels(labels: dict, **extra) -> str:
+        labels = {**labels, **extra}
+        if not labels:
+            return ""
+        pairs = ",".join(
+            f'{key}="{_escape_label(value)}"' for key, value in labels.items()
+        )
+        return "{" + pairs + "}"
+
+    def to_prometheus(self, prefix: str = "turbo_stream") -> str:
+        """
+        :param prefix: Metric name prefix.
+        :return: The metrics in the Prometheus text exposition format.
+        """
+        summary = self.summary()
+        lines = [
+            f"# TYPE {prefix}_duration_seconds gauge",
+            f"{prefix}_duration_seconds {summary['duration_seconds']}",
+        ]
+        if summary["peak_rss_bytes"] is not None:
+            lines.append(f"# TYPE {prefix}_peak_rss_bytes gauge")
+            lines.append(f"{prefix}_peak_rss_bytes {summary['peak_rss_bytes']}")
+
+        typed = set()
+        for counter in summary["counters"]:
+            name = f"{prefix}_{counter['name']}_total"
+            if name not in typed:
+                lines.append(f"# TYPE {name} counter")
+                typed.add(name)
+            lines.append(
+                f"{name}{self._prometheus_labels(counter['labels'])} {counter['value']}"
+            )
+
+        for histogram in summary["histograms"]:
+            name = f"{prefix}_{histogram['name']}"
+            if name not in typed:
+                lines.append(f"# TYPE {name} histogram")
+                typed.add(name)
+            for bound, bucket_count in histogram["buckets"].items():
+                labels = self._prometheus_labels(histogram["labels"], le=bound)
+                lines.append(f"{name}_bucket{labels} {bucket_count}")
+            labels = self._prometheus_labels(histogram["labels"])
+            lines.append(f"{name}_sum{labels} {histogram['sum']}")
+            lines.append(f"{name}_count{labels} {histogram['count']}")
+
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus_textfile(
+        self, file_location: str, prefix: str = "turbo_stream"
+    ) -> None:
+        """
+        Write the metrics to a textfile, for the node exporter textfile collector.
+        The file is replaced atomically so the collector never reads a partial file.
+        :param file_location: Local file location, ending in .prom.
+        :param prefix: Metric name prefix.
+        :return: None
+        """
+        temp_location = f"{file_location}.{os.getpid()}.tmp"
+        with open(temp_location, "w", encoding="utf-8") as file:
+            file.write(self.to_prometheus(prefix=prefix))
+        os.replace(temp_location, file_location)
+
+    def send_to_statsd(
+        self, host: str = "localhost", port: int = 8125, prefix: str = "turbo_stream"
+    ) -> None:
+        """
+        Send the metrics to StatsD as gauges over udp.
+        :param host: StatsD host.
+        :param port: StatsD port.
+        :param prefix: Metric name prefix.
+        :return: None
+        """
+        summary = self.summary()
+        lines = [f"{prefix}.duration_seconds:{summary['duration_seconds']}|g"]
+        if summary["peak_rss_bytes"] is not None:
+            lines.append(f"{prefix}.peak_rss_bytes:{summary['peak_rss_bytes']}|g")
+
+        def _name(metric: dict) -> str:
+            label_values = [
+                str(value).replace(".", "_") for value in metric["labels"].values()
+            ]
+            return ".".join([prefix, metric["name"], *label_values])
+
+        for counter in summary["counters"]:
+            lines.append(f"{_name(counter)}:{counter['value']}|g")
+        for histogram in summary["histograms"]:
+            for stat in ("count", "sum", "mean", "max"):
+                if histogram[stat] is not None:
+                    lines.append(f"{_name(histogram)}.{stat}:{histogram[stat]}|g")
+
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            for line in lines:
+                sock.sendto(line.encode("utf-8"), (host, port))
@@ -0,0 +1,96 @@
+"""
+Pipeline Handler Methods
+"""
+import logging
+import queue
+import threading
+import time
+
+_STOP = object()
+
+
+class WritePipeline:
+    """
+    Bounded queue of completed units, written by worker threads while fetching
+    carries on. submit blocks while the queue is full, so fetching never runs more
+    than max_queued units ahead of writing.
+    Once a write fails the remaining units are dropped, and the error is raised on
+    the next submit or when the pipeline is closed.
+    """
+
+    def __init__(self, write, writers: int = 2, max_queued: int = 4, metrics=None):
+        """
+        :param write: Function called on a writer thread with each submitted unit.
+        :param writers: The number of writer threads.
+        :param max_queued: The number of units that can wait to be written.
+        :param metrics: Optional RunMetrics recording the time spent blocked.
+        """
+        self.submitted = 0
+
+        self._write = write
+        self._metrics = metrics
+        self._queue = queue.Queue(maxsize=max_queued)
+        self._errors: list = []
+        self._threads = [
+            threading.Thread(
+                target=self._work, name=f"turbo-stream-writer-{index}", daemon=True
+            )
+            for index in range(writers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def _work(self) -> None:
+        while True:
+            unit = self._queue.get()
+            try:
+                if unit is _STOP:
+                    return
+                if not self._errors:
+                    self._write(*unit)
+            except Exception as exception:  # pylint: disable=broad-except
+                logging.error(f"Writing unit failed, dropping later units: {exception}")
+                self._errors.append(exception)
+            finally:
+                self._queue.task_done()
+
+    def _raise_errors(self) -> None:
+        if self._errors:
+            raise self._errors[0]
+
+    def submit(self, *unit) -> None:
+        """
+        Queue a unit to be written, blocking while the writers are behind.
+        :param unit: Arguments the write function is called with.
+        :return: None
+        """
+        self._raise_errors()
+
+        started = time.perf_counter()
+        self._queue.put(unit)
+        if self._metrics is not None:
+            self._metrics.increment(
+                "pipeline_blocked_seconds", time.perf_counter() - started
+            )
+        self.submitted += 1
+
+    def close(self, raise_errors: bool = True) -> None:
+        """
+        Wait for the queued units to be written and stop the writers.
+        :param raise_errors: Raise the first write error, if any.
+        :return: None
+        """
+        for _ in self._threads:
+            self._queue.put(_STOP)
+        for thread in self._threads:
+            thread.join()
+
+        if raise_errors:
+            self._raise_errors()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # an error raised while fetching takes precedence over write errors
+        self.close(raise_errors=exc_type is None)
@@ -0,0 +1,180 @@
+"""
+Rate Handler Methods
+"""
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+from datetime import datetime
+
+# configured limits, keyed on (vendor, credential), where a credential of None
+# applies the limits to every credential of the vendor
+_RATE_LIMITS: dict = {}
+_RATE_LIMITERS: dict = {}
+_REGISTRY_LOCK = threading.Lock()
+
+
+class QuotaExhaustedError(Exception):
+    """
+    Raised when the daily request budget of a vendor credential has been spent.
+    """
+
+
+class RateLimiter:
+    """
+    Token bucket rate limiter that is safe to share between threads.
+    Tokens refill at qps per second up to burst, requests go out immediately
+    while tokens are available and only wait once the bucket is empty.
+    Optionally caps the number of concurrent requests and the daily request budget.
+    """
+
+    def __init__(
+        self,
+        qps: float = 1,
+        burst: int = 1,
+        max_concurrent: int = None,
+        daily_budget: int = None,
+    ):
+        self.qps = qps
+        self.burst = max(burst, 1)
+        self.max_concurrent = max_concurrent
+        self.daily_budget = daily_budget
+
+        self._lock = threading.Lock()
+        self._tokens: float = self.burst
+        self._updated_at = time.monotonic()
+        self._concurrency = (
+            threading.BoundedSemaphore(max_concurrent) if max_concurrent else None
+        )
+        self._budget_date = None
+        self._budget_spent = 0
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(
+            self.burst, self._tokens + (now - self._updated_at) * self.qps
+        )
+        self._updated_at = now
+
+    def _spend_budget(self, tokens: int) -> None:
+        if self.daily_budget is None:
+            return
+
+        today = datetime.utcnow().date()
+        if self._budget_date != today:
+            self._budget_date = today
+            self._budget_spent = 0
+
+        if self._budget_spent + tokens > self.daily_budget:
+            raise QuotaExhaustedError(
+                f"Daily budget of {self.daily_budget} requests has been spent."
+            )
+        self._budget_spent += tokens
+
+    def reserve(self, tokens: int = 1) -> float:
+        """
+        Take tokens from the bucket without waiting for them.
+        :param tokens: The number of requests to account for.
+        :return: Seconds the caller needs to wait before the tokens become valid.
+        """
+        with self._lock:
+            self._spend_budget(tokens)
+            self._refill()
+            self._tokens -= tokens
+            if self._tokens >= 0:
+                return 0
+            return -self._tokens / self.qps
+
+    def acquire(self, tokens: int = 1) -> float:
+        """
+        Block until the tokens and, if capped, a concurrency slot are available.
+        :param tokens: The number of requests to account for.
+        :return: Seconds spent waiting.
+        """
+        started = time.monotonic()
+        delay = self.reserve(tokens)
+        if delay > 0:
+            logging.info(f"Rate limited, waiting {round(delay, 2)} seconds...")
+            time.sleep(delay)
+
+        if self._concurrency is not None:
+            self._concurrency.acquire()
+
+        return time.monotonic() - started
+
+    async def acquire_async(self, tokens: int = 1) -> float:
+        """
+        Wait for the tokens and, if capped, a concurrency slot without blocking the loop.
+        :param tokens: The number of requests to account for.
+        :return: Seconds spent waiting.
+        """
+        started = time.monotonic()
+        delay = self.reserve(tokens)
+        if delay > 0:
+            logging.info(f"Rate limited, waiting {round(delay, 2)} seconds...")
+            await asyncio.sleep(delay)
+
+        if self._concurrency is not None:
+            # the slots are shared with threads, so poll rather than block the loop
+            while not self._concurrency.acquire(blocking=False):
+                await asyncio.sleep(0.01)
+
+        return time.monotonic() - started
+
+    def release(self) -> None:
+        """
+        Release the concurrency slot taken by acquire.
+        """
+        if self._concurrency is not None:
+            self._concurrency.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+
+def credential_key(credentials) -> str:
+    """
+    Generate a stable identifier for a credentials object, without exposing it.
+    :param credentials: A credentials path or object.
+    :return: Short sha256 hex digest.
+    """
+    return hashlib.sha256(repr(credentials).encode("utf-8")).hexdigest()[:16]
+
+
+def set_rate_limits(vendor: str, credential: str = None, **limits) -> None:
+    """
+    Configure the limits used for a vendor, or a single credential of a vendor.
+    :param vendor: The vendor name, such as google_analytics.
+    :param credential: Optional credential key, see credential_key.
+    :param limits: Any of qps, burst, max_concurrent and daily_budget.
+    :return: None
+    """
+    with _REGISTRY_LOCK:
+        _RATE_LIMITS[(vendor, credential)] = limits
+        for key in list(_RATE_LIMITERS):
+            if key[0] == vendor and credential in (None, key[1]):
+                del _RATE_LIMITERS[key]
+
+
+def get_rate_limiter(vendor: str, credential: str = None, **defaults) -> RateLimiter:
+    """
+    Gather the rate limiter shared by every reader using a vendor credential.
+    Configured limits take precedence over the given defaults.
+    :param vendor: The vendor name, such as google_analytics.
+    :param credential: Optional credential key, see credential_key.
+    :param defaults: Default qps, burst, max_concurrent and daily_budget.
+    :return: Shared RateLimiter.
+    """
+    key = (vendor, credential)
+    with _REGISTRY_LOCK:
+        if key not in _RATE_LIMITERS:
+            limits = dict(defaults)
+            limits.update(_RATE_LIMITS.get((vendor, None), {}))
+            limits.update(_RATE_LIMITS.get(key, {}))
+            _RATE_LIMITERS[key] = RateLimiter(**limits)
+        return _RATE_LIMITERS[key]
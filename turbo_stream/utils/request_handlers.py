@@ -1,35 +1,157 @@
 """
 Request Handler Methods & Wrappers
 """
+import asyncio
 import logging
+import random
 import time
-from functools import wraps
-from random import random
+from functools import lru_cache, wraps
 
-logging.basicConfig(
-    format="%(asctime)s %(name)-12s %(levelname)-8s %(message)s", level=logging.INFO
+from .error_handlers import (
+    RETRYABLE_ERRORS,
+    classify_error,
+    get_circuit_breaker,
+    retry_after,
 )
+from .rate_handlers import credential_key, get_rate_limiter
 
 
-def request_handler(wait: float = 1, backoff_factor: float = 0.5):
+def request_handler(
+    vendor: str = "default",
+    qps: float = 1,
+    burst: int = 1,
+    max_concurrent: int = None,
+    daily_budget: int = None,
+    cost: str = None,
+):
     """
-    Wrapper to handle the request process.
-    :param wait: Initial wait time.
-    :param backoff_factor: Increase wait time by given factor.
+    Wrapper to handle the request process, for both plain and coroutine functions.
+    Requests are paced by a token bucket shared across threads and reader instances
+    for each vendor and credential, so requests only wait when the budget is spent.
+    The defaults can be overridden with rate_handlers.set_rate_limits.
+    :param vendor: The vendor name the limits are shared under.
+    :param qps: Requests per second once the burst is spent.
+    :param burst: Requests that can go out at once.
+    :param max_concurrent: Optional cap on requests in flight.
+    :param daily_budget: Optional cap on requests per day.
+    :param cost: Optional name of the reader method returning the number of requests
+    made by a call, given the same arguments as the wrapped method, such as for batches.
+    The wrapped method exposes rate_limiter(reader), the limiter its calls wait on.
+    Each call is observed in the request_latency_seconds histogram, without the
+    rate limit wait, so placed below the retry_handler it times a single try and
+    leaves out the backoff between tries.
     :return: None
     """
 
-    def retry_decorator(function):
+    def _record(metrics, function, tokens, waited: float, started: float) -> None:
+        if metrics is not None:
+            metrics.increment("requests", tokens, vendor=vendor)
+            metrics.increment("rate_limit_wait_seconds", waited, vendor=vendor)
+            metrics.observe(
+                "request_latency_seconds",
+                time.perf_counter() - started,
+                vendor=vendor,
+                endpoint=function.__name__,
+            )
+
+    def _limiter(args):
+        # the wrapped reader method receives the reader as its first argument
+        credentials = getattr(args[0], "_credentials", None) if args else None
+        return get_rate_limiter(
+            vendor=vendor,
+            credential=credential_key(credentials),
+            qps=qps,
+            burst=burst,
+            max_concurrent=max_concurrent,
+            daily_budget=daily_budget,
+        )
+
+    def _tokens(args, kwargs) -> int:
+        if cost is None:
+            return 1
+        return getattr(args[0], cost)(*args[1:], **kwargs)
+
+    def request_decorator(function):
+        if asyncio.iscoroutinefunction(function):
+
+            @wraps(function)
+            async def async_func_with_rate_limit(*args, **kwargs):
+                limiter, tokens = _limiter(args), _tokens(args, kwargs)
+                waited = await limiter.acquire_async(tokens)
+                started = time.perf_counter()
+                try:
+                    return await function(*args, **kwargs)
+                finally:
+                    limiter.release()
+                    _record(_metrics(args), function, tokens, waited, started)
+
+            # the limiter of a reader, for estimates such as ReaderInterface.dry_run
+            async_func_with_rate_limit.rate_limiter = lambda reader: _limiter((reader,))
+            return async_func_with_rate_limit
+
         @wraps(function)
-        def func_with_retries(*args, **kwargs):
-            _delay = round(wait * (1 + backoff_factor * random()), 2)
-            logging.info(f"Waiting {_delay} seconds before the next attempt...")
-            time.sleep(_delay)
-            return function(*args, **kwargs)
+        def func_with_rate_limit(*args, **kwargs):
+            limiter, tokens = _limiter(args), _tokens(args, kwargs)
+            waited = limiter.acquire(tokens)
+            started = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                limiter.release()
+                _record(_metrics(args), function, tokens, waited, started)
 
-        return func_with_retries
+        func_with_rate_limit.rate_limiter = lambda reader: _limiter((reader,))
+        return func_with_rate_limit
 
-    return retry_decorator
+    return request_decorator
+
+
+def _metrics(args):
+    """
+    :return: The run metrics of the reader a wrapped method was called on, if any.
+    """
+    return getattr(args[0], "_metrics", None) if args else None
+
+
+def backoff_delay(
+    exception, tries: int, initial_wait=0.5, backoff_factor=2, max_wait=60
+) -> float:
+    """
+    Gather the seconds to wait before trying a failed request again.
+    The Retry-After instruction of the vendor is used when given, up to max_wait.
+    :param exception: The exception raised.
+    :param tries: The number of tries made so far.
+    :param initial_wait: Upper bound of the first wait.
+    :param backoff_factor: Factor the upper bound grows by with every try.
+    :param max_wait: Cap on the upper bound.
+    :return: Seconds to wait.
+    """
+    delay = retry_after(exception)
+    if delay is not None:
+        delay = min(delay, max_wait)
+    else:
+        # full jitter, a random wait up to the capped exponential backoff
+        delay = random.uniform(
+            0, min(max_wait, initial_wait * backoff_factor ** (tries - 1))
+        )
+    return delay
+
+
+@lru_cache(maxsize=None)
+def _resolve_exceptions(resolve) -> tuple:
+    return tuple(resolve())
+
+
+def handled_exceptions(exceptions) -> tuple:
+    """
+    :param exceptions: An exception, a tuple of exceptions, or a callable returning
+    them, such as google_api_errors.
+    :return: The exceptions to handle, a callable is only resolved on its first use,
+    so that the modules defining the exceptions are imported once a request fails.
+    """
+    if callable(exceptions) and not isinstance(exceptions, type):
+        return _resolve_exceptions(exceptions)
+    return exceptions
 
 
 def retry_handler(
@@ -37,44 +159,151 @@ def retry_handler(
     total_tries: int = 4,
     initial_wait: float = 0.5,
     backoff_factor: int = 2,
+    max_wait: float = 60,
     should_raise: bool = False,
+    endpoint: str = None,
+    failure_threshold: int = 5,
+    reset_timeout: float = 60,
 ):
     """
-    Wrapper to handle the request process.
-    :param exceptions: Exceptions to handle.
+    Wrapper to handle the request process, for both plain and coroutine functions,
+    coroutines wait between tries without blocking the event loop.
+    Handled exceptions are classified, rate limited, server and transient errors
+    are retried with full jitter backoff, honouring the vendor Retry-After header,
+    while client errors and exhausted daily quotas are not retried at all.
+    Repeated failures open a circuit breaker shared by every caller of the endpoint,
+    failing fast with CircuitOpenError instead of waiting on a vendor that is down.
+    Client errors and exhausted quotas show the vendor is answering, so they count
+    as a success of the endpoint rather than a failure.
+    Place the wrapper above the request_handler, so that every try takes a token from
+    the rate limiter and no concurrency slot is held while waiting between tries.
+    The wrapped method exposes the circuit_breaker of the endpoint and
+    retry_delay(exception, tries, reader), the wait before another try, or None to give
+    up, for calls made outside the wrapper that share its policy, such as batches.
+    :param exceptions: Exceptions to handle, or a callable returning them, see
+    handled_exceptions.
     :param total_tries: Total tries before raising an exception.
     :param initial_wait: Initial wait after first exception handled.
     :param backoff_factor: Increase wait period by given factor.
-    :param should_raise: Bool raise exception after all tries.
+    :param max_wait: Cap on the backoff wait period.
+    :param should_raise: Bool raise exception after all tries, otherwise return None.
+    :param endpoint: Circuit breaker name, defaults to the wrapped function.
+    :param failure_threshold: Consecutive failures before the circuit opens.
+    :param reset_timeout: Seconds the circuit stays open before a trial call.
     :return: None
     """
 
     def retry_decorator(function):
+        breaker = get_circuit_breaker(
+            endpoint or f"{function.__module__}.{function.__qualname__}",
+            failure_threshold=failure_threshold,
+            reset_timeout=reset_timeout,
+        )
+
+        def _retry_delay(exception, tries: int, args):
+            """
+            :return: Seconds to wait before the next try, or None to give up.
+            """
+            error_class = classify_error(exception)
+            if error_class in RETRYABLE_ERRORS:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+
+            if error_class not in RETRYABLE_ERRORS or tries >= total_tries:
+                if should_raise:
+                    raise Exception(
+                        f"Function: {function.__name__}\n"
+                        f"Failed with {error_class} after {tries} tries\n"
+                        f"Exception {exception}."
+                    ) from exception
+                logging.info(
+                    f"Function: {function.__name__}\n"
+                    f"Failed with {error_class} after {tries} tries, giving up.\n"
+                    f"Exception {exception}."
+                )
+                return None
+
+            delay = backoff_delay(
+                exception,
+                tries=tries,
+                initial_wait=initial_wait,
+                backoff_factor=backoff_factor,
+                max_wait=max_wait,
+            )
+            logging.info(
+                f"Function: {function.__name__}\n"
+                f"Failed with {error_class} at {tries} tries, "
+                f"trying again in {round(delay, 2)} seconds...\n"
+                f"Exception {exception}."
+            )
+
+            metrics = _metrics(args)
+            if metrics is not None:
+                metrics.increment(
+                    "retries", endpoint=breaker.endpoint, error=error_class
+                )
+                metrics.increment("backoff_seconds", delay, endpoint=breaker.endpoint)
+            return delay
+
+        if asyncio.iscoroutinefunction(function):
+
+            @wraps(function)
+            async def async_func_with_retries(*args, **kwargs):
+                tries = 1
+                while True:
+                    trial = breaker.before_call()
+                    try:
+                        logging.info(f"Attempt {tries} of {total_tries}.")
+                        response = await function(*args, **kwargs)
+                    except handled_exceptions(exceptions) as exception:
+                        delay = _retry_delay(exception, tries, args)
+                        if delay is None:
+                            return None
+                    else:
+                        breaker.record_success()
+                        return response
+                    finally:
+                        # a trial ending on an unhandled exception must not hold the circuit open
+                        if trial:
+                            breaker.release_trial()
+                    tries += 1
+                    await asyncio.sleep(delay)
+
+            async_func_with_retries.circuit_breaker = breaker
+            async_func_with_retries.retry_delay = (
+                lambda exception, tries, reader: _retry_delay(
+                    exception, tries, (reader,)
+                )
+            )
+            return async_func_with_retries
+
         @wraps(function)
         def func_with_retries(*args, **kwargs):
             tries = 1
-            delay = initial_wait
             while True:
+                trial = breaker.before_call()
                 try:
                     logging.info(f"Attempt {tries} of {total_tries}.")
-                    return function(*args, **kwargs)
-                except exceptions as exception:
-                    if tries <= total_tries and should_raise:
-                        raise Exception(
-                            f"Function: {function.__name__}\n"
-                            f"Failed despite best efforts after {total_tries} tries\n"
-                            f"Exception {exception}."
-                        )
-
-                    logging.info(
-                        f"Function: {function.__name__}\n"
-                        f"Failed at {tries} tries, trying again in {delay} seconds...\n"
-                        f"Exception {exception}."
-                    )
-                    tries += 1
-                    time.sleep(delay)
-                    delay = delay * backoff_factor
+                    response = function(*args, **kwargs)
+                except handled_exceptions(exceptions) as exception:
+                    delay = _retry_delay(exception, tries, args)
+                    if delay is None:
+                        return None
+                else:
+                    breaker.record_success()
+                    return response
+                finally:
+                    # a trial ending on an unhandled exception must not hold the circuit open
+                    if trial:
+                        breaker.release_trial()
+                tries += 1
+                time.sleep(delay)
 
+        func_with_retries.circuit_breaker = breaker
+        func_with_retries.retry_delay = lambda exception, tries, reader: _retry_delay(
+            exception, tries, (reader,)
+        )
         return func_with_retries
 
     return retry_decorator
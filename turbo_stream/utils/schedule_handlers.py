@@ -0,0 +1,137 @@
+"""
+Schedule Handler Methods
+"""
+import logging
+import threading
+import time
+import traceback
+from typing import Callable, NamedTuple
+
+
+class Job(NamedTuple):
+    """
+    A unit of work for the JobScheduler, jobs with a higher priority start first.
+    The vendor and credential are optional, a job without them is never capped.
+    """
+
+    name: str
+    function: Callable
+    vendor: str = None
+    credential: str = None
+    priority: int = 0
+
+
+class JobScheduler:
+    """
+    Run jobs on a pool of worker threads, highest priority first.
+    A job only starts while its vendor and credential are under their concurrency
+    caps, a worker skips over capped jobs to the next one that can run.
+    A failed job is recorded and never stops the other jobs.
+    """
+
+    def __init__(
+        self,
+        workers: int = 4,
+        vendor_limits: dict = None,
+        credential_limit: int = None,
+    ):
+        """
+        :param workers: The number of jobs run at a time.
+        :param vendor_limits: Optional number of concurrent jobs, keyed by vendor.
+        :param credential_limit: Optional number of concurrent jobs per credential.
+        """
+        self.workers = workers
+        self.vendor_limits = vendor_limits or {}
+        self.credential_limit = credential_limit
+
+        self._condition = threading.Condition()
+        self._pending: list = []
+        self._running_vendors: dict = {}
+        self._running_credentials: dict = {}
+        self._results: dict = {}
+
+    def _can_start(self, job: Job) -> bool:
+        vendor_limit = self.vendor_limits.get(job.vendor)
+        if (
+            vendor_limit is not None
+            and self._running_vendors.get(job.vendor, 0) >= vendor_limit
+        ):
+            return False
+        if (
+            self.credential_limit is not None
+            and job.credential is not None
+            and self._running_credentials.get(job.credential, 0)
+            >= self.credential_limit
+        ):
+            return False
+        return True
+
+    def _next_job(self):
+        """
+        Take the highest priority job that can start, waiting while every pending job
+        is capped.
+        :return: The job, or None once no jobs are pending.
+        """
+        with self._condition:
+            while self._pending:
+                for job in self._pending:
+                    if self._can_start(job):
+                        self._pending.remove(job)
+                        self._running_vendors[job.vendor] = (
+                            self._running_vendors.get(job.vendor, 0) + 1
+                        )
+                        self._running_credentials[job.credential] = (
+                            self._running_credentials.get(job.credential, 0) + 1
+                        )
+                        return job
+                self._condition.wait()
+            return None
+
+    def _finish_job(self, job: Job, result: dict) -> None:
+        with self._condition:
+            self._running_vendors[job.vendor] -= 1
+            self._running_credentials[job.credential] -= 1
+            self._results[job.name] = result
+            self._condition.notify_all()
+
+    def _work(self) -> None:
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+
+            logging.info(f"Starting job: {job.name}.")
+            started = time.perf_counter()
+            try:
+                result = {"status": "succeeded", "result": job.function()}
+            except Exception as exception:  # pylint: disable=broad-except
+                logging.error(
+                    f"Job: {job.name} failed, carrying on with the other jobs.\n"
+                    f"{traceback.format_exc()}"
+                )
+                result = {"status": "failed", "error": repr(exception)}
+
+            result["seconds"] = round(time.perf_counter() - started, 4)
+            logging.info(f"Job: {job.name} {result['status']}.")
+            self._finish_job(job, result)
+
+    def run(self, jobs: list) -> dict:
+        """
+        Run every job, returning once they have all finished.
+        :param jobs: List of Job objects.
+        :return: The status, seconds and result or error of each job, keyed by name.
+        """
+        # a stable sort keeps jobs of the same priority in the given order
+        self._pending = sorted(jobs, key=lambda job: -job.priority)
+        self._results = {}
+
+        threads = [
+            threading.Thread(target=self._work, name=f"turbo-stream-job-{index}")
+            for index in range(min(self.workers, len(jobs)))
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        return {job.name: self._results[job.name] for job in jobs}
@@ -0,0 +1,71 @@
+"""
+Serialise Handler Methods
+"""
+import logging
+from concurrent.futures import ProcessPoolExecutor
+
+import pyarrow as pa
+
+from .aws_handlers import serialise_data
+from .dataset_handlers import to_arrow_table
+
+
+def to_arrow_buffer(data: list):
+    """
+    Encode rows as an Arrow IPC stream, which is handed to a worker process as a
+    single buffer rather than pickled dict by dict, see to_arrow_table.
+    :param data: List of rows.
+    :return: The Arrow IPC buffer, or None when the rows would not serialise the same
+    through an Arrow table, such as columns of mixed types or only nulls.
+    """
+    table = to_arrow_table(data)
+    if table is None:
+        return None
+
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
+
+
+def _serialise_buffer(buffer, fmt: str, is_table: bool = False):
+    """
+    Worker process entry point, decode an Arrow IPC buffer and serialise it.
+    Rows are serialised through pandas, as they are in process, see serialise_data.
+    """
+    table = pa.ipc.open_stream(buffer).read_all()
+    if is_table:
+        return serialise_data(data=table, fmt=fmt)
+    return serialise_data(data=table.to_pandas(), fmt=fmt)
+
+
+def serialise_partitions(files: dict, workers: int):
+    """
+    Serialise files across a pool of worker processes, yielding the body of each file
+    in order of the files. Files that can not be handed over as Arrow buffers are
+    serialised in this process.
+    :param files: The data objects to be serialised, keyed by key, the key extension
+    sets the format as with write_file_to_s3.
+    :param workers: The number of worker processes.
+    :return: Generator of (key, body).
+    """
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {}
+        for key, data in files.items():
+            buffer = to_arrow_buffer(data)
+            if buffer is not None:
+                futures[key] = executor.submit(
+                    _serialise_buffer,
+                    buffer,
+                    key.split(".")[-1],
+                    hasattr(data, "to_pandas"),
+                )
+
+        logging.info(
+            f"Serialising {len(futures)} of {len(files)} files in {workers} processes."
+        )
+        for key, data in files.items():
+            if key in futures:
+                yield key, futures[key].result()
+            else:
+                yield key, serialise_data(data=data, fmt=key.split(".")[-1])
@@ -0,0 +1,76 @@
+"""
+Shard Handler Methods
+Splits the units of a reader across independent nodes. Each node runs the same job
+with its own shard_index out of shard_count, and gathers a disjoint share of the
+units, assigned by a stable hash, so no coordination is needed between nodes.
+"""
+import hashlib
+import json
+import logging
+
+
+def shard_of(entity, date, shard_count: int) -> int:
+    """
+    Assign a unit to a shard, the same unit is always assigned to the same shard.
+    :param entity: The entity of the unit, such as a view_id or dimension.
+    :param date: The unit date, or any other key of the unit such as an offset.
+    :param shard_count: The number of shards.
+    :return: The shard index of the unit.
+    """
+    unit = json.dumps([str(entity), str(date)])
+    digest = hashlib.sha256(unit.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % shard_count
+
+
+def shard_key(key: str, shard_index: int, shard_count: int) -> str:
+    """
+    Add the shard to an output key, as the shards of a date each hold a share of its
+    rows, and would otherwise overwrite each other in the same partition file.
+    :param key: The key path and filename, such as path/20220101.json.
+    :param shard_index: The shard of the writer.
+    :param shard_count: The number of shards, a single shard leaves the key as is.
+    :return: The key, such as path/20220101_shard-0-of-2.json.
+    """
+    if shard_count == 1:
+        return key
+    directory, _, filename = key.rpartition("/")
+    stem, dot, extension = filename.rpartition(".")
+    if not dot:
+        stem, extension = filename, ""
+    filename = f"{stem}_shard-{shard_index}-of-{shard_count}{dot}{extension}"
+    return f"{directory}/{filename}" if directory else filename
+
+
+def verify_shards(reader, state_stores: list):
+    """
+    Verify that the shards of a job covered every unit, once they have all finished.
+    Each shard records its units in a state store of its own, such as a StateStore
+    mirrored to its own s3 key. Units within the mutable lookback count as covered
+    once recorded, although a later run gathers them again.
+    :param reader: A reader built with the configuration of the job.
+    :param state_stores: The state store of each shard.
+    :return: The (entity, date) units no shard completed, empty when coverage is
+    complete, or None when the reader does not plan its units, such as the
+    OnesignalReader, so coverage can not be verified.
+    """
+    try:
+        units = reader._plan_units()  # pylint: disable=protected-access
+    except NotImplementedError as error:
+        logging.warning(f"Shard coverage can not be verified: {error}")
+        return None
+
+    missing = [
+        (entity, date)
+        for entity, date in units
+        if not any(
+            state_store.is_recorded(
+                reader=reader.__class__.__name__, entity=entity, date=date
+            )
+            for state_store in state_stores
+        )
+    ]
+    if missing:
+        logging.warning(f"{len(missing)} units were not completed by any shard.")
+    else:
+        logging.info("Every unit was completed by a shard.")
+    return missing
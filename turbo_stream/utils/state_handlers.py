@@ -0,0 +1,173 @@
+"""
+State Handler Methods
+"""
+import json
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+
+from .aws_handlers import read_file_from_s3, write_file_to_s3
+
+
+class StateStore:
+    """
+    Persistent record of the (reader, entity, date) units that completed successfully.
+    The state is kept in a local json-lines manifest, where each completed unit is
+    appended as its own line, so a crash mid-run never loses the units already written.
+    The manifest can optionally be mirrored to s3 to share state between machines.
+    """
+
+    def __init__(
+        self,
+        file_location: str = "turbo_stream_state.jsonl",
+        bucket: str = None,
+        key: str = None,
+        profile_name: str = None,
+    ):
+        self.file_location = file_location
+        self.bucket = bucket
+        self.key = key if key is not None else os.path.basename(file_location)
+        self.profile_name = profile_name
+
+        self._lock = threading.Lock()
+        self._state: dict = {}
+        self._load()
+
+    def _add(self, reader: str, entity: str, date: str, completed_at: str) -> None:
+        self._state.setdefault(reader, {}).setdefault(entity, {})[date] = completed_at
+
+    def _load_lines(self, lines) -> None:
+        for line in lines:
+            if not line.strip():
+                continue
+            unit = json.loads(line)
+            self._add(
+                reader=unit["reader"],
+                entity=unit["entity"],
+                date=unit["date"],
+                completed_at=unit["completed_at"],
+            )
+
+    def _load(self) -> None:
+        """
+        Load the manifest from s3 (if mirrored) and from the local file,
+        the union of both is treated as the completed state.
+        """
+        if self.bucket is not None:
+            body = read_file_from_s3(
+                bucket=self.bucket, key=self.key, profile_name=self.profile_name
+            )
+            if body is not None:
+                logging.info(f"Loading state from s3://{self.bucket}/{self.key}.")
+                self._load_lines(body.decode("utf-8").splitlines())
+
+        if os.path.isfile(self.file_location):
+            logging.info(f"Loading state from local path: {self.file_location}.")
+            with open(self.file_location, "r", encoding="utf-8") as file:
+                self._load_lines(file)
+
+    def _dump_lines(self) -> str:
+        lines = []
+        for reader, entities in self._state.items():
+            for entity, dates in entities.items():
+                for date, completed_at in dates.items():
+                    lines.append(
+                        json.dumps(
+                            {
+                                "reader": reader,
+                                "entity": entity,
+                                "date": date,
+                                "completed_at": completed_at,
+                            }
+                        )
+                    )
+        return "\n".join(lines) + "\n" if lines else ""
+
+    def is_complete(
+        self, reader: str, entity, date: str, mutable_lookback: int = 0
+    ) -> bool:
+        """
+        Check if a unit has already been completed and holds final data.
+        :param reader: The reader name, usually the class name.
+        :param entity: The entity of the unit, such as a view_id or dimension.
+        :param date: The unit date formatted as '%Y-%m-%d'.
+        :param mutable_lookback: Number of days before today in which data is still
+        subject to change, units in this window are never treated as complete.
+        :return: True if the unit can be skipped.
+        """
+        cutoff = (datetime.now() - timedelta(days=mutable_lookback)).strftime(
+            "%Y-%m-%d"
+        )
+        if date >= cutoff:
+            return False
+        return self.is_recorded(reader=reader, entity=entity, date=date)
+
+    def is_recorded(self, reader: str, entity, date: str) -> bool:
+        """
+        Check if a unit has been recorded as complete, wherever it falls, as when
+        verifying which units a run covered.
+        :param reader: The reader name, usually the class name.
+        :param entity: The entity of the unit, such as a view_id or dimension.
+        :param date: The unit date formatted as '%Y-%m-%d'.
+        :return: True if the unit is in the manifest.
+        """
+        with self._lock:
+            return date in self._state.get(reader, {}).get(str(entity), {})
+
+    def mark_complete(self, reader: str, entity, date: str) -> None:
+        """
+        Record a unit as complete, appending it to the local manifest.
+        :param reader: The reader name, usually the class name.
+        :param entity: The entity of the unit, such as a view_id or dimension.
+        :param date: The unit date formatted as '%Y-%m-%d'.
+        :return: None
+        """
+        completed_at = datetime.utcnow().isoformat()
+        with self._lock:
+            self._add(
+                reader=reader, entity=str(entity), date=date, completed_at=completed_at
+            )
+            with open(self.file_location, "a", encoding="utf-8") as file:
+                file.write(
+                    json.dumps(
+                        {
+                            "reader": reader,
+                            "entity": str(entity),
+                            "date": date,
+                            "completed_at": completed_at,
+                        }
+                    )
+                    + "\n"
+                )
+
+    def completed_units(self, reader: str) -> dict:
+        """
+        :param reader: The reader name, usually the class name.
+        :return: Returns the completed dates for each entity of the reader.
+        """
+        with self._lock:
+            return {
+                entity: sorted(dates)
+                for entity, dates in self._state.get(reader, {}).items()
+            }
+
+    def save(self) -> None:
+        """
+        Compact the local manifest and mirror it to s3 if a bucket was given.
+        :return: None
+        """
+        with self._lock:
+            body = self._dump_lines()
+            temp_location = f"{self.file_location}.tmp"
+            with open(temp_location, "w", encoding="utf-8") as file:
+                file.write(body)
+            os.replace(temp_location, self.file_location)
+
+        if self.bucket is not None:
+            write_file_to_s3(
+                bucket=self.bucket,
+                key=self.key,
+                data=body,
+                profile_name=self.profile_name,
+            )
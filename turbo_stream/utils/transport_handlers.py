@@ -0,0 +1,463 @@
+"""
+Transport Handler Methods
+"""
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from socket import timeout
+
+from .rate_handlers import credential_key
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    # without file locks tokens are only shared between the threads of a process
+    fcntl = None
+
+# the token expiry format of oauth2client credentials
+EXPIRY_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+# cached tokens expiring sooner than this are refreshed rather than adopted
+_EXPIRY_SKEW = timedelta(seconds=60)
+
+# the least time between two background refreshes of a token, in seconds
+_MIN_REFRESH_INTERVAL = 30
+
+# the background refresh stops once no transport was leased for this long, in seconds
+_REFRESH_IDLE_TIMEOUT = 300
+
+# credential fields that change with every token, left out of the token key
+_TOKEN_FIELDS = (
+    "access_token",
+    "token_expiry",
+    "token_response",
+    "id_token",
+    "id_token_jwt",
+    "invalid",
+)
+
+
+def google_api_errors() -> tuple:
+    """
+    The exceptions retried on googleapiclient requests, resolved by retry_handler
+    on the first failed request, so that googleapiclient is only imported once used.
+    """
+    from googleapiclient.errors import (  # pylint: disable=import-outside-toplevel
+        HttpError,
+    )
+
+    return timeout, HttpError
+
+
+def token_key(credentials) -> str:
+    """
+    Generate a stable identifier for the tokens of a credentials object, which is the
+    same across processes and runs, without exposing it.
+    :param credentials: oauth2client credentials.
+    :return: Short sha256 hex digest.
+    """
+    fields = json.loads(credentials.to_json())
+    for field in _TOKEN_FIELDS:
+        fields.pop(field, None)
+    return credential_key(json.dumps(fields, sort_keys=True))
+
+
+class TokenCache:
+    """
+    On-disk cache of oauth access tokens and their expiry, shared by the readers of
+    every process and run on a host, so a short run does not exchange a new token
+    before its first request. The file is locked while a token is read, written or
+    refreshed, so a token is only refreshed by one process at a time.
+    Only access tokens are stored, never the credentials they were issued for.
+    """
+
+    def __init__(
+        self,
+        file_location: str = ".turbo_stream_tokens.json",
+        refresh_margin: float = 300,
+    ):
+        """
+        :param file_location: The token file, a .lock file is created next to it.
+        :param refresh_margin: Seconds ahead of their expiry that tokens are refreshed
+        in the background by the transport pools using the cache.
+        """
+        self.file_location = file_location
+        self.refresh_margin = refresh_margin
+
+        self._lock = threading.RLock()
+        self._lock_file = None
+        self._depth = 0
+
+    def acquire(self) -> None:
+        """
+        Lock the cache across threads and, where supported, across processes.
+        The lock is reentrant within a thread.
+        """
+        self._lock.acquire()
+        if self._depth == 0 and fcntl is not None:
+            # pylint: disable=consider-using-with
+            self._lock_file = open(f"{self.file_location}.lock", "a", encoding="utf-8")
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+        self._depth += 1
+
+    def release(self) -> None:
+        """
+        Release the lock taken by acquire.
+        """
+        self._depth -= 1
+        if self._depth == 0 and self._lock_file is not None:
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+            self._lock_file.close()
+            self._lock_file = None
+        self._lock.release()
+
+    def _read(self) -> dict:
+        try:
+            with open(self.file_location, "r", encoding="utf-8") as file:
+                return json.load(file)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def get(self, key: str):
+        """
+        Gather a cached token that is not about to expire.
+        :param key: The token key, see token_key.
+        :return: An (access_token, token_expiry) pair, or None.
+        """
+        self.acquire()
+        try:
+            entry = self._read().get(key)
+        finally:
+            self.release()
+        if entry is None:
+            return None
+
+        token_expiry = None
+        if entry["token_expiry"] is not None:
+            token_expiry = datetime.strptime(entry["token_expiry"], EXPIRY_FORMAT)
+            if token_expiry - _EXPIRY_SKEW <= datetime.utcnow():
+                return None
+        return entry["access_token"], token_expiry
+
+    def put(self, key: str, access_token: str, token_expiry: datetime = None) -> None:
+        """
+        Store a token, dropping any expired tokens from the cache.
+        :param key: The token key, see token_key.
+        :param access_token: The access token.
+        :param token_expiry: The naive utc expiry of the token, None if it never expires.
+        :return: None
+        """
+        now = datetime.utcnow().strftime(EXPIRY_FORMAT)
+        self.acquire()
+        try:
+            tokens = {
+                cached_key: entry
+                for cached_key, entry in self._read().items()
+                if entry["token_expiry"] is None or entry["token_expiry"] > now
+            }
+            tokens[key] = {
+                "access_token": access_token,
+                "token_expiry": token_expiry.strftime(EXPIRY_FORMAT)
+                if token_expiry is not None
+                else None,
+            }
+
+            # the file holds bearer tokens, so only the owner may read it
+            temp_location = f"{self.file_location}.{os.getpid()}.tmp"
+            descriptor = os.open(
+                temp_location, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600
+            )
+            with os.fdopen(descriptor, "w", encoding="utf-8") as file:
+                json.dump(tokens, file)
+            os.replace(temp_location, self.file_location)
+        finally:
+            self.release()
+
+
+class SharedTokenStorage:
+    """
+    In memory oauth2client token storage shared by the transports of a pool.
+    A transport that finds its token expired takes the lock and adopts the token
+    another transport already refreshed, so a token is only refreshed once.
+    With a TokenCache, tokens are also adopted from, and written to, the cache.
+    Implements the oauth2client Storage interface without subclassing it, so that
+    oauth2client is only imported once a transport is authorised.
+    """
+
+    def __init__(self, token_cache: TokenCache = None):
+        self._lock = threading.Lock()
+        self._credentials_json = None
+        self._token_cache = token_cache
+        self._token_key = None
+        # the latest (access_token, token_expiry), see sync
+        self._token = None
+
+    def seed(self, credentials) -> None:
+        """
+        Keep the credentials the tokens are issued for, without storing a token.
+        """
+        with self._lock:
+            if self._credentials_json is None:
+                self._credentials_json = credentials.to_json()
+                if self._token_cache is not None:
+                    self._token_key = token_key(credentials)
+
+    def sync(self, credentials) -> None:
+        """
+        Hand the latest token to the credentials of a transport, such as a token
+        refreshed in the background, before it is used for a request.
+        """
+        token = self._token
+        if token is not None and credentials.access_token != token[0]:
+            credentials.access_token, credentials.token_expiry = token
+
+    def acquire_lock(self):
+        self._lock.acquire()
+        if self._token_cache is not None:
+            self._token_cache.acquire()
+
+    def release_lock(self):
+        if self._token_cache is not None:
+            self._token_cache.release()
+        self._lock.release()
+
+    def get(self):
+        """
+        :return: The stored credentials, taking the lock.
+        """
+        self.acquire_lock()
+        try:
+            return self.locked_get()
+        finally:
+            self.release_lock()
+
+    def put(self, credentials):
+        """
+        Store credentials, taking the lock.
+        """
+        self.acquire_lock()
+        try:
+            self.locked_put(credentials)
+        finally:
+            self.release_lock()
+
+    def delete(self):
+        """
+        Drop the stored credentials, taking the lock.
+        """
+        self.acquire_lock()
+        try:
+            self.locked_delete()
+        finally:
+            self.release_lock()
+
+    def locked_get(self):
+        # pylint: disable=import-outside-toplevel
+        from oauth2client.client import Credentials
+
+        if self._credentials_json is None:
+            return None
+
+        credentials = Credentials.new_from_json(self._credentials_json)
+        if self._token_cache is not None:
+            cached = self._token_cache.get(self._token_key)
+            if cached is not None and cached[0] != credentials.access_token:
+                logging.info("Adopting the access token of the token cache.")
+                credentials.access_token, credentials.token_expiry = cached
+                self._credentials_json = credentials.to_json()
+                self._token = cached
+        credentials.set_store(self)
+        return credentials
+
+    def locked_put(self, credentials):
+        self._credentials_json = credentials.to_json()
+        if credentials.access_token:
+            self._token = credentials.access_token, credentials.token_expiry
+            if self._token_cache is not None:
+                self._token_cache.put(
+                    self._token_key, credentials.access_token, credentials.token_expiry
+                )
+
+    def locked_delete(self):
+        self._credentials_json = None
+        self._token = None
+
+
+class TransportPool:
+    """
+    Thread safe pool of authorised httplib2 transports.
+    httplib2 transports, and the googleapiclient services using them, are not thread
+    safe, so each worker leases a transport of its own for the duration of a request.
+    Transports are returned to the pool after use, keeping their connections alive
+    for the next lease rather than handshaking again.
+    """
+
+    def __init__(
+        self,
+        credentials=None,
+        pool_size: int = 10,
+        timeout=None,
+        token_cache: TokenCache = None,
+    ):
+        """
+        :param credentials: oauth2client credentials, or a callable returning them,
+        resolved on the first lease. None leases unauthorised transports.
+        :param pool_size: The number of transports, and so concurrent leases.
+        :param timeout: Optional socket timeout of the transports in seconds.
+        :param token_cache: Optional TokenCache shared across processes and runs,
+        its tokens are refreshed ahead of their expiry in a background thread, which
+        stops once the pool is idle and starts again with the next lease.
+        """
+        self.pool_size = pool_size
+        self.timeout = timeout
+
+        self._credentials = credentials
+        self._resolved = not callable(credentials)
+        self._token_cache = token_cache
+        self._storage = SharedTokenStorage(token_cache=token_cache)
+        self._refresher: threading.Thread = None
+        self._closed = threading.Event()
+        self._lock = threading.Lock()
+        self._active_leases = 0
+        self._last_lease = time.monotonic()
+        self._leases = threading.BoundedSemaphore(pool_size)
+        # the most recently used transport is the most likely to have a live connection
+        self._idle = queue.LifoQueue()
+
+    def _get_credentials(self):
+        with self._lock:
+            if not self._resolved:
+                self._credentials = self._credentials()
+                self._resolved = True
+            return self._credentials
+
+    def _new_transport(self):
+        # pylint: disable=import-outside-toplevel
+        import httplib2
+        from oauth2client.client import Credentials
+
+        http = httplib2.Http(timeout=self.timeout)
+        credentials = self._get_credentials()
+        if credentials is None:
+            return http
+
+        # every transport holds its own copy of the credentials sharing one storage,
+        # see SharedTokenStorage
+        if hasattr(credentials, "to_json") and hasattr(credentials, "set_store"):
+            self._storage.seed(credentials)
+            credentials = Credentials.new_from_json(credentials.to_json())
+            credentials.set_store(self._storage)
+            if self._token_cache is not None:
+                # start from the cached token, or refresh a stale token before the
+                # first request rather than after it is rejected
+                self._storage.get()
+                self._storage.sync(credentials)
+                if credentials.access_token_expired:
+                    credentials.access_token = None
+                self._start_refresher()
+        return credentials.authorize(http)
+
+    def _start_refresher(self) -> None:
+        with self._lock:
+            if self._token_cache is None or self._refresher is not None:
+                return
+            if self._closed.is_set():
+                return
+            self._refresher = threading.Thread(
+                target=self._refresh_ahead,
+                name="turbo-stream-token-refresh",
+                daemon=True,
+            )
+            self._refresher.start()
+
+    def _refresh_idle(self) -> bool:
+        """
+        Stop the background refresh when no transport was leased for the idle timeout,
+        so that a pool which is no longer used is not kept alive by its thread.
+        :return: True when the refresh is stopped.
+        """
+        with self._lock:
+            idle = time.monotonic() - self._last_lease
+            if self._active_leases or idle < _REFRESH_IDLE_TIMEOUT:
+                return False
+            self._refresher = None
+            return True
+
+    def _refresh_ahead(self) -> None:
+        """
+        Refresh the token of the pool ahead of its expiry, until the pool is closed or
+        idle, see _refresh_idle.
+        The refresh takes the storage lock, so a token another process refreshed in
+        the meantime is adopted rather than refreshed again.
+        """
+        import httplib2  # pylint: disable=import-outside-toplevel
+
+        while True:
+            wait = _MIN_REFRESH_INTERVAL
+            credentials = self._storage.get()
+            if credentials is not None and credentials.token_expiry is not None:
+                remaining = credentials.token_expiry - datetime.utcnow()
+                wait = remaining.total_seconds() - self._token_cache.refresh_margin
+                if credentials.access_token and wait <= 0:
+                    try:
+                        credentials.refresh(httplib2.Http(timeout=self.timeout))
+                    except Exception as error:  # pylint: disable=broad-except
+                        logging.warning(f"Background token refresh failed: {error}")
+                    wait = _MIN_REFRESH_INTERVAL
+
+            wait = min(wait, _REFRESH_IDLE_TIMEOUT)
+            if self._closed.wait(max(wait, _MIN_REFRESH_INTERVAL)):
+                return
+            if self._refresh_idle():
+                return
+
+    @contextmanager
+    def lease(self):
+        """
+        Lease a transport, blocking while every transport of the pool is in use.
+        """
+        self._leases.acquire()
+        with self._lock:
+            self._active_leases += 1
+            self._last_lease = time.monotonic()
+        try:
+            try:
+                http = self._idle.get_nowait()
+            except queue.Empty:
+                http = None
+            if http is None:
+                http = self._new_transport()
+            else:
+                # oauth2client keeps the credentials of a transport on its request
+                credentials = getattr(http.request, "credentials", None)
+                if credentials is not None:
+                    self._storage.sync(credentials)
+                    # the background refresh stops while the pool is idle
+                    self._start_refresher()
+
+            try:
+                yield http
+            finally:
+                self._idle.put(http)
+        finally:
+            with self._lock:
+                self._active_leases -= 1
+                self._last_lease = time.monotonic()
+            self._leases.release()
+
+    def close(self) -> None:
+        """
+        Close the connections of the idle transports, and stop refreshing the token.
+        """
+        self._closed.set()
+        while True:
+            try:
+                http = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            http.close()